@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Measure the per-command overhead of the audit log.
+
+Each executed command produces a verdict, a confirmation and a result
+entry. Commands are paced like real executions (--interval-us, about the
+cost of spawning a process). This times emitting those three entries with
+the log disabled, with the background writer (drop and block overflow
+policies) and with a synchronous write-and-flush baseline, then reports
+how many entries an unpaced burst loses under the drop policy.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from audit import AuditLog  # noqa: E402
+
+
+def emit_command(log, index: int) -> None:
+    """The entries one executed command adds."""
+    command = f"find . -name '*.log' -size +{index % 100}M"
+    log.record('verdict', command=command, allowed=True, reason=None,
+               risk_level='low', requires_sudo=False)
+    log.record('confirmation', command=command, approved=True, prompted=True)
+    log.record('result', command=command, executed=command, success=True, return_code=0,
+               truncated=False, stdout_file=None, stderr_file=None)
+
+
+class SyncLog:
+    """Baseline: encode, write and flush on the caller's thread."""
+
+    def __init__(self, path: Path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def record(self, event: str, level: str = 'INFO', **fields) -> None:
+        entry = {'ts': time.time(), 'level': level, 'event': event, 'request': None}
+        entry.update(fields)
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def measure(log, commands: int, interval_us: int) -> dict:
+    samples = []
+    for index in range(commands):
+        start = time.perf_counter_ns()
+        emit_command(log, index)
+        end = time.perf_counter_ns()
+        samples.append((end - start) / 1000)
+        # Leave the writer the time a command would take to run
+        while time.perf_counter_ns() - end < interval_us * 1000:
+            time.sleep(0)
+    samples.sort()
+    return {
+        'mean_us': round(statistics.fmean(samples), 2),
+        'p50_us': round(samples[len(samples) // 2], 2),
+        'p99_us': round(samples[int(len(samples) * 0.99)], 2),
+    }
+
+
+def make_log(directory: Path, name: str, overflow: str, queue_size: int) -> AuditLog:
+    log = AuditLog()
+    log.configure({
+        'enabled': True,
+        'file': str(directory / f'{name}.log'),
+        'overflow': overflow,
+        'queue_size': queue_size,
+        'max_bytes': 1024 * 1024,
+        'backup_count': 3,
+    })
+    return log
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--commands', type=int, default=5000, help='Commands to simulate per mode')
+    parser.add_argument('--interval-us', type=int, default=1000,
+                        help='Time between commands in microseconds (default: 1000)')
+    parser.add_argument('--queue-size', type=int, default=10000, help='Audit queue size')
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='orcas-audit-') as tmp:
+        directory = Path(tmp)
+
+        results['disabled'] = measure(AuditLog(), args.commands, args.interval_us)
+
+        for overflow in ('drop', 'block'):
+            log = make_log(directory, overflow, overflow, args.queue_size)
+            results[f'queued_{overflow}'] = measure(log, args.commands, args.interval_us)
+            log.close()
+            results[f'queued_{overflow}']['dropped'] = log.dropped
+
+        sync = SyncLog(directory / 'sync.log')
+        results['synchronous'] = measure(sync, args.commands, args.interval_us)
+        sync.close()
+
+        # An unpaced burst far larger than the queue
+        log = make_log(directory, 'burst', 'drop', 100)
+        for index in range(args.commands):
+            emit_command(log, index)
+        log.close()
+        results['burst_drop'] = {'entries': args.commands * 3, 'dropped': log.dropped}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':>16} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'dropped':>8}"
+          "   (per command, 3 entries)")
+    for mode, row in results.items():
+        if 'mean_us' in row:
+            print(f"{mode:>16} {row['mean_us']:>9} {row['p50_us']:>9} {row['p99_us']:>9} "
+                  f"{row.get('dropped', 0):>8}")
+    burst = results['burst_drop']
+    print(f"Burst of {burst['entries']} entries into a queue of 100: {burst['dropped']} dropped")
+
+
+if __name__ == '__main__':
+    main()
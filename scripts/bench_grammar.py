@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Compare free and grammar-constrained decoding on the configured model.
+
+For each mode, reports the tokens generated, the tokens kept in extracted
+commands, and how many prompts produced no usable command at all.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from command_parser import CommandParser  # noqa: E402
+from config import load_config  # noqa: E402
+from model_manager import ModelManager  # noqa: E402
+
+PROMPTS = [
+    'list files sorted by size',
+    'show disk usage of the home directory',
+    'find python files larger than 1MB',
+    'create a backup of documents and compress it',
+    'count lines in all markdown files',
+    'show the ten largest directories here',
+    'show running processes sorted by memory',
+    'find files modified in the last day',
+]
+
+
+def run_mode(parser: CommandParser, prompts) -> dict:
+    stats = {'generated': 0, 'kept': 0, 'empty': 0, 'seconds': 0.0}
+    for prompt in prompts:
+        start = time.perf_counter()
+        commands = parser.parse(prompt, use_cache=False)
+        stats['seconds'] += time.perf_counter() - start
+        stats['generated'] += parser.last_usage['generated']
+        stats['kept'] += parser.last_usage['kept']
+        if not commands:
+            stats['empty'] += 1
+
+    generated = stats['generated']
+    stats['kept_ratio'] = round(stats['kept'] / generated, 3) if generated else 0.0
+    stats['seconds'] = round(stats['seconds'], 2)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--config', help='Path to config file')
+    parser.add_argument('--prompts', type=argparse.FileType('r'),
+                        help='File with one prompt per line (default: built-in set)')
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    cfg = load_config(Path(args.config) if args.config else None)
+    prompts = PROMPTS
+    if args.prompts:
+        prompts = [line.strip() for line in args.prompts if line.strip()]
+
+    model = ModelManager(cfg['model'])
+    max_commands = cfg['execution'].get('max_commands_per_request')
+
+    results = {}
+    for mode, use_grammar in (('free', False), ('grammar', True)):
+        command_parser = CommandParser(model, max_commands=max_commands, use_grammar=use_grammar)
+        results[mode] = run_mode(command_parser, prompts)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':>8} {'generated':>10} {'kept':>8} {'kept %':>7} {'empty':>6} {'seconds':>8}")
+    for mode, row in results.items():
+        print(f"{mode:>8} {row['generated']:>10} {row['kept']:>8} "
+              f"{row['kept_ratio'] * 100:>6.1f}% {row['empty']:>6} {row['seconds']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Measure validation cost as the security policy grows.
+
+Compares the compiled policy engine against the naive loop over every
+blocked literal and pattern that the validator used before.
+"""
+
+import argparse
+import json
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from policy import PolicyEngine  # noqa: E402
+
+COMMANDS = [
+    'ls -lhS',
+    'du -sh *',
+    'find . -name "*.py" -size +1M',
+    'tar -czf backup.tar.gz documents_backup',
+    'grep -rn TODO src',
+    'df -h',
+    'ps aux --sort=-%mem',
+    'cp -r documents documents_backup',
+    'journalctl -u nginx --since today',
+    'rsync -av photos/ /mnt/backup/photos/',
+    'wc -l $(git ls-files)',
+    'chmod +x scripts/install.sh',
+    'docker ps -a',
+    'kubectl get pods -n default',
+    'ping -c 5 example.com',
+]
+
+
+def random_word(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def make_rules(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    literals = [f"{random_word(rng, 6)} --{random_word(rng, 5)}" for _ in range(count)]
+    patterns = [rf"\b{random_word(rng, 5)}\s+-{rng.choice('abcdefgh')}\w*" for _ in range(count)]
+    return literals, patterns
+
+
+def naive_match(literals, compiled, command: str) -> bool:
+    for literal in literals:
+        if literal in command:
+            return True
+    for pattern in compiled:
+        if pattern.search(command):
+            return True
+    return False
+
+
+def bench(fn, rounds: int) -> float:
+    """Return microseconds per validated command."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for command in COMMANDS:
+            fn(command)
+    return (time.perf_counter() - start) / (rounds * len(COMMANDS)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10,100,1000,5000',
+                        help='Comma-separated rule counts (per kind)')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        literals, patterns = make_rules(size)
+
+        start = time.perf_counter()
+        engine = PolicyEngine(literals, patterns)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        compiled = [re.compile(pattern) for pattern in patterns]
+
+        results.append({
+            'rules_per_kind': size,
+            'build_ms': round(build_ms, 2),
+            'engine_us': round(bench(lambda c: engine.match((c,)), args.rounds), 2),
+            'naive_us': round(bench(lambda c: naive_match(literals, compiled, c), args.rounds), 2),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'rules':>8} {'build ms':>10} {'engine us':>10} {'naive us':>10}")
+    for row in results:
+        print(f"{row['rules_per_kind']:>8} {row['build_ms']:>10} "
+              f"{row['engine_us']:>10} {row['naive_us']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Benchmark orcas without a real model, using the stub model backend.
+
+Sections:
+  startup     wall time of `orcas --version` and of a dry-run prompt
+  end_to_end  process_command overhead per prompt (dry run, no model latency)
+  parser      command extraction, analysis and validation over a corpus
+  executor    process spawn overhead per executed command, and a read-only
+              command run each time vs. served from the output cache
+
+Results are printed as a table, or as JSON with --json / --output so that
+runs can be compared to catch regressions.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from config import DEFAULT_CONFIG  # noqa: E402
+
+SECTIONS = ('startup', 'end_to_end', 'parser', 'executor')
+
+# Prompts for the end-to-end section and the stub model's answers to them
+RESPONSES = {
+    'list files sorted by size': 'ls -lhS',
+    'show disk usage of the home directory': 'du -sh ~',
+    'find python files larger than 1MB': 'find . -name "*.py" -size +1M',
+    'create a backup of documents and compress it':
+        'cp -r documents documents_backup\ntar -czf documents_backup.tar.gz documents_backup',
+    'count lines in all markdown files': 'find . -name "*.md" -exec wc -l {} +',
+    'show running processes sorted by memory': 'ps aux --sort=-%mem',
+    'find files modified in the last day': 'find . -type f -mtime -1',
+    'show listening ports': 'ss -ltnp',
+}
+
+
+def bench_config(home: Path) -> dict:
+    """Default config with the stub backend and no on-disk caches."""
+    cfg = json.loads(json.dumps(DEFAULT_CONFIG))
+    cfg['model'].update({
+        'backend': 'stub',
+        'persist_prefix_cache': False,
+        'stub': {'responses': RESPONSES, 'default': 'ls -lhS', 'ms_per_token': 0},
+    })
+    cfg['examples']['files'] = []
+    cfg['cache']['enabled'] = False
+    cfg['history']['enabled'] = False
+    cfg['cache']['path'] = str(home / 'results.db')
+    cfg['history']['path'] = str(home / 'history.db')
+    cfg['logging']['file'] = str(home / 'audit.log')
+    cfg['execution']['stream_output'] = True
+    return cfg
+
+
+def timings(fn: Callable[[], None], iterations: int) -> Dict[str, float]:
+    """Run ``fn`` repeatedly and summarize the wall time per call in ms."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p50_ms': round(samples[len(samples) // 2], 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+def bench_startup(config_file: Path, iterations: int) -> dict:
+    main = str(ROOT / 'src' / 'main.py')
+    env = dict(os.environ)
+
+    def run(*args: str) -> Callable[[], None]:
+        return lambda: subprocess.run(
+            [sys.executable, main, *args], env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+    return {
+        'version': timings(run('--version'), iterations),
+        'dry_run': timings(run('--config', str(config_file), '--dry-run', '--no-cache',
+                               '--no-history', 'list files sorted by size'), iterations),
+    }
+
+
+def bench_end_to_end(cfg: dict, iterations: int) -> dict:
+    from rich.console import Console
+
+    import cli
+    from executor import CommandExecutor
+    from security import SecurityValidator
+
+    # Keep the benchmark output clean; rendering still happens
+    cli.console._console = Console(file=io.StringIO(), force_terminal=False)
+
+    validator = SecurityValidator(cfg['security'])
+    parser = cli.build_parser(cfg, validator, use_cache=False)
+    executor = CommandExecutor(cfg['execution'], validator)
+    parser.warm_up()
+
+    prompts = list(RESPONSES)
+
+    def run() -> None:
+        for prompt in prompts:
+            cli.process_command(prompt, parser, executor, dry_run=True)
+
+    result = timings(run, iterations)
+    result['per_prompt_ms'] = round(result['mean_ms'] / len(prompts), 3)
+    result['prompts'] = len(prompts)
+    return result
+
+
+def bench_parser(cfg: dict, corpus: List[str], iterations: int) -> dict:
+    from command_parser import Command, CommandParser
+    from model_manager import ModelManager
+    from security import SecurityValidator
+
+    parser = CommandParser(ModelManager(cfg['model']))
+    validator = SecurityValidator(cfg['security'])
+    response = '\n'.join(corpus)
+    analyzed = [parser._analyze_command(cmd, 'benchmark') for cmd in corpus]
+
+    def throughput(fn: Callable[[], None]) -> dict:
+        result = timings(fn, iterations)
+        result['commands_per_sec'] = round(len(corpus) / (result['mean_ms'] / 1000))
+        return result
+
+    return {
+        'commands': len(corpus),
+        'extract': throughput(lambda: parser._extract_commands(response)),
+        'analyze': throughput(
+            lambda: [parser._analyze_command(cmd, 'benchmark') for cmd in corpus]),
+        # Fresh commands, so the lexed form is not reused from analysis
+        'validate': throughput(lambda: [
+            validator.check(
+                Command(cmd.command, cmd.description, cmd.requires_sudo, cmd.risk_level))
+            for cmd in analyzed
+        ]),
+    }
+
+
+def bench_executor(cfg: dict, iterations: int) -> dict:
+    from executor import CommandExecutor
+    from security import SecurityValidator
+
+    validator = SecurityValidator(cfg['security'])
+    results = {}
+    for name, overrides in (
+            ('spawn', {'backend': 'spawn', 'stream_output': False}),
+            ('spawn_streaming', {'backend': 'spawn', 'stream_output': True}),
+            ('session', {'backend': 'session'}),
+    ):
+        executor = CommandExecutor(dict(cfg['execution'], **overrides), validator)
+        try:
+            results[name] = timings(lambda: executor._execute_single('true', False), iterations)
+        finally:
+            executor.close()
+
+    # A read-only command, run each time or served from the output cache
+    listing = f"ls -lhS {ROOT / 'src'}"
+    for name, enabled in (('ls', False), ('ls_cached', True)):
+        executor = CommandExecutor(
+            dict(cfg['execution'], backend='spawn', stream_output=False,
+                 output_cache={'enabled': enabled}),
+            validator)
+        results[name] = timings(lambda: executor._execute_single(listing, False), iterations)
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_table(results: dict, prefix: str = '') -> None:
+    for key, value in results.items():
+        if key == 'meta':
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and 'mean_ms' in value:
+            extra = ''
+            if 'commands_per_sec' in value:
+                extra = f" {value['commands_per_sec']:>10} cmd/s"
+            elif 'per_prompt_ms' in value:
+                extra = f" {value['per_prompt_ms']:>9.3f} ms/prompt"
+            print(f"{name:<28} mean {value['mean_ms']:>9.3f} ms  p50 {value['p50_ms']:>9.3f}"
+                  f"  p95 {value['p95_ms']:>9.3f}{extra}")
+        elif isinstance(value, dict):
+            print_table(value, f"{name}.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', default=','.join(SECTIONS),
+                        help=f"Comma-separated sections to run (default: {','.join(SECTIONS)})")
+    parser.add_argument('--iterations', type=int, default=20, help='Repetitions per measurement')
+    parser.add_argument('--corpus', type=argparse.FileType('r'),
+                        default=str(ROOT / 'scripts' / 'data' / 'commands.txt'),
+                        help='Commands for the parser section, one per line')
+    parser.add_argument('--json', action='store_true', help='Print JSON results')
+    parser.add_argument('--output', '-o', help='Also write JSON results to this file')
+    args = parser.parse_args()
+
+    sections = [s.strip() for s in args.only.split(',') if s.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    corpus = [line.strip() for line in args.corpus if line.strip() and not line.startswith('#')]
+
+    results: dict = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'iterations': args.iterations,
+        },
+    }
+
+    with tempfile.TemporaryDirectory(prefix='orcas-bench-') as tmp:
+        home = Path(tmp)
+        cfg = bench_config(home)
+        config_file = home / 'config.yaml'
+        with open(config_file, 'w') as f:
+            yaml.safe_dump(cfg, f)
+
+        # Startup runs first, before this process has imported anything heavy
+        if 'startup' in sections:
+            results['startup'] = bench_startup(config_file, args.iterations)
+        if 'end_to_end' in sections:
+            results['end_to_end'] = bench_end_to_end(cfg, args.iterations)
+        if 'parser' in sections:
+            results['parser'] = bench_parser(cfg, corpus, args.iterations)
+        if 'executor' in sections:
+            results['executor'] = bench_executor(cfg, args.iterations)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,30 @@
 #!/usr/bin/env python3
+"""Download a GGUF model into ~/.orcas/models.
 
+Large files are fetched as byte ranges over several connections into a
+``.part`` file next to the destination. Finished ranges are recorded in a
+``.part.json`` state file, so an interrupted download resumes where it
+stopped. The state is keyed on the requested URL, the size and the ETag or
+checksum of the file, not on the signed CDN URL it redirects to, which
+changes on every request; ranges go to the URL resolved by the current
+run. The SHA-256 of the file is computed while it downloads and checked
+against the manifest (or the checksum the server publishes) before the file
+is renamed into place, so a model that loads is a model that arrived intact.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
 import sys
+import threading
+import time
+import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Optional, Set
 
 MODELS = {
     "gemma-3": {
@@ -22,26 +44,324 @@ MODELS = {
     }
 }
 
+CHUNK_SIZE = 16 * 1024 * 1024
+CONNECTIONS = 4
+RETRIES = 5
+TIMEOUT = 30
+READ_SIZE = 1024 * 1024
+
+_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+class DownloadError(Exception):
+    """Raised when a download cannot be completed or fails verification."""
+
+
+class _LinkedEtagHandler(urllib.request.HTTPRedirectHandler):
+    """Keeps the checksum Hugging Face sends on the redirect to its CDN."""
+
+    def __init__(self):
+        self.linked_etag: Optional[str] = None
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        etag = headers.get('X-Linked-Etag')
+        if etag:
+            self.linked_etag = etag.strip('"')
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def probe(url: str) -> Dict[str, object]:
+    """Return the size, range support, ETag and published SHA-256 of a remote file."""
+    handler = _LinkedEtagHandler()
+    opener = urllib.request.build_opener(handler)
+    # A one-byte range request also tells whether ranges are honoured
+    request = urllib.request.Request(url, headers={'Range': 'bytes=0-0'})
+    with opener.open(request, timeout=TIMEOUT) as response:
+        ranged = response.status == 206
+        if ranged:
+            # Content-Range: bytes 0-0/12345
+            size = int(response.headers['Content-Range'].rsplit('/', 1)[1])
+        else:
+            size = int(response.headers.get('Content-Length') or -1)
+        final_url = response.geturl()
+        response_etag = (response.headers.get('ETag') or '').strip('"')
+
+    etag = handler.linked_etag or response_etag
+    return {
+        'size': size,
+        'ranged': ranged,
+        'url': final_url,
+        'etag': etag or None,
+        'sha256': etag.lower() if _SHA256.match(etag.lower()) else None,
+    }
+
+
+class Progress:
+    """Single-line progress bar shared by all download threads."""
 
-def download_file(url: str, destination: Path) -> None:
-    def report_progress(block_num, block_size, total_size):
-        downloaded = block_num * block_size
-        percent = min(downloaded / total_size * 100, 100)
-        bar_length = 50
-        filled_length = int(bar_length * downloaded / total_size)
-        bar = '█' * filled_length + '-' * (bar_length - filled_length)
-        sys.stdout.write(f'\r|{bar}| {percent:.1f}%')
+    def __init__(self, total: int, done: int = 0):
+        self.total = total
+        self.done = done
+        self.started = time.monotonic()
+        self.resumed = done
+        self._lock = threading.Lock()
+        self._last = 0.0
+
+    def add(self, count: int) -> None:
+        with self._lock:
+            self.done += count
+            now = time.monotonic()
+            if now - self._last < 0.2 and self.done < self.total:
+                return
+            self._last = now
+
+        fraction = self.done / self.total if self.total > 0 else 0.0
+        bar = '█' * int(50 * fraction) + '-' * (50 - int(50 * fraction))
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = (self.done - self.resumed) / elapsed / 2 ** 20
+        sys.stdout.write(f'\r|{bar}| {fraction * 100:5.1f}% {rate:7.1f} MB/s')
         sys.stdout.flush()
 
+
+class RangedDownload:
+    """Parallel, resumable download of one file with streaming SHA-256.
+
+    ``url`` is where ranges are fetched from, e.g. a signed CDN URL;
+    ``source_url`` and ``etag`` identify the file across runs.
+    """
+
+    def __init__(
+            self,
+            url: str,
+            destination: Path,
+            size: int,
+            expected_sha256: Optional[str] = None,
+            connections: int = CONNECTIONS,
+            chunk_size: int = CHUNK_SIZE,
+            source_url: Optional[str] = None,
+            etag: Optional[str] = None
+    ):
+        self.url = url
+        self.source_url = source_url or url
+        self.etag = etag
+        self.destination = destination
+        self.size = size
+        self.expected_sha256 = expected_sha256
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.part = destination.with_name(destination.name + '.part')
+        self.state_file = destination.with_name(destination.name + '.part.json')
+        self.n_chunks = (size + chunk_size - 1) // chunk_size
+
+        self.done: Set[int] = set()
+        self._digest = hashlib.sha256()
+        # Chunks before this index are already fed to the digest
+        self._hashed = 0
+        self._lock = threading.Lock()
+
+    def run(self) -> str:
+        """Download, verify and move the file into place; return its SHA-256."""
+        self._load_state()
+        fd = os.open(self.part, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, self.size)
+            progress = Progress(self.size, sum(self._chunk_length(i) for i in self.done))
+
+            # Resumed chunks are hashed from disk before new ones arrive
+            with self._lock:
+                self._advance_digest(fd)
+
+            pending = [i for i in range(self.n_chunks) if i not in self.done]
+            with ThreadPoolExecutor(max_workers=self.connections) as pool:
+                futures = [pool.submit(self._fetch_chunk, fd, i, progress) for i in pending]
+                try:
+                    for future in futures:
+                        future.result()
+                finally:
+                    # On failure or Ctrl-C, only ranges already in flight finish
+                    for future in futures:
+                        future.cancel()
+
+            with self._lock:
+                self._advance_digest(fd)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        digest = self._digest.hexdigest()
+        self._verify(digest)
+        os.replace(self.part, self.destination)
+        self.state_file.unlink(missing_ok=True)
+        return digest
+
+    def _chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def _fetch_chunk(self, fd: int, index: int, progress: Progress) -> None:
+        start = index * self.chunk_size
+        end = start + self._chunk_length(index) - 1
+
+        for attempt in range(RETRIES):
+            offset = start
+            try:
+                request = urllib.request.Request(
+                    self.url, headers={'Range': f'bytes={start}-{end}'})
+                with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+                    if response.status != 206:
+                        raise DownloadError("server stopped honouring range requests")
+                    while offset <= end:
+                        data = response.read(min(READ_SIZE, end - offset + 1))
+                        if not data:
+                            break
+                        os.pwrite(fd, data, offset)
+                        offset += len(data)
+                        progress.add(len(data))
+                if offset <= end:
+                    raise DownloadError(f"connection closed at byte {offset}")
+            except (OSError, DownloadError) as e:
+                # The partial range is fetched again in full
+                progress.add(start - offset)
+                if attempt == RETRIES - 1:
+                    raise DownloadError(f"bytes {start}-{end} failed after {RETRIES} attempts: {e}")
+                time.sleep(2 ** attempt)
+                continue
+
+            with self._lock:
+                self.done.add(index)
+                self._advance_digest(fd)
+                self._save_state()
+            return
+
+    def _advance_digest(self, fd: int) -> None:
+        """Hash the chunks that now follow the hashed prefix without a gap."""
+        while self._hashed in self.done:
+            offset = self._hashed * self.chunk_size
+            remaining = self._chunk_length(self._hashed)
+            while remaining:
+                data = os.pread(fd, min(READ_SIZE, remaining), offset)
+                if not data:
+                    raise DownloadError("partial file is shorter than expected")
+                self._digest.update(data)
+                offset += len(data)
+                remaining -= len(data)
+            self._hashed += 1
+
+    def _verify(self, digest: str) -> None:
+        if self.expected_sha256 and digest != self.expected_sha256.lower():
+            # Resuming would only reproduce the same bytes
+            self.part.unlink(missing_ok=True)
+            self.state_file.unlink(missing_ok=True)
+            raise DownloadError(
+                f"SHA-256 mismatch for {self.destination.name}: "
+                f"expected {self.expected_sha256}, got {digest}"
+            )
+
+    def _load_state(self) -> None:
+        """Pick up the finished chunks of an earlier attempt at the same file."""
+        if not (self.part.exists() and self.state_file.exists()):
+            self.part.unlink(missing_ok=True)
+            return
+
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+
+        if state.get('identity') == self._identity():
+            self.done = {i for i in state.get('done', []) if 0 <= i < self.n_chunks}
+            print(f"Resuming: {len(self.done)}/{self.n_chunks} chunks already downloaded")
+        else:
+            # A different file, or the remote file changed
+            self.part.unlink(missing_ok=True)
+
+    def _save_state(self) -> None:
+        tmp = self.state_file.with_name(self.state_file.name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'identity': self._identity(), 'done': sorted(self.done)}, f)
+        os.replace(tmp, self.state_file)
+
+    def _identity(self) -> Dict[str, object]:
+        """What a resumed download must share with the earlier attempt."""
+        return {
+            'url': self.source_url,
+            'size': self.size,
+            'etag': self.etag,
+            'sha256': self.expected_sha256.lower() if self.expected_sha256 else None,
+            'chunk_size': self.chunk_size,
+        }
+
+
+def download_stream(url: str, destination: Path, expected_sha256: Optional[str]) -> str:
+    """Fallback for servers without range support: one stream, no resume."""
+    part = destination.with_name(destination.name + '.part')
+    digest = hashlib.sha256()
+    with urllib.request.urlopen(url, timeout=TIMEOUT) as response, open(part, 'wb') as f:
+        progress = Progress(int(response.headers.get('Content-Length') or -1))
+        while True:
+            data = response.read(READ_SIZE)
+            if not data:
+                break
+            f.write(data)
+            digest.update(data)
+            progress.add(len(data))
+        f.flush()
+        os.fsync(f.fileno())
+
+    if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+        part.unlink(missing_ok=True)
+        raise DownloadError(
+            f"SHA-256 mismatch for {destination.name}: "
+            f"expected {expected_sha256}, got {digest.hexdigest()}"
+        )
+    os.replace(part, destination)
+    return digest.hexdigest()
+
+
+def download_file(
+        url: str,
+        destination: Path,
+        expected_sha256: Optional[str] = None,
+        connections: int = CONNECTIONS,
+        chunk_size: int = CHUNK_SIZE
+) -> str:
+    """Download ``url`` to ``destination`` and return the file's SHA-256."""
+    info = probe(url)
+    expected_sha256 = expected_sha256 or info['sha256']
+    if not expected_sha256:
+        print("Warning: no checksum known for this file, it will not be verified")
+
     print(f"Downloading to {destination}...")
-    urllib.request.urlretrieve(url, destination, report_progress)
-    print("\n✓ Download complete!")
+    if info['ranged'] and info['size'] > 0:
+        digest = RangedDownload(
+            info['url'], destination, info['size'], expected_sha256, connections, chunk_size,
+            source_url=url, etag=info['etag'],
+        ).run()
+    else:
+        digest = download_stream(url, destination, expected_sha256)
 
+    print("\n✓ Download complete!" + (" Checksum verified." if expected_sha256 else ""))
+    return digest
+
+
+def load_manifest(path: Optional[str]) -> Dict[str, str]:
+    """SHA-256 checksums by file name, from a JSON object or `sha256sum` output."""
+    if not path:
+        return {}
+    with open(path, 'r') as f:
+        text = f.read()
+    try:
+        return {name: digest.lower() for name, digest in json.loads(text).items()}
+    except ValueError:
+        manifest = {}
+        for line in text.splitlines():
+            parts = line.split()
+            if len(parts) == 2:
+                manifest[parts[1].lstrip('*')] = parts[0].lower()
+        return manifest
 
-def main() -> None:
-    model_dir = Path.home() / ".orcas" / "models"
-    model_dir.mkdir(parents=True, exist_ok=True)
 
+def choose_model() -> str:
     print("\nAvailable models:")
     for i, (name, info) in enumerate(MODELS.items(), 1):
         print(f"  {i}. {name} ({info['size']})")
@@ -49,25 +369,64 @@ def main() -> None:
     choice = input(f"\nSelect a model (1-{len(MODELS.items())}) [1]: ").strip() or "1"
 
     try:
-        model_name = list(MODELS.keys())[int(choice) - 1]
+        return list(MODELS.keys())[int(choice) - 1]
     except (ValueError, IndexError):
         print("Invalid choice. Defaulting to gemma-3.")
-        model_name = "gemma-3"
+        return "gemma-3"
 
-    model_info = MODELS[model_name]
-    destination = model_dir / model_info["filename"]
 
-    if destination.exists():
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--model', choices=sorted(MODELS), help='Model to download, without prompting')
+    parser.add_argument('--url', help='Download this URL instead of a known model')
+    parser.add_argument('--filename', help='File name for --url (default: last URL segment)')
+    parser.add_argument('--sha256', help='Expected SHA-256 of the file')
+    parser.add_argument('--manifest', help='JSON or sha256sum file with checksums by file name')
+    parser.add_argument('--dest', default=str(Path.home() / ".orcas" / "models"),
+                        help='Directory to save the model in (default: ~/.orcas/models)')
+    parser.add_argument('--connections', type=int, default=CONNECTIONS,
+                        help=f'Parallel connections (default: {CONNECTIONS})')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE // 2 ** 20,
+                        help=f'Range size in MB (default: {CHUNK_SIZE // 2 ** 20})')
+    parser.add_argument('--force', action='store_true', help='Overwrite an existing model file')
+    args = parser.parse_args()
+
+    model_dir = Path(os.path.expanduser(args.dest))
+    model_dir.mkdir(parents=True, exist_ok=True)
+    interactive = not (args.model or args.url)
+
+    if args.url:
+        url = args.url
+        filename = args.filename or url.rstrip('/').rsplit('/', 1)[-1].split('?', 1)[0]
+        expected = None
+    else:
+        model_info = MODELS[args.model or choose_model()]
+        url = model_info["url"]
+        filename = model_info["filename"]
+        expected = model_info.get("sha256")
+
+    expected = args.sha256 or load_manifest(args.manifest).get(filename) or expected
+    destination = model_dir / filename
+
+    if destination.exists() and not args.force:
         print(f"\n    Model already exists at {destination}")
+        if not interactive:
+            print("Use --force to download it again.")
+            return
         overwrite = input("Overwrite? [y/N]: ").strip().lower()
         if overwrite != 'y':
             print("Download cancelled.")
             return
 
     try:
-        download_file(model_info["url"], destination)
+        download_file(url, destination, expected, args.connections, args.chunk_size * 2 ** 20)
         print(f"\n✓ Model saved to: {destination}")
-    except Exception as e:
+    except KeyboardInterrupt:
+        print("\n⊘ Interrupted, run the same command again to resume")
+        sys.exit(130)
+    except (DownloadError, OSError, urllib.error.URLError) as e:
         print(f"\n✗ Error downloading model: {e}")
         sys.exit(1)
 
@@ -0,0 +1,183 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+# Tells the writer thread to flush and stop
+_STOP = object()
+
+
+class AuditLog:
+    """Structured record of prompts, commands, verdicts, confirmations and results.
+
+    ``record`` only puts a dict on a bounded queue; a background thread
+    encodes it as a JSON line, writes it and rotates the file by size. When
+    the queue is full, the ``overflow`` policy either drops the entry
+    (counted, and reported in the log) or blocks the caller until the
+    writer catches up. Entries still queued at exit are written by an
+    ``atexit`` hook.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.level = LEVELS['INFO']
+        self.request_id: Optional[str] = None
+        self.dropped = 0
+        self._block = False
+        self._queue: 'queue.Queue[Any]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """Start writing to ``config['file']`` if the log is enabled."""
+        if self.enabled or not config.get('enabled', False):
+            return
+
+        self.level = LEVELS.get(str(config.get('level', 'INFO')).upper(), LEVELS['INFO'])
+        self._block = config.get('overflow', 'drop') == 'block'
+        writer = RotatingWriter(
+            Path(os.path.expanduser(config.get('file', '~/.orcas/logs/orcas.log'))),
+            max_bytes=config.get('max_bytes', 10 * 1024 * 1024),
+            backup_count=config.get('backup_count', 5),
+            compress=config.get('compress', True),
+        )
+        self._queue = queue.Queue(maxsize=config.get('queue_size', 10000))
+        self._thread = threading.Thread(
+            target=self._run, args=(writer,), name='orcas-audit', daemon=True)
+        self._thread.start()
+        self.enabled = True
+        atexit.register(self.close)
+
+    def begin_request(self, prompt: str, **fields: Any) -> None:
+        """Start a new request id and record its prompt."""
+        if not self.enabled:
+            return
+        self.request_id = os.urandom(6).hex()
+        self.record('prompt', prompt=prompt, **fields)
+
+    def record(self, event: str, level: str = 'INFO', **fields: Any) -> None:
+        """Queue an entry; cheap, and a no-op when disabled or below the level."""
+        if not self.enabled or LEVELS[level] < self.level:
+            return
+
+        entry = {'ts': time.time(), 'level': level, 'event': event, 'request': self.request_id}
+        entry.update(fields)
+        if self._block:
+            self._queue.put(entry)
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # Not locked: an occasional lost increment only skews the count
+            self.dropped += 1
+
+    def is_enabled_for(self, level: str) -> bool:
+        return self.enabled and LEVELS[level] >= self.level
+
+    def close(self) -> None:
+        """Write everything still queued and stop the writer."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._queue.put(_STOP)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _run(self, writer: 'RotatingWriter') -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is waiting, so one flush covers many entries
+            try:
+                while len(batch) < 1000:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            stop = any(entry is _STOP for entry in batch)
+            lines = [json.dumps(entry, default=str) for entry in batch if entry is not _STOP]
+            if stop and self.dropped:
+                lines.append(json.dumps({
+                    'ts': time.time(), 'level': 'WARNING', 'event': 'dropped',
+                    'request': None, 'count': self.dropped,
+                }))
+
+            try:
+                writer.write(lines)
+            except OSError:
+                # Auditing must never break the command line tool itself
+                pass
+
+            if stop:
+                writer.close()
+                return
+
+
+class RotatingWriter:
+    """Appends lines to a file and rotates it once it exceeds ``max_bytes``.
+
+    Rotated files are renamed to ``.1`` .. ``.N`` (gzip-compressed as
+    ``.1.gz`` .. when ``compress`` is set), dropping the oldest beyond
+    ``backup_count``.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, backup_count: int, compress: bool):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self._file: Optional[TextIO] = None
+
+    def write(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # Prompts and command output may be sensitive
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            self._file = open(fd, 'a', encoding='utf-8')
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self) -> None:
+        self.close()
+        suffix = '.gz' if self.compress else ''
+
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = self._backup(index, suffix)
+                if source.exists():
+                    os.replace(source, self._backup(index + 1, suffix))
+
+            first = self._backup(1, '')
+            os.replace(self.path, first)
+            if self.compress:
+                import gzip
+                import shutil
+                # Created private like the log itself, gzip.open would use the umask
+                fd = os.open(self._backup(1, suffix), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with open(first, 'rb') as src, open(fd, 'wb') as raw, \
+                        gzip.GzipFile(fileobj=raw, mode='wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                first.unlink()
+        else:
+            self.path.unlink()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _backup(self, index: int, suffix: str) -> Path:
+        return self.path.with_name(f"{self.path.name}.{index}{suffix}")
+
+
+# Shared by every module, configured from the logging section
+audit = AuditLog()
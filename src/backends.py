@@ -0,0 +1,236 @@
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import yaml
+
+from startup import profile
+
+# Backends ModelManager can load; both expose the subset of the
+# llama_cpp.Llama interface that the manager uses:
+#   __call__(prompt, max_tokens=, stop=, stream=, stopping_criteria=, ...)
+#       -> completion dict or chunk iterator
+#   tokenize(text: bytes, add_bos=True) -> List[int]
+#   eval(tokens), reset(), save_state(), load_state(state)
+#   n_tokens, input_ids, n_ctx(), n_vocab(), token_eos(), token_bos()
+BACKENDS = ('llama', 'stub')
+
+# First bytes of every GGUF file
+GGUF_MAGIC = b'GGUF'
+
+# Pieces the stub tokenizer splits text into: words, spaces, other characters
+_PIECES = re.compile(r'\w+|\s+|[^\w\s]')
+
+
+def needs_model_file(config: Dict[str, Any]) -> bool:
+    """Whether the configured backend loads weights from a GGUF file."""
+    return bool(config.get('backend', 'llama') == 'llama')
+
+
+def load_backend(config: Dict[str, Any], model_file: Optional[Path]) -> Any:
+    """Create the model object for the backend configured under ``model.backend``."""
+    backend = config.get('backend', 'llama')
+    if backend == 'stub':
+        return StubModel(config.get('stub') or {}, config.get('n_ctx', 2048))
+    if backend == 'llama':
+        if model_file is None:
+            raise ValueError("The llama backend needs a model file")
+        return _load_llama(config, model_file)
+    raise ValueError(f"Unknown model backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+
+def _load_llama(config: Dict[str, Any], model_file: Path) -> Any:
+    with open(model_file, 'rb') as f:
+        if f.read(len(GGUF_MAGIC)) != GGUF_MAGIC:
+            raise RuntimeError(
+                f"{model_file} is not a GGUF model, the download may be corrupt\n"
+                "Download it again with: orcas --download-model"
+            )
+
+    try:
+        with profile.phase('import', 'llama_cpp'):
+            from llama_cpp import Llama
+    except ImportError:
+        raise RuntimeError(
+            "llama-cpp-python is not installed\n"
+            "Install it with: pip install llama-cpp-python"
+        )
+
+    try:
+        # Suppress stderr noise during model load
+        with open(os.devnull, "w") as devnull:
+            old_stderr = sys.stderr
+            sys.stderr = devnull
+            try:
+                with profile.phase('init', f'model {model_file.name}'):
+                    return Llama(
+                        model_path=str(model_file),
+                        n_ctx=config.get("n_ctx", 2048),
+                        n_gpu_layers=config.get("n_gpu_layers", 0),
+                        # Weights stay in the page cache, so a reload is cheap
+                        use_mmap=config.get("use_mmap", True),
+                        verbose=False,
+                    )
+            finally:
+                sys.stderr = old_stderr
+    except Exception as e:
+        raise RuntimeError(f"Failed to load model: {e}")
+
+
+class StubModel:
+    """Deterministic stand-in for a llama.cpp model that replays canned responses.
+
+    The response is chosen by the request on the last ``User:`` line of the
+    prompt, looked up in ``responses`` (a mapping) and ``responses_file``
+    (YAML mapping or JSON lines of ``{request, response}``), falling back to
+    ``default``. A list of responses stands for different samples: a
+    completion with ``seed=n`` gets entry ``n`` (modulo the list length),
+    one without a seed the first. Tokens are words, runs of spaces and single symbols, so
+    token counts are stable across runs. ``load_ms``, ``prompt_ms_per_token``
+    and ``ms_per_token`` simulate loading, prompt evaluation and generation.
+    """
+
+    N_VOCAB = 32000
+    BOS = 1
+    EOS = 2
+
+    def __init__(self, config: Dict[str, Any], n_ctx: int = 2048):
+        self.config = config
+        self._n_ctx = n_ctx
+        self.responses: Dict[str, Any] = {}
+        if config.get('responses_file'):
+            responses_file = Path(os.path.expanduser(config['responses_file']))
+            self.responses.update(_read_responses(responses_file))
+        self.responses.update(config.get('responses') or {})
+        self.default = config.get('default', 'ls -lhS')
+        self.prompt_delay = config.get('prompt_ms_per_token', 0) / 1000
+        self.token_delay = config.get('ms_per_token', 0) / 1000
+        self.input_ids: List[int] = []
+        self.n_tokens = 0
+        # Set by ModelManager when drafting; canned output does not use it
+        self.draft_model: Optional[Any] = None
+
+        if config.get('load_ms'):
+            time.sleep(config['load_ms'] / 1000)
+
+    def n_ctx(self) -> int:
+        return self._n_ctx
+
+    def n_vocab(self) -> int:
+        return self.N_VOCAB
+
+    def token_bos(self) -> int:
+        return self.BOS
+
+    def token_eos(self) -> int:
+        return self.EOS
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False) -> List[int]:
+        tokens = [self.BOS] if add_bos else []
+        for piece in _PIECES.findall(text.decode('utf-8', errors='replace')):
+            tokens.append(zlib.crc32(piece.encode('utf-8')) % (self.N_VOCAB - 3) + 3)
+        return tokens
+
+    def reset(self) -> None:
+        self.n_tokens = 0
+
+    def eval(self, tokens: List[int]) -> None:
+        if self.prompt_delay:
+            time.sleep(self.prompt_delay * len(tokens))
+        del self.input_ids[self.n_tokens:]
+        self.input_ids.extend(tokens)
+        self.n_tokens = len(self.input_ids)
+
+    def save_state(self) -> tuple:
+        return tuple(self.input_ids[:self.n_tokens])
+
+    def load_state(self, state: tuple) -> None:
+        self.input_ids = list(state)
+        self.n_tokens = len(self.input_ids)
+
+    def close(self) -> None:
+        pass
+
+    def __call__(
+            self,
+            prompt: str,
+            max_tokens: int = 256,
+            stop: Optional[List[str]] = None,
+            stream: bool = False,
+            seed: Optional[int] = None,
+            stopping_criteria: Optional[Callable[[List[int], Any], bool]] = None,
+            **kwargs: Any
+    ) -> Any:
+        prompt_tokens = self.tokenize(prompt.encode('utf-8'))
+
+        # Like llama.cpp, only the part after the shared context is evaluated
+        common = 0
+        for old, new in zip(self.input_ids[:self.n_tokens], prompt_tokens):
+            if old != new:
+                break
+            common += 1
+        self.n_tokens = common
+        self.eval(prompt_tokens[common:])
+
+        pieces = self._completion(prompt, max_tokens, stop or [], seed)
+        if stream:
+            return self._stream(pieces, stopping_criteria)
+
+        emitted = []
+        for piece in pieces:
+            self._emit(piece)
+            emitted.append(piece)
+            if stopping_criteria is not None and stopping_criteria(self.input_ids, None):
+                break
+        return {
+            'choices': [{'text': ''.join(emitted), 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': len(prompt_tokens), 'completion_tokens': len(emitted)},
+        }
+
+    def _completion(
+            self,
+            prompt: str,
+            max_tokens: int,
+            stop: List[str],
+            seed: Optional[int] = None
+    ) -> List[str]:
+        """Token pieces of the canned response, cut at a stop string or max_tokens."""
+        users = re.findall(r'^User: (.*)$', prompt, re.MULTILINE)
+        text = self.responses.get(users[-1].strip() if users else '', self.default)
+        if isinstance(text, list):
+            text = text[(seed or 0) % len(text)] if text else ''
+        for stop_string in stop:
+            if stop_string in text:
+                text = text[:text.index(stop_string)]
+        return _PIECES.findall(text)[:max_tokens]
+
+    def _stream(
+            self,
+            pieces: List[str],
+            stopping_criteria: Optional[Callable[[List[int], Any], bool]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        for piece in pieces:
+            self._emit(piece)
+            yield {'choices': [{'text': piece, 'finish_reason': None}]}
+            if stopping_criteria is not None and stopping_criteria(self.input_ids, None):
+                return
+
+    def _emit(self, piece: str) -> None:
+        if self.token_delay:
+            time.sleep(self.token_delay)
+        del self.input_ids[self.n_tokens:]
+        self.input_ids.extend(self.tokenize(piece.encode('utf-8'), add_bos=False))
+        self.n_tokens = len(self.input_ids)
+
+
+def _read_responses(path: Path) -> Dict[str, str]:
+    with open(path, 'r') as f:
+        if path.suffix == '.jsonl':
+            entries = [json.loads(line) for line in f if line.strip()]
+            return {entry['request']: entry['response'] for entry in entries}
+        return yaml.safe_load(f) or {}
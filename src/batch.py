@@ -0,0 +1,112 @@
+import json
+import time
+from typing import Any, Dict, Optional, TextIO
+
+from command_parser import Parser
+from audit import audit
+from security import SecurityValidator
+from tracing import tracer
+
+
+def run_batch(
+        source: TextIO,
+        output: TextIO,
+        parser: Parser,
+        validator: SecurityValidator
+) -> Dict[str, int]:
+    """Parse one prompt per input line and write one JSON record per prompt.
+
+    Nothing is executed. Blank lines and lines starting with '#' are skipped.
+    Input is read and output is written one line at a time, so memory use
+    does not grow with the size of the batch.
+    """
+    summary = {
+        'prompts': 0, 'errors': 0, 'blocked': 0,
+        'tokens_prompt': 0, 'tokens_generated': 0, 'tokens_kept': 0,
+        'draft_proposed': 0, 'draft_accepted': 0,
+    }
+
+    for line in source:
+        prompt = line.strip()
+        if not prompt or prompt.startswith('#'):
+            continue
+
+        audit.begin_request(prompt, batch=True)
+        with tracer.span('request'):
+            record = process_prompt(prompt, parser, validator)
+        audit.record(
+            'commands', level='INFO' if record['allowed'] else 'WARNING',
+            commands=record['commands'], allowed=record['allowed'], error=record['error'])
+
+        summary['prompts'] += 1
+        if record['error']:
+            summary['errors'] += 1
+        elif not record['allowed']:
+            summary['blocked'] += 1
+        if record['tokens']:
+            summary['tokens_prompt'] += record['tokens']['prompt']
+            summary['tokens_generated'] += record['tokens']['generated']
+            summary['tokens_kept'] += record['tokens']['kept']
+            draft = record['tokens'].get('draft')
+            if draft:
+                summary['draft_proposed'] += draft['proposed']
+                summary['draft_accepted'] += draft['accepted']
+
+        output.write(json.dumps(record) + '\n')
+        output.flush()
+
+    return summary
+
+
+def process_prompt(
+        prompt: str,
+        parser: Parser,
+        validator: SecurityValidator
+) -> Dict[str, Any]:
+    """Build the JSON record for a single prompt."""
+    record: Dict[str, Any] = {
+        'prompt': prompt,
+        'commands': [],
+        'allowed': False,
+        'error': None,
+        'timings': {},
+        # Generated vs kept tokens, None when served from the cache
+        'tokens': None,
+    }
+
+    started = time.perf_counter()
+    try:
+        commands = parser.parse(prompt)
+    except Exception as e:
+        record['error'] = str(e)
+        record['timings']['total_ms'] = _elapsed_ms(started)
+        return record
+
+    parsed = time.perf_counter()
+    record['tokens'] = parser.last_usage
+
+    for cmd in commands:
+        reason = validator.check(cmd)
+        record['commands'].append({
+            'command': cmd.command,
+            'risk_level': cmd.risk_level,
+            'requires_sudo': cmd.requires_sudo,
+            'allowed': reason is None,
+            'reason': reason,
+        })
+
+    record['allowed'] = bool(commands) and all(cmd['allowed'] for cmd in record['commands'])
+    if not commands:
+        record['error'] = 'Could not generate valid commands'
+
+    record['timings'] = {
+        'parse_ms': _elapsed_ms(started, parsed),
+        'validate_ms': _elapsed_ms(parsed),
+        'total_ms': _elapsed_ms(started),
+    }
+    return record
+
+
+def _elapsed_ms(start: float, end: Optional[float] = None) -> float:
+    end = time.perf_counter() if end is None else end
+    return round((end - start) * 1000, 3)
@@ -1,17 +1,44 @@
+# Imported first so that the startup profile covers the imports below
+from startup import profile
+from audit import audit
+from tracing import tracer
+
 import click
 import sys
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Optional
-from rich.console import Console
-from rich.panel import Panel
+from typing import Any, Callable, List, Optional, TextIO, Tuple, TYPE_CHECKING
+
+# Subsystems are imported where they are first needed, so that --version,
+# usage errors and cache hits do not pay for llama.cpp, rich or SQLite
+if TYPE_CHECKING:
+    from command_parser import Command, CommandParser, Parser
+    from daemon import DaemonClient
+    from executor import CommandExecutor
+    from history import CommandHistory
+    from security import SecurityValidator
+    from session import Conversation
+
+
+class _LazyConsole:
+    """Rich console created on first use."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        self._kwargs = kwargs
+        self._console: Any = None
 
-from config import load_config
-from model_manager import ModelManager
-from command_parser import CommandParser
-from executor import CommandExecutor
-from security import SecurityValidator
+    def __getattr__(self, name: str) -> Any:
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console(**self._kwargs)
+        return getattr(self._console, name)
 
-console = Console()
+
+console = _LazyConsole()
+# Batch records go to stdout, so progress and summaries go to stderr
+err_console = _LazyConsole(stderr=True)
 
 
 @click.command()
@@ -19,80 +46,369 @@ console = Console()
 @click.option('--interactive', '-i', is_flag=True, help='Start interactive mode')
 @click.option('--dry-run', '-d', is_flag=True, help='Show commands without executing')
 @click.option('--config', '-c', type=click.Path(), help='Path to config file')
+@click.option('--batch', type=click.File('r'), metavar='FILE|-',
+              help='Read prompts line by line and write JSON lines (never executes)')
+@click.option('--output', '-o', type=click.File('w'), default='-',
+              help='Output file for --batch records')
 @click.option('--download-model', is_flag=True, help='Download default model')
+@click.option('--serve', is_flag=True, help='Run the inference daemon in the foreground')
+@click.option('--stop-daemon', is_flag=True, help='Stop a running inference daemon')
+@click.option('--no-cache', is_flag=True, help='Bypass the prompt result cache')
+@click.option('--no-history', is_flag=True, help='Do not offer or record accepted commands')
+@click.option('--cache-stats', is_flag=True, help='Show prompt result cache statistics')
+@click.option('--startup-profile', is_flag=True,
+              help='Report import and initialization time per module')
+@click.option('--profile', 'profile_stages', is_flag=True,
+              help='Report time per pipeline stage and token throughput')
+@click.option('--trace', 'trace_file', type=click.Path(), metavar='FILE',
+              help='Write a Chrome trace (or JSON lines for .jsonl) of the stages')
 @click.option('--version', is_flag=True, help='Show version')
 def main(
         prompt: tuple,
         interactive: bool,
         dry_run: bool,
         config: Optional[str],
+        batch: Optional[TextIO],
+        output: TextIO,
         download_model: bool,
+        serve: bool,
+        stop_daemon: bool,
+        no_cache: bool,
+        no_history: bool,
+        cache_stats: bool,
+        startup_profile: bool,
+        profile_stages: bool,
+        trace_file: Optional[str],
         version: bool
 ) -> None:
     """Orcas - Transform natural language into bash commands."""
 
+    profile.mark('import', 'cli')
+
     if version:
-        console.print("🐋 Orcas v0.1.0")
+        click.echo("🐋 Orcas v0.1.0")
         return
 
+    if startup_profile:
+        # Registered first so it runs after executor.close() and other cleanup
+        click.get_current_context().call_on_close(show_startup_profile)
+
     if download_model:
         import subprocess
         subprocess.run([sys.executable, "scripts/download_model.py"])
         return
 
     config_path = Path(config) if config else None
-    cfg = load_config(config_path)
+    with profile.phase('import', 'config'):
+        from config import load_config
+    with profile.phase('init', 'config'):
+        cfg = load_config(config_path)
+    daemon_cfg = cfg.get('daemon', {})
+
+    profiling_cfg = cfg.get('profiling', {})
+    trace_file = trace_file or profiling_cfg.get('trace_file')
+    if profile_stages or trace_file or profiling_cfg.get('enabled', False):
+        tracer.enable()
+        click.get_current_context().call_on_close(lambda: show_trace(trace_file))
+
+    if stop_daemon:
+        from daemon import DaemonClient
+        if DaemonClient(daemon_cfg).shutdown():
+            console.print("✓ Daemon stopped", style="green")
+        else:
+            console.print("✗ No daemon is running", style="yellow")
+        return
+
+    if cache_stats:
+        show_cache_stats(cfg.get('cache', {}))
+        return
+
+    if serve:
+        run_daemon(cfg)
+        return
+
+    if not (batch or interactive or prompt):
+        console.print("Error: Please provide a command or use --interactive", style="red")
+        console.print("\nUsage: orcas <prompt> | --interactive")
+        sys.exit(1)
+
+    audit.configure(cfg.get('logging', {}))
 
     try:
-        model_manager = ModelManager(cfg['model'])
-        command_parser = CommandParser(model_manager)
-        security_validator = SecurityValidator(cfg['security'])
-        executor = CommandExecutor(cfg['execution'], security_validator)
+        with profile.phase('import', 'security'):
+            from security import SecurityValidator
+        with profile.phase('init', 'security policy'):
+            security_validator = SecurityValidator(cfg['security'])
+        daemon_client = connect_daemon(daemon_cfg, config_path, use_cache=not no_cache)
+        # Sessions replay history into the live model context, so they need it in-process
+        local_parser: Optional['CommandParser'] = None
+        if daemon_client is not None:
+            command_parser: 'Parser' = daemon_client
+        else:
+            local_parser = build_parser(cfg, security_validator, use_cache=not no_cache)
+            command_parser = local_parser
+        with profile.phase('import', 'executor'):
+            from executor import CommandExecutor
+        with profile.phase('init', 'executor'):
+            executor = CommandExecutor(cfg['execution'], security_validator)
     except Exception as e:
         console.print(f"✗ Initialization failed: {e}", style="red")
         sys.exit(1)
 
-    if interactive:
-        run_interactive_mode(command_parser, executor, dry_run)
+    if batch:
+        from batch import run_batch
+        started = time.perf_counter()
+        summary = run_batch(batch, output, command_parser, security_validator)
+        elapsed = time.perf_counter() - started
+        err_console.print(
+            f"Processed {summary['prompts']} prompt(s) in {elapsed:.2f}s "
+            f"({summary['errors']} failed, {summary['blocked']} blocked)"
+        )
+        if summary['tokens_generated']:
+            err_console.print(
+                f"Tokens: {summary['tokens_prompt']} prompt, "
+                f"{summary['tokens_generated']} generated, "
+                f"{summary['tokens_kept']} kept in commands"
+            )
+        if summary['draft_proposed']:
+            rate = summary['draft_accepted'] / summary['draft_proposed'] * 100
+            err_console.print(
+                f"Speculative decoding: {summary['draft_accepted']}/{summary['draft_proposed']} "
+                f"drafted tokens accepted ({rate:.1f}%)"
+            )
         return
 
-    if not prompt:
-        console.print("Error: Please provide a command or use --interactive", style="red")
-        console.print("\nUsage: orcas <prompt> | --interactive")
+    history = None
+    history_cfg = cfg.get('history', {})
+    if history_cfg.get('enabled', True) and not no_history:
+        from history import CommandHistory
+        with profile.phase('init', 'history'):
+            history = CommandHistory(history_cfg)
+
+    try:
+        if interactive:
+            session = None
+            session_cfg = cfg.get('session', {})
+            if local_parser is not None and session_cfg.get('enabled', True):
+                from session import Conversation
+                session = Conversation(local_parser, session_cfg)
+            run_interactive_mode(command_parser, executor, dry_run, history, session)
+            return
+
+        user_input = ' '.join(prompt)
+        process_command(user_input, command_parser, executor, dry_run, history)
+    finally:
+        executor.close()
+
+
+def build_parser(
+        cfg: dict,
+        security_validator: 'SecurityValidator',
+        use_cache: bool = True
+) -> 'CommandParser':
+    """Build an in-process command parser; the model loads on first generation."""
+
+    with profile.phase('import', 'command_parser'):
+        from command_parser import CommandParser
+        from inference_worker import create_model_manager
+
+    cache_cfg = cfg.get('cache', {})
+    cache = None
+    if use_cache and cache_cfg.get('enabled', True):
+        with profile.phase('import', 'result_cache'):
+            from result_cache import ResultCache
+        with profile.phase('init', 'result cache'):
+            cache = ResultCache(cache_cfg)
+
+    model_cfg = cfg['model']
+    router = None
+    if (model_cfg.get('pool') or {}).get('models'):
+        from model_pool import ModelPool, ModelRouter
+        pool = ModelPool(model_cfg)
+        router = ModelRouter(pool, model_cfg.get('router') or {})
+        model_manager = pool.managers[model_cfg['name']]
+    else:
+        model_manager = create_model_manager(model_cfg)
+
+    # Retrieved examples replace the static ones once a library file exists
+    examples_cfg = cfg.get('examples', {})
+    examples = None
+    files = [f for f in examples_cfg.get('files', []) if Path(f).expanduser().exists()]
+    if files:
+        from examples import ExampleLibrary
+        examples = ExampleLibrary(files)
+
+    return CommandParser(
+        model_manager,
+        cache=cache,
+        validator=security_validator,
+        max_commands=cfg['execution'].get('max_commands_per_request'),
+        use_grammar=model_cfg.get('grammar', False),
+        router=router,
+        examples=examples,
+        examples_k=examples_cfg.get('top_k', 3),
+        candidates=model_cfg.get('candidates'),
+    )
+
+
+def show_cache_stats(cache_cfg: dict) -> None:
+    """Print prompt result cache statistics."""
+    from result_cache import ResultCache
+
+    stats = ResultCache(cache_cfg).stats()
+    lookups = stats['hits'] + stats['misses']
+    hit_rate = stats['hits'] / lookups * 100 if lookups else 0.0
+
+    console.print(f"Entries: {stats['entries']}")
+    console.print(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {hit_rate:.1f}%")
+
+
+def run_daemon(cfg: dict) -> None:
+    """Load the model once and serve parse requests over a Unix socket."""
+    from daemon import InferenceDaemon
+    from security import SecurityValidator
+
+    try:
+        command_parser = build_parser(cfg, SecurityValidator(cfg['security']))
+        command_parser.warm_up()
+        daemon = InferenceDaemon(cfg.get('daemon', {}), command_parser)
+    except Exception as e:
+        console.print(f"✗ Initialization failed: {e}", style="red")
+        sys.exit(1)
+
+    console.print(f"🐋 Orcas daemon listening on {daemon.socket_path}", style="cyan")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        console.print(f"✗ Daemon failed: {e}", style="red")
         sys.exit(1)
 
-    user_input = ' '.join(prompt)
-    process_command(user_input, command_parser, executor, dry_run)
+
+def connect_daemon(
+        daemon_cfg: dict,
+        config_path: Optional[Path],
+        use_cache: bool = True
+) -> Optional['DaemonClient']:
+    """Return a client for a running daemon, or None to load the model in-process."""
+
+    if not daemon_cfg.get('enabled', False):
+        return None
+
+    with profile.phase('import', 'daemon'):
+        from daemon import DaemonClient
+
+    client = DaemonClient(daemon_cfg, use_cache=use_cache)
+    if client.available() and client.ping():
+        return client
+
+    if daemon_cfg.get('auto_spawn', False):
+        with console.status("Starting Orcas daemon..."):
+            if client.spawn(config_path):
+                return client
+
+    # Fall back to loading the model in this process
+    return None
 
 
 def process_command(
         user_input: str,
-        parser: CommandParser,
-        executor: CommandExecutor,
-        dry_run: bool
+        parser: 'Parser',
+        executor: 'CommandExecutor',
+        dry_run: bool,
+        history: Optional['CommandHistory'] = None,
+        wait_for_model: Optional[Callable[[], bool]] = None,
+        session: Optional['Conversation'] = None
 ) -> None:
     """Process a single natural language command."""
 
     try:
-        # Parse natural language to commands
-        commands = parser.parse(user_input)
-        if not commands:
-            console.print("✗ Could not generate valid commands", style="red")
-            return
+        with tracer.span('request'):
+            run_request(user_input, parser, executor, dry_run, history, wait_for_model, session)
+
+    except KeyboardInterrupt:
+        console.print("\n\n✗ Cancelled by user", style="yellow")
+    except Exception as e:
+        console.print(f"\n✗ Error: {e}", style="red")
+
+
+def run_request(
+        user_input: str,
+        parser: 'Parser',
+        executor: 'CommandExecutor',
+        dry_run: bool,
+        history: Optional['CommandHistory'],
+        wait_for_model: Optional[Callable[[], bool]],
+        session: Optional['Conversation'] = None
+) -> None:
+    """Generate, confirm and execute the commands for one prompt."""
+
+    audit.begin_request(user_input, dry_run=dry_run)
+    # Like the result cache, history only answers prompts that stand on
+    # their own; a follow-up such as "now delete them" depends on the session
+    if session and session.turns:
+        history = None
 
-        # Display commands
-        console.print(f"Generated {len(commands)} command(s):")
-        for i, cmd in enumerate(commands, 1):
-            style = "yellow" if cmd.requires_sudo else "green"
-            sudo_prefix = "[red]sudo[/red] " if cmd.requires_sudo else ""
-            console.print(f"  {i}. {sudo_prefix}[{style}]{cmd.command}[/{style}]")
+    commands = None
+    declined = False
+    if history:
+        commands, declined = offer_from_history(user_input, history, parser, executor, dry_run)
+    source = 'history'
 
-        if dry_run:
-            console.print("\n[yellow]Dry run - no commands executed[/yellow]")
+    if commands is None:
+        if wait_for_model is not None and not wait_for_model():
             return
 
-        # Execute commands
-        executor.execute_commands(commands)
+        # Display and check commands while later ones are still generated;
+        # after a declined offer the result cache would repeat the same commands
+        commands = []
+        use_cache = not declined
+        stream = session.parser.parse_iter(user_input, use_cache, session.context()) \
+            if session else parser.parse_iter(user_input, use_cache)
+        for cmd in stream:
+            if not commands:
+                console.print("Generated command(s):")
+            commands.append(cmd)
+            show_command(len(commands), cmd, executor)
+        # The parser reports no token usage for answers from its result cache
+        source = 'model' if parser.last_usage is not None else 'cache'
+
+        if parser.needs_alternative():
+            with console.status("Sampling alternatives..."):
+                alternative = parser.next_alternative(better_only=True)
+            if alternative:
+                source = 'alternative'
+                title = "Using an alternative instead:" if commands else "Generated command(s):"
+                show_commands(title, alternative, executor)
+                commands = alternative
+
+    finish_request(user_input, commands, source, executor, dry_run, history, session)
+
+
+def run_alternative(
+        parser: 'Parser',
+        executor: 'CommandExecutor',
+        dry_run: bool,
+        history: Optional['CommandHistory'] = None,
+        session: Optional['Conversation'] = None
+) -> None:
+    """Offer another sampled answer to the last request generated by the model."""
+
+    try:
+        with tracer.span('request'):
+            with console.status("Sampling alternatives..."):
+                commands = parser.next_alternative()
+            request = parser.last_request
+            if commands is None or request is None:
+                console.print("✗ No other commands for the last request", style="yellow")
+                return
+
+            audit.begin_request(request, dry_run=dry_run, alternative=True)
+            show_commands(f"Alternative for \"{request}\":", commands, executor)
+            if parser.last_context:
+                history = None
+            finish_request(request, commands, 'alternative', executor, dry_run, history, session)
 
     except KeyboardInterrupt:
         console.print("\n\n✗ Cancelled by user", style="yellow")
@@ -100,17 +416,124 @@ def process_command(
         console.print(f"\n✗ Error: {e}", style="red")
 
 
-def run_interactive_mode(
-        parser: CommandParser,
-        executor: CommandExecutor,
+def finish_request(
+        user_input: str,
+        commands: List['Command'],
+        source: str,
+        executor: 'CommandExecutor',
+        dry_run: bool,
+        history: Optional['CommandHistory'],
+        session: Optional['Conversation']
+) -> None:
+    """Confirm and execute the commands chosen for a prompt and remember the outcome."""
+
+    audit.record('commands', source=source, commands=[
+        {'command': cmd.command, 'risk_level': cmd.risk_level, 'requires_sudo': cmd.requires_sudo}
+        for cmd in commands
+    ])
+
+    if not commands:
+        console.print("✗ Could not generate valid commands", style="red")
+        return
+
+    if dry_run:
+        console.print("\n[yellow]Dry run - no commands executed[/yellow]")
+        if session:
+            session.add(user_input, commands)
+        return
+
+    # Execute commands
+    results = executor.execute_commands(commands)
+    if session:
+        session.add(user_input, commands, results)
+
+    # Remember answers that were run in full and succeeded
+    if history and len(results) == len(commands) and all(r.success for r in results):
+        history.record(user_input, commands)
+
+
+def show_commands(title: str, commands: List['Command'], executor: 'CommandExecutor') -> None:
+    console.print(title)
+    for i, cmd in enumerate(commands, 1):
+        show_command(i, cmd, executor)
+
+
+def show_command(index: int, cmd: 'Command', executor: 'CommandExecutor') -> None:
+    style = "yellow" if cmd.requires_sudo else "green"
+    sudo_prefix = "[red]sudo[/red] " if cmd.requires_sudo else ""
+    blocked = "" if executor.security.validate(cmd) else " [red](blocked)[/red]"
+    console.print(f"  {index}. {sudo_prefix}[{style}]{cmd.command}[/{style}]{blocked}")
+
+
+def offer_from_history(
+        user_input: str,
+        history: 'CommandHistory',
+        parser: 'Parser',
+        executor: 'CommandExecutor',
         dry_run: bool
+) -> Tuple[Optional[List['Command']], bool]:
+    """Offer the commands of a similar past prompt.
+
+    Returns the commands to use, or None to ask the model, and whether the
+    user declined the offer.
+    """
+
+    with tracer.span('history lookup'):
+        match = history.lookup(user_input, parser.analyze)
+    if match is None:
+        return None, False
+    commands: List['Command'] = match.commands
+
+    # The policy may have changed since the commands were accepted
+    if not all(executor.security.validate(cmd) for cmd in commands):
+        history.forget(match.entry_id)
+        return None, False
+
+    show_commands(f"From history ({match.similarity:.0%} match for \"{match.prompt}\"):",
+                  commands, executor)
+
+    if dry_run:
+        return commands, False
+
+    # Similar prompts can still ask for something else, so reuse is opt-in
+    from rich.prompt import Confirm
+    if not Confirm.ask("Use these commands? (no asks the model)", default=False):
+        return None, True
+    return commands, False
+
+
+def run_interactive_mode(
+        parser: 'Parser',
+        executor: 'CommandExecutor',
+        dry_run: bool,
+        history: Optional['CommandHistory'] = None,
+        session: Optional['Conversation'] = None
 ) -> None:
-    """Run Orcas in interactive mode."""
+    """Run Orcas in interactive mode.
+
+    The prompt shows up right away while the model loads in the background;
+    the first request waits until it is ready. With a session, requests can
+    refer to earlier ones ("now compress those").
+    """
+    from rich.panel import Panel
+
+    ready: Optional[Future] = start_warm_up(parser)
+
+    def wait_for_model() -> bool:
+        # Answers from history do not need the model, so only generation waits
+        nonlocal ready
+        if ready is None:
+            return True
+        loaded = wait_for_warm_up(ready)
+        ready = None
+        return loaded
 
     console.print(Panel.fit(
         "[cyan]Orcas Interactive Mode[/cyan]\n"
         "Type your commands in natural language\n"
-        "Type 'exit' or 'quit' to leave",
+        "Type 'alt' for other commands for the last request\n"
+        + ("Type 'reset' to start a new conversation\n" if session else "")
+        + "Type 'exit' or 'quit' to leave",
         border_style="cyan"
     ))
 
@@ -125,7 +548,17 @@ def run_interactive_mode(
                 console.print("Goodbye!", style="cyan")
                 break
 
-            process_command(user_input, parser, executor, dry_run)
+            if session and user_input.lower() == 'reset':
+                session.clear()
+                console.print("Started a new conversation", style="cyan")
+                continue
+
+            if user_input.lower() == 'alt':
+                if wait_for_model():
+                    run_alternative(parser, executor, dry_run, history, session)
+                continue
+
+            process_command(user_input, parser, executor, dry_run, history, wait_for_model, session)
 
         except KeyboardInterrupt:
             console.print("\nGoodbye!", style="cyan")
@@ -134,5 +567,69 @@ def run_interactive_mode(
             break
 
 
+def start_warm_up(parser: 'Parser') -> Future:
+    """Load the model and evaluate the prompt prefix on a background thread."""
+
+    ready: Future = Future()
+
+    def warm_up() -> None:
+        try:
+            parser.warm_up()
+        except BaseException as e:
+            ready.set_exception(e)
+        else:
+            ready.set_result(None)
+
+    # A daemon thread, so quitting during the load does not wait for it
+    threading.Thread(target=warm_up, name='orcas-warm-up', daemon=True).start()
+    return ready
+
+
+def wait_for_warm_up(ready: Future) -> bool:
+    """Wait for the background warm-up, returning whether the model is usable."""
+
+    if not ready.done():
+        with console.status("Loading model..."), tracer.span('model wait'):
+            ready.exception()
+
+    error = ready.exception()
+    if error is not None:
+        console.print(f"✗ Model failed to load: {error}", style="red")
+        return False
+    return True
+
+
+def show_startup_profile() -> None:
+    """Print the startup profile to stderr."""
+
+    err_console.print("\n[bold]Startup profile[/bold] (imports include what they pull in)")
+    for kind, name, ms in profile.records:
+        err_console.print(f"  {kind:<7} {name:<32} {ms:9.1f} ms")
+    err_console.print(f"  {'total run time':<40} {profile.elapsed_ms():9.1f} ms")
+
+
+def show_trace(trace_file: Optional[str]) -> None:
+    """Print time per pipeline stage to stderr and write the trace file, if any."""
+
+    err_console.print("\n[bold]Profile[/bold] (stages nest, e.g. request includes all others)")
+    for name, calls, ms in tracer.breakdown():
+        err_console.print(f"  {name:<24} {calls:>5}x {ms:11.1f} ms")
+
+    tokens = tracer.tokens()
+    if tokens:
+        err_console.print(
+            f"  tokens: {tokens['tokens_in']} in, {tokens['tokens_out']} out, "
+            f"{tokens['tokens_per_sec']:.1f} tokens/s generated"
+        )
+
+    if trace_file:
+        try:
+            tracer.write(trace_file)
+        except OSError as e:
+            err_console.print(f"✗ Could not write trace: {e}", style="red")
+            return
+        err_console.print(f"  trace written to {trace_file}")
+
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,7 +1,18 @@
+import hashlib
 import re
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, TYPE_CHECKING
+from examples import BUILTIN_EXAMPLES, format_examples
+from grammar import command_grammar
 from model_manager import ModelManager
+from shell_ast import ShellCommand, parse_shell
+from tracing import tracer
+
+if TYPE_CHECKING:
+    from examples import ExampleLibrary
+    from model_pool import ModelRouter
+    from result_cache import ResultCache
+    from security import SecurityValidator
 
 
 @dataclass
@@ -11,12 +22,64 @@ class Command:
     description: str
     requires_sudo: bool = False
     risk_level: str = "low"
+    ast: Optional[ShellCommand] = field(default=None, repr=False, compare=False)
+
+    def shell(self) -> ShellCommand:
+        """Lexed form of the command, parsed on first use."""
+        if self.ast is None:
+            self.ast = parse_shell(self.command)
+        return self.ast
+
+
+# Orders risk levels when ranking candidates, lower is better
+RISK_RANKS = {'low': 0, 'medium': 1, 'high': 2}
+
+
+@dataclass
+class Candidate:
+    """One sampled answer to a request and how well it came out."""
+    text: str
+    commands: List[str]
+    parsed: List[Command]
+    # Share of the output lines that became standalone commands
+    extracted: float
+    # Whether the security validator accepts every command
+    allowed: bool
+
+    @property
+    def complete(self) -> bool:
+        """Commands were produced, all lines were usable and nothing is blocked."""
+        return bool(self.parsed) and self.allowed and self.extracted == 1.0
+
+    def rank(self) -> tuple:
+        """Sort key, higher is better: usable first, then cleanly extracted, then low risk."""
+        worst_risk = max((RISK_RANKS.get(cmd.risk_level, 2) for cmd in self.parsed), default=2)
+        return bool(self.parsed) and self.allowed, self.extracted, -worst_risk, -len(self.parsed)
+
+
+class Parser(Protocol):
+    """What the CLI needs from a parser: a CommandParser or a DaemonClient."""
+    last_usage: Optional[Dict[str, Any]]
+    last_request: Optional[str]
+    last_context: str
+
+    def warm_up(self) -> None: ...
+
+    def parse(self, natural_language: str, use_cache: bool = True) -> List[Command]: ...
+
+    def parse_iter(self, natural_language: str, use_cache: bool = True) -> Iterator[Command]: ...
+
+    def analyze(self, command: str, description: str = '') -> Command: ...
+
+    def needs_alternative(self) -> bool: ...
+
+    def next_alternative(self, better_only: bool = False) -> Optional[List[Command]]: ...
 
 
 class CommandParser:
     """Parses natural language into bash commands using LLM."""
 
-    SYSTEM_PROMPT = """You are a bash command generator. Convert natural language requests into safe, single bash commands.
+    RULES_PROMPT = """You are a bash command generator. Convert natural language requests into safe, single bash commands.
 
 CRITICAL RULES:
 1. Generate ONLY ONE command per line
@@ -27,57 +90,397 @@ CRITICAL RULES:
 6. Output format: actual_command
 
 Examples:
-User: find large python files
-find . -name "*.py" -size +1M
-
-User: create backup and compress it
-cp -r documents documents_backup
-tar -czf documents_backup.tar.gz documents_backup
-
-User: list files sorted by size
-ls -lhS"""
-
-    def __init__(self, model_manager: ModelManager):
+"""
+
+    SYSTEM_PROMPT = RULES_PROMPT + format_examples(BUILTIN_EXAMPLES)
+
+    # Shared by every request, so its evaluated state can be cached
+    PROMPT_PREFIX = f"{SYSTEM_PROMPT}\n\n"
+
+    # Template used after the prefix, part of the result cache key
+    PROMPT_SUFFIX = "User: {request}\n"
+
+    XML_PATTERN = re.compile(r"<command>(.*?)</command>", re.DOTALL | re.IGNORECASE)
+
+    def __init__(
+            self,
+            model_manager: ModelManager,
+            cache: Optional['ResultCache'] = None,
+            validator: Optional['SecurityValidator'] = None,
+            max_commands: Optional[int] = None,
+            use_grammar: bool = False,
+            router: Optional['ModelRouter'] = None,
+            examples: Optional['ExampleLibrary'] = None,
+            examples_k: int = 3,
+            candidates: Optional[Dict[str, Any]] = None
+    ):
         self.model = model_manager
+        self.cache = cache
+        self.validator = validator
+        self.max_commands = max_commands
+        # Picks among pooled models per prompt; without one, self.model is used
+        self.router = router
+        self.model_key = '+'.join(router.pool.names) if router else model_manager.config['name']
+        # Constrains decoding to standalone commands, one per line
+        self.grammar = command_grammar(max_commands) if use_grammar else None
+        # With a library, only the rules stay in the cached prefix and the
+        # examples most relevant to each request follow them
+        self.examples = examples
+        self.examples_k = examples_k
+        self.prompt_prefix = self.RULES_PROMPT if examples else self.PROMPT_PREFIX
+        template = self.prompt_prefix + self.PROMPT_SUFFIX + (self.grammar or '')
+        if examples:
+            template += f"{examples.signature()}:{examples_k}"
+        self.template_hash = hashlib.sha256(template.encode('utf-8')).hexdigest()
+        # Tokens generated and kept by the last request, None for cache hits
+        self.last_usage: Optional[Dict[str, Any]] = None
+        # Answers sampled when the first one is unusable or another is asked for
+        candidates = candidates or {}
+        self.candidates = candidates.get('count', 3)
+        self.candidate_temperature = candidates.get('temperature', 0.7)
+        # The last request generated for, the answers shown for it and the
+        # ranked alternatives not shown yet (None until they are sampled)
+        self.last_request: Optional[str] = None
+        self.last_context = ''
+        self._last_model: Optional[str] = None
+        self._shown: List[Candidate] = []
+        self._alternatives: Optional[List[Candidate]] = None
+
+    @tracer.traced('warm up')
+    def warm_up(self) -> None:
+        """Evaluate the shared prompt prefix ahead of the first request.
+
+        With a router, the smallest model is warmed since most prompts go there.
+        """
+        model = self.router.pool.get(self.router.pool.names[0]) if self.router else self.model
+        model.warm_prefix(self.prompt_prefix)
+
+    def parse(
+            self,
+            natural_language: str,
+            use_cache: bool = True,
+            context: str = ''
+    ) -> List[Command]:
+        """Parse natural language into bash commands.
+
+        ``context`` holds earlier turns of a session; answers that depend on
+        it are neither served from nor stored in the result cache.
+        """
+
+        # Serve repeated requests from the result cache
+        self.last_usage = None
+        cache_key = self._cache_key(natural_language) if use_cache and not context else None
+        cached: Optional[List[Command]] = self._cached_commands(cache_key, natural_language)
+        if cached is not None:
+            self._remember_cached(natural_language, context, cached)
+            return cached
+
+        # Generate with each routed model until one produces usable commands
+        names = self._route(natural_language)
+        generated = 0
+        for index, name in enumerate(names):
+            model = self._model(name)
+            candidate = self._generate(model, natural_language, context)
+            generated += model.last_completion_tokens
+            if self._usable(candidate.parsed):
+                break
+
+        self._remember(natural_language, context, name, candidate)
+        sampled = 0
+        if self.needs_alternative():
+            # Resample from the evaluated prompt instead of handing back a
+            # blocked, partly chained or empty answer
+            generated += self._sample_alternatives(natural_language)
+            alternatives = self._alternatives or []
+            sampled = len(alternatives)
+            if alternatives and alternatives[0].rank() > candidate.rank():
+                candidate = alternatives.pop(0)
+                self._shown.append(candidate)
+
+        self._record_usage(model, candidate.parsed, generated, escalated=index > 0)
+        if sampled and self.last_usage is not None:
+            self.last_usage['candidates'] = sampled + 1
+        self._store(cache_key, natural_language, candidate.commands, candidate.parsed)
+
+        return candidate.parsed
+
+    def parse_iter(
+            self,
+            natural_language: str,
+            use_cache: bool = True,
+            context: str = ''
+    ) -> Iterator[Command]:
+        """Parse natural language, yielding each command as soon as its line completes.
+
+        Generation stops early once ``max_commands`` commands were produced.
+        """
+
+        self.last_usage = None
+        cache_key = self._cache_key(natural_language) if use_cache and not context else None
+        cached = self._cached_commands(cache_key, natural_language)
+        if cached is not None:
+            self._remember_cached(natural_language, context, cached)
+            yield from cached
+            return
+
+        # Smaller routed models are fast, so their output is checked as a
+        # whole before anything is shown; only the last model streams
+        names = self._route(natural_language)
+        generated = 0
+        for index, name in enumerate(names[:-1]):
+            model = self._model(name)
+            candidate = self._generate(model, natural_language, context)
+            generated += model.last_completion_tokens
+            if self._usable(candidate.parsed):
+                self._remember(natural_language, context, name, candidate)
+                self._record_usage(model, candidate.parsed, generated, escalated=index > 0)
+                self._store(cache_key, natural_language, candidate.commands, candidate.parsed)
+                yield from candidate.parsed
+                return
+
+        model = self._model(names[-1])
+        stream = model.generate_stream(
+            self._build_prompt(natural_language, context),
+            max_tokens=512,
+            prefix=self.prompt_prefix,
+            grammar=self.grammar,
+        )
 
-    def parse(self, natural_language: str) -> List[Command]:
-        """Parse natural language into bash commands."""
+        # The raw output, to judge the answer once it is complete
+        chunks: List[str] = []
 
-        # Create prompt
-        prompt = f"{self.SYSTEM_PROMPT}\n\nUser: {natural_language}\n"
+        def recorded() -> Iterator[str]:
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
 
-        # Generate commands
-        response = self.model.generate(prompt, max_tokens=512)
+        commands = []
+        parsed_commands = []
+        try:
+            for cmd_str in self._extract_stream(recorded()):
+                cmd = self._analyze_command(cmd_str, natural_language)
+                if not cmd:
+                    continue
 
-        # Extract commands
-        commands = self._extract_commands(response)
+                commands.append(cmd_str)
+                parsed_commands.append(cmd)
+                yield cmd
+
+                if self.max_commands and len(parsed_commands) >= self.max_commands:
+                    break
+        finally:
+            # Stops generation when the caller or the limit ends iteration
+            stream.close()
+            self._record_usage(
+                model, parsed_commands, generated + model.last_completion_tokens,
+                escalated=len(names) > 1)
+
+        response = ''.join(chunks)
+        self._remember(natural_language, context, names[-1], Candidate(
+            response, commands, parsed_commands, self._extraction_rate(response),
+            self._passes_policy(parsed_commands)))
+        self._store(cache_key, natural_language, commands, parsed_commands)
+
+    def needs_alternative(self) -> bool:
+        """Whether the last answer was blocked, partly dropped or empty and could be resampled."""
+        return self.candidates > 1 and bool(self._shown) and not self._shown[-1].complete
+
+    def next_alternative(self, better_only: bool = False) -> Optional[List[Command]]:
+        """Best not yet shown answer to the last request, or None when there is none.
+
+        The first call samples ``candidates - 1`` further answers from the
+        prompt the model has already evaluated. With ``better_only``, an
+        alternative is only returned if it ranks above the last answer shown.
+        """
+        if self.last_request is None or self.candidates < 2:
+            return None
+        if self._alternatives is None:
+            self._sample_alternatives(self.last_request)
+
+        if not self._alternatives:
+            return None
+        if better_only and self._shown and self._alternatives[0].rank() <= self._shown[-1].rank():
+            return None
+
+        candidate = self._alternatives.pop(0)
+        self._shown.append(candidate)
+        return candidate.parsed
+
+    def _remember(
+            self,
+            natural_language: str,
+            context: str,
+            model_name: Optional[str],
+            candidate: Candidate
+    ) -> None:
+        """Keep what is needed to offer alternatives for this request later."""
+        self.last_request = natural_language
+        self.last_context = context
+        self._last_model = model_name
+        self._shown = [candidate]
+        self._alternatives = None
+
+    def _remember_cached(self, natural_language: str, context: str, cached: List[Command]) -> None:
+        # Cached answers passed the policy when they were looked up
+        commands = [cmd.command for cmd in cached]
+        self._remember(natural_language, context, self._route(natural_language)[-1],
+                       Candidate('\n'.join(commands), commands, cached, 1.0, True))
+
+    def _sample_alternatives(self, request: str) -> int:
+        """Sample and rank alternatives to the last request, returning the tokens generated."""
+        model = self._model(self._last_model)
+        texts = model.generate_candidates(
+            self._build_prompt(request, self.last_context),
+            self.candidates - 1,
+            max_tokens=512,
+            prefix=self.prompt_prefix,
+            grammar=self.grammar,
+            temperature=self.candidate_temperature,
+        )
 
-        # Analyze each command
+        seen = {tuple(candidate.commands) for candidate in self._shown}
+        alternatives = []
+        for text in texts:
+            candidate = self._candidate(text, request)
+            key = tuple(candidate.commands)
+            if candidate.parsed and key not in seen:
+                seen.add(key)
+                alternatives.append(candidate)
+
+        # Stable, so equally ranked answers keep their sampling order
+        alternatives.sort(key=Candidate.rank, reverse=True)
+        self._alternatives = alternatives
+        tokens: int = model.last_completion_tokens
+        return tokens
+
+    def _route(self, natural_language: str) -> Sequence[Optional[str]]:
+        """Names of the pooled models to try in order, or [None] for self.model."""
+        if self.router is None:
+            return [None]
+        names: Sequence[Optional[str]] = self.router.route(natural_language)
+        return names
+
+    def _model(self, name: Optional[str]) -> ModelManager:
+        if name is None or self.router is None:
+            return self.model
+        return self.router.pool.get(name)
+
+    def _generate(self, model: ModelManager, natural_language: str, context: str = '') -> Candidate:
+        """Generate with one model and return the extracted and analyzed commands."""
+        response = model.generate(
+            self._build_prompt(natural_language, context),
+            max_tokens=512,
+            prefix=self.prompt_prefix,
+            grammar=self.grammar,
+        )
+        return self._candidate(response, natural_language)
+
+    def _candidate(self, response: str, natural_language: str) -> Candidate:
+        """Extract, analyze and validate the commands of one model answer."""
+        commands = self._extract_commands(response)[:self.max_commands]
+        parsed_commands = self._analyze_all(commands, natural_language)
+        return Candidate(response, commands, parsed_commands, self._extraction_rate(response),
+                         self._passes_policy(parsed_commands))
+
+    def _extraction_rate(self, response: str) -> float:
+        """Share of the command lines, up to the limit, not dropped for chaining."""
+        lines = self._command_lines(response)[:self.max_commands]
+        if not lines:
+            return 0.0
+        return sum(1 for line in lines if self._validate_no_chaining(line)) / len(lines)
+
+    def _usable(self, commands: List[Command]) -> bool:
+        """Whether output is good enough not to escalate to a larger model."""
+        return bool(commands) and self._passes_policy(commands)
+
+    def _record_usage(
+            self,
+            model: ModelManager,
+            commands: List[Command],
+            generated: int,
+            escalated: bool = False
+    ) -> None:
+        """Compare the tokens generated with the tokens of the commands kept."""
+        kept = '\n'.join(cmd.command for cmd in commands)
+        self.last_usage = {
+            'grammar': self.grammar is not None,
+            'prompt': model.last_prompt_tokens,
+            'generated': generated,
+            'kept': model.count_tokens(kept) if kept else 0,
+        }
+        if model.last_draft is not None:
+            self.last_usage['draft'] = model.last_draft
+        if self.router is not None:
+            self.last_usage['model'] = model.config['name']
+            self.last_usage['escalated'] = escalated
+
+    @tracer.traced('prompt build')
+    def _build_prompt(self, natural_language: str, context: str = '') -> str:
+        # Session history follows the prefix, so consecutive prompts share it
+        request = self.PROMPT_SUFFIX.format(request=natural_language)
+        if not self.examples:
+            return self.prompt_prefix + context + request
+
+        # Most relevant last, right before the request
+        examples = self.examples.search(natural_language, self.examples_k)[::-1]
+        return f"{self.prompt_prefix}{context}{format_examples(examples)}\n\n{request}"
+
+    def _cache_key(self, natural_language: str) -> Optional[str]:
+        if not self.cache:
+            return None
+        key: str = self.cache.make_key(natural_language, self.model_key, self.template_hash)
+        return key
+
+    @tracer.traced('cache lookup')
+    def _cached_commands(self, cache_key: Optional[str], context: str) -> Optional[List[Command]]:
+        """Return re-analyzed cached commands if the current policy still accepts them."""
+        if not cache_key or self.cache is None:
+            return None
+
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+
+        parsed_commands = self._analyze_all(cached, context)
+        if self._passes_policy(parsed_commands):
+            return parsed_commands
+
+        # Policy changed since the entry was stored
+        self.cache.delete(cache_key)
+        return None
+
+    def _store(
+            self,
+            cache_key: Optional[str],
+            natural_language: str,
+            commands: List[str],
+            parsed_commands: List[Command]
+    ) -> None:
+        """Cache an answer if the current policy accepts it."""
+        if cache_key and self.cache is not None and parsed_commands and \
+                self._passes_policy(parsed_commands):
+            self.cache.put(cache_key, natural_language, commands)
+
+    def _analyze_all(self, commands: List[str], context: str) -> List[Command]:
+        """Analyze each extracted command string."""
         parsed_commands = []
         for cmd_str in commands:
-            cmd = self._analyze_command(cmd_str, natural_language)
+            cmd = self._analyze_command(cmd_str, context)
             if cmd:
                 parsed_commands.append(cmd)
 
         return parsed_commands
 
+    def _passes_policy(self, commands: List[Command]) -> bool:
+        """Re-check cached commands against the current security policy."""
+        if self.validator is None:
+            return True
+        return all(self.validator.validate(cmd) for cmd in commands)
+
+    @tracer.traced('extract')
     def _extract_commands(self, response: str) -> List[str]:
         """Extract command strings from model output."""
-        commands = []
-
-        xml_pattern = r"<command>(.*?)</command>"
-        xml_matches = re.findall(xml_pattern, response, re.DOTALL | re.IGNORECASE)
-        if xml_matches:
-            commands.extend([cmd.strip() for cmd in xml_matches if cmd.strip()])
-        else:
-            lines = response.split('\n')
-            for line in lines:
-                line = line.strip()
-                if line and not line.startswith('#') and not line.startswith('//'):
-                    # Remove common prefixes
-                    line = re.sub(r'^(Command:|Bash:|Shell:|\$)\s*', '', line)
-                    if line:
-                        commands.append(line)
+        commands = self._command_lines(response)
 
         # Validate commands don't contain chaining
         valid_commands = []
@@ -87,28 +490,88 @@ ls -lhS"""
 
         return valid_commands
 
+    def _command_lines(self, response: str) -> List[str]:
+        """Candidate command strings in model output, before validation."""
+        commands = []
+
+        xml_matches = self.XML_PATTERN.findall(response)
+        if xml_matches:
+            commands.extend([cmd.strip() for cmd in xml_matches if cmd.strip()])
+        else:
+            for line in response.split('\n'):
+                command = self._clean_line(line)
+                if command:
+                    commands.append(command)
+
+        return commands
+
+    def _extract_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Extract command strings from model output as it is generated."""
+        buffer = ''
+        xml_mode = False
+        emitted = 0
+
+        for chunk in chunks:
+            buffer += chunk
+
+            if not xml_mode and '<command>' in buffer.lower():
+                xml_mode = True
+
+            if xml_mode:
+                # Only tags closed so far are matched
+                matches = self.XML_PATTERN.findall(buffer)
+                for cmd in matches[emitted:]:
+                    cmd = cmd.strip()
+                    if cmd and self._validate_no_chaining(cmd):
+                        yield cmd
+                emitted = len(matches)
+                continue
+
+            while '\n' in buffer:
+                line, buffer = buffer.split('\n', 1)
+                command = self._clean_line(line)
+                if command and self._validate_no_chaining(command):
+                    yield command
+
+        if not xml_mode:
+            command = self._clean_line(buffer)
+            if command and self._validate_no_chaining(command):
+                yield command
+
+    def _clean_line(self, line: str) -> Optional[str]:
+        """Turn one line of plain model output into a command string."""
+        line = line.strip()
+        if not line or line.startswith('#') or line.startswith('//'):
+            return None
+
+        # Remove common prefixes
+        line = re.sub(r'^(Command:|Bash:|Shell:|\$)\s*', '', line)
+        return line or None
+
     def _validate_no_chaining(self, command: str) -> bool:
         """Ensure command doesn't use chaining operators."""
-        # Check for command chaining
-        chaining_patterns = [
-            r'&&',
-            r'\|\|',
-            r';\s*\w',
-        ]
+        ast = parse_shell(command)
 
-        for pattern in chaining_patterns:
-            if re.search(pattern, command):
-                return False
+        # An unterminated quote would swallow whatever follows it
+        return not ast.chained and not ast.incomplete
 
-        return True
+    @tracer.traced('analyze')
+    def analyze(self, command: str, description: str = '') -> Command:
+        """Analyze a command that was not just generated, e.g. one from history."""
+        cmd = self._analyze_command(command, '')
+        if description:
+            cmd.description = description
+        return cmd
 
-    def _analyze_command(self, command: str, context: str) -> Optional[Command]:
+    def _analyze_command(self, command: str, context: str) -> Command:
         """Analyze command for safety and requirements."""
+        ast = parse_shell(command)
+
         # Check if sudo is needed
-        requires_sudo = self._check_sudo_needed(command)
+        requires_sudo = self._check_sudo_needed(ast)
 
         # Determine risk level
-        risk_level = self._assess_risk(command)
+        risk_level = self._assess_risk(ast)
 
         # Generate description
         description = self._generate_description(command, context)
@@ -117,68 +580,90 @@ ls -lhS"""
             command=command,
             description=description,
             requires_sudo=requires_sudo,
-            risk_level=risk_level
+            risk_level=risk_level,
+            ast=ast
         )
 
-    def _check_sudo_needed(self, command: str) -> bool:
-        """Check if command requires sudo privileges."""
-        sudo_indicators = [
-            'apt', 'yum', 'dnf', 'pacman',
-            'systemctl', 'service',
-            'mount', 'umount',
-            'useradd', 'userdel', 'usermod',
-            'chown', 'chmod',
-        ]
+    SUDO_COMMANDS = {
+        'apt', 'apt-get', 'aptitude', 'yum', 'dnf', 'pacman',
+        'systemctl', 'service',
+        'mount', 'umount',
+        'useradd', 'userdel', 'usermod',
+        'chown',
+    }
+
+    SYSTEM_DIRS = ('/etc/', '/usr/', '/var/', '/sys/', '/proc/')
 
-        cmd_parts = command.split()
-        if not cmd_parts:
-            return False
+    # Commands whose last path argument is the one written to
+    COPY_COMMANDS = {'cp', 'mv', 'install', 'ln', 'rsync'}
 
-        base_cmd = cmd_parts[0]
+    # Commands that modify every path argument
+    MODIFY_COMMANDS = {'rm', 'rmdir', 'mkdir', 'touch', 'tee', 'truncate', 'chmod', 'chown'}
 
+    # Devices that are safe to redirect output to
+    SAFE_DEVICES = {'/dev/null', '/dev/stdout', '/dev/stderr', '/dev/tty'}
+
+    def _check_sudo_needed(self, ast: ShellCommand) -> bool:
+        """Check if command requires sudo privileges."""
         # Already has sudo
-        if base_cmd == 'sudo':
+        if ast.sudo:
             return True
 
         # Check if command typically needs sudo
-        for indicator in sudo_indicators:
-            if indicator in command:
-                return True
+        if any(invocation.base in self.SUDO_COMMANDS for invocation in ast.invocations):
+            return True
 
         # Check if writing to system directories
-        system_dirs = ['/etc/', '/usr/', '/var/', '/sys/', '/proc/']
-        for dir_path in system_dirs:
-            if dir_path in command and ('>' in command or 'cp' in command or 'mv' in command):
+        for redirection in ast.redirections:
+            if redirection.is_output and self._in_system_dir(redirection.target):
+                return True
+
+        for invocation in ast.invocations:
+            paths = [arg for arg in invocation.args if not arg.startswith('-')]
+            if invocation.base in self.COPY_COMMANDS:
+                paths = paths[-1:]
+            elif invocation.base not in self.MODIFY_COMMANDS:
+                continue
+            if any(self._in_system_dir(path) for path in paths):
                 return True
 
         return False
 
-    def _assess_risk(self, command: str) -> str:
+    def _in_system_dir(self, path: str) -> bool:
+        return any(path == d.rstrip('/') or path.startswith(d) for d in self.SYSTEM_DIRS)
+
+    def _assess_risk(self, ast: ShellCommand) -> str:
         """Assess the risk level of a command."""
-        high_risk_patterns = [
-            r'\brm\b.*-[rf]',
-            r'\bdd\b',
-            r'\bmkfs\b',
-            r'\bformat\b',
-            r'>\s*/dev/',
-        ]
-
-        medium_risk_patterns = [
-            r'\brm\b',
-            r'\bmv\b.*/',
-            r'\bchmod\b',
-            r'\bchown\b',
-        ]
-
-        for pattern in high_risk_patterns:
-            if re.search(pattern, command):
+        risk_level = 'low'
+
+        for redirection in ast.redirections:
+            if (redirection.is_output and redirection.target.startswith('/dev/')
+                    and redirection.target not in self.SAFE_DEVICES):
+                return 'high'
+
+        for invocation in ast.invocations:
+            base = invocation.base
+            args = invocation.args
+
+            if base in ('dd', 'format') or base.startswith('mkfs'):
                 return 'high'
 
-        for pattern in medium_risk_patterns:
-            if re.search(pattern, command):
-                return 'medium'
+            if base == 'rm':
+                if any(self._is_recursive_or_forced(arg) for arg in args):
+                    return 'high'
+                risk_level = 'medium'
+            elif base in ('chmod', 'chown'):
+                risk_level = 'medium'
+            elif base == 'mv' and any('/' in arg for arg in args):
+                risk_level = 'medium'
+
+        return risk_level
 
-        return 'low'
+    def _is_recursive_or_forced(self, arg: str) -> bool:
+        if arg in ('--recursive', '--force'):
+            return True
+        return arg.startswith('-') and not arg.startswith('--') and any(
+            flag in arg[1:] for flag in 'rRf')
 
     def _generate_description(self, command: str, context: str) -> str:
         """Generate a human-readable description of the command."""
@@ -5,9 +5,43 @@ from typing import Dict, Any
 DEFAULT_CONFIG = {
     'model': {
         'name': 'gemma-3',
+        'backend': 'llama',
         'path': str(Path.home() / '.orcas' / 'models'),
         'n_ctx': 2048,
         'n_gpu_layers': 0,
+        'prefix_cache': True,
+        'persist_prefix_cache': True,
+        'prefix_cache_dir': str(Path.home() / '.orcas' / 'cache'),
+        'prefix_cache_max_mb': 512,
+        'grammar': False,
+        'draft': {
+            'mode': 'none',
+            'name': 'tinyllama',
+            'num_pred_tokens': 8,
+            'max_ngram_size': 2,
+        },
+        'use_mmap': True,
+        'worker': {
+            'enabled': True,
+            'timeout': 120,
+            'cancel_grace': 5,
+        },
+        'candidates': {
+            'count': 3,
+            'temperature': 0.7,
+        },
+        'pool': {
+            'models': [],
+            'memory_budget_mb': 0,
+        },
+        'router': {
+            'max_words': 12,
+        },
+        'stub': {
+            'responses': {},
+            'default': 'ls -lhS',
+            'ms_per_token': 0,
+        },
     },
     'security': {
         'require_confirmation': True,
@@ -23,11 +57,69 @@ DEFAULT_CONFIG = {
             r'rm\s+-rf\s+/',
             r'dd\s+if=/dev/',
         ],
+        'policy_files': [],
+        'policy_cache_dir': str(Path.home() / '.orcas' / 'cache'),
     },
     'execution': {
         'timeout': 300,
         'max_commands_per_request': 10,
         'shell': '/bin/bash',
+        'parallel': False,
+        'max_workers': 4,
+        'stream_output': True,
+        'max_output_bytes': 1024 * 1024,
+        'backend': 'spawn',
+        'output_cache': {
+            'enabled': False,
+            'max_bytes': 8 * 1024 * 1024,
+            'ttl': 300,
+            'max_paths': 5000,
+        },
+    },
+    'examples': {
+        'files': [str(Path.home() / '.config' / 'orcas' / 'examples.yaml')],
+        'top_k': 3,
+    },
+    'session': {
+        'enabled': True,
+        'reserve_tokens': 768,
+        'keep_ratio': 0.5,
+        'max_output_chars': 80,
+    },
+    'cache': {
+        'enabled': True,
+        'path': str(Path.home() / '.orcas' / 'cache' / 'results.db'),
+        'max_entries': 1000,
+        'ttl': 7 * 24 * 3600,
+    },
+    'history': {
+        'enabled': True,
+        'path': str(Path.home() / '.orcas' / 'history.db'),
+        'threshold': 0.8,
+        'max_entries': 5000,
+    },
+    'profiling': {
+        'enabled': False,
+        'trace_file': None,
+    },
+    'logging': {
+        'enabled': True,
+        'level': 'INFO',
+        'file': str(Path.home() / '.orcas' / 'logs' / 'orcas.log'),
+        'max_bytes': 10 * 1024 * 1024,
+        'backup_count': 5,
+        'compress': True,
+        'queue_size': 10000,
+        'overflow': 'drop',
+    },
+    'daemon': {
+        'enabled': False,
+        'auto_spawn': False,
+        'socket': str(Path.home() / '.orcas' / 'orcasd.sock'),
+        'idle_timeout': 900,
+        'request_timeout': 120,
+        'spawn_timeout': 120,
+        'queue_size': 32,
     },
 }
 
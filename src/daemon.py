@@ -0,0 +1,327 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from command_parser import Command, CommandParser
+
+DEFAULT_SOCKET = '~/.orcas/orcasd.sock'
+
+
+def socket_path(config: Dict[str, Any]) -> Path:
+    """Resolve the daemon socket path from the daemon config section."""
+    return Path(os.path.expanduser(config.get('socket', DEFAULT_SOCKET)))
+
+
+def _command_payload(cmd: Command) -> Dict[str, Any]:
+    """Serialize a command; the client re-lexes it on demand."""
+    return {
+        'command': cmd.command,
+        'description': cmd.description,
+        'requires_sudo': cmd.requires_sudo,
+        'risk_level': cmd.risk_level,
+    }
+
+
+class _Job:
+    """A parse request waiting for the inference worker."""
+
+    def __init__(self, prompt: str, use_cache: bool):
+        self.prompt = prompt
+        self.use_cache = use_cache
+        self.cancelled = False
+        # Streamed responses, the last one carries the 'ok' field
+        self.events: 'queue.Queue[Dict[str, Any]]' = queue.Queue()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Reads one JSON request per connection and streams JSON line responses."""
+
+    server: '_UnixServer'
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self._reply({'ok': False, 'error': 'Malformed request'})
+            return
+
+        for response in self.server.daemon.dispatch(request):
+            self._reply(response)
+
+    def _reply(self, response: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Answers the requests, set once the server is created
+    daemon: 'InferenceDaemon'
+
+
+class InferenceDaemon:
+    """Keeps one warm model behind a Unix domain socket."""
+
+    def __init__(self, config: Dict[str, Any], parser: CommandParser):
+        self.config = config
+        self.parser = parser
+        self.socket_path = socket_path(config)
+        self.idle_timeout = config.get('idle_timeout', 900)
+        self.jobs: 'queue.Queue[_Job]' = queue.Queue(maxsize=config.get('queue_size', 32))
+        self.last_activity = time.monotonic()
+        self.active_jobs = 0
+        self._lock = threading.Lock()
+        self._server: Optional[_UnixServer] = None
+
+    def serve_forever(self) -> None:
+        """Bind the socket and serve requests until idle timeout or shutdown."""
+        self._prepare_socket()
+
+        self._server = _UnixServer(str(self.socket_path), _RequestHandler)
+        self._server.daemon = self
+        os.chmod(self.socket_path, 0o600)
+
+        # The model is not thread-safe, so a single worker drains the queue
+        threading.Thread(target=self._worker, daemon=True).start()
+        if self.idle_timeout:
+            threading.Thread(target=self._idle_watchdog, daemon=True).start()
+
+        try:
+            self._server.serve_forever(poll_interval=0.5)
+        finally:
+            self._server.server_close()
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def shutdown(self) -> None:
+        """Stop serving from another thread."""
+        if self._server:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def dispatch(self, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Handle a decoded request and yield the response payloads."""
+        op = request.get('op')
+        self._touch()
+
+        if op == 'ping':
+            yield {'ok': True, 'pid': os.getpid()}
+            return
+
+        if op == 'shutdown':
+            self.shutdown()
+            yield {'ok': True}
+            return
+
+        if op == 'analyze':
+            cmd = self.parser.analyze(str(request.get('command', '')),
+                                      str(request.get('description', '')))
+            yield {'ok': True, 'command': _command_payload(cmd)}
+            return
+
+        if op != 'parse':
+            yield {'ok': False, 'error': f"Unknown operation: {op}"}
+            return
+
+        job = _Job(str(request.get('prompt', '')), bool(request.get('use_cache', True)))
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            yield {'ok': False, 'error': 'Daemon is busy, try again later'}
+            return
+
+        try:
+            while True:
+                event = job.events.get()
+                yield event
+                if 'ok' in event:
+                    break
+        finally:
+            # Client went away, so the worker can stop generating
+            job.cancelled = True
+            self._touch()
+
+    def _worker(self) -> None:
+        """Run queued parse requests one at a time."""
+        while True:
+            job = self.jobs.get()
+            if job.cancelled:
+                continue
+
+            with self._lock:
+                self.active_jobs += 1
+            try:
+                commands = self.parser.parse_iter(job.prompt, use_cache=job.use_cache)
+                for cmd in commands:
+                    if job.cancelled:
+                        commands.close()
+                        break
+                    job.events.put({'command': _command_payload(cmd)})
+                job.events.put({'ok': True, 'usage': self.parser.last_usage})
+            except Exception as e:
+                job.events.put({'ok': False, 'error': str(e)})
+            finally:
+                with self._lock:
+                    self.active_jobs -= 1
+
+    def _idle_watchdog(self) -> None:
+        """Shut the daemon down once it has been idle for too long."""
+        while True:
+            time.sleep(min(self.idle_timeout, 5))
+            with self._lock:
+                busy = self.active_jobs > 0 or not self.jobs.empty()
+                idle_for = time.monotonic() - self.last_activity
+            if not busy and idle_for >= self.idle_timeout:
+                self.shutdown()
+                return
+
+    def _touch(self) -> None:
+        with self._lock:
+            self.last_activity = time.monotonic()
+
+    def _prepare_socket(self) -> None:
+        """Create the socket directory and clear a stale socket file."""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if not self.socket_path.exists():
+            return
+
+        if DaemonClient({'socket': str(self.socket_path)}).ping():
+            raise RuntimeError(f"Daemon already running on {self.socket_path}")
+
+        self.socket_path.unlink()
+
+
+class DaemonClient:
+    """Thin client that asks a running daemon to parse prompts."""
+
+    def __init__(self, config: Dict[str, Any], use_cache: bool = True):
+        self.config = config
+        self.use_cache = use_cache
+        self.socket_path = socket_path(config)
+        self.timeout = config.get('request_timeout', 120)
+        # Token usage of the last parse, as reported by the daemon
+        self.last_usage: Optional[Dict[str, Any]] = None
+        # Alternatives are not offered, so there is never a request to resample
+        self.last_request: Optional[str] = None
+        self.last_context = ''
+
+    def available(self) -> bool:
+        """Check whether a daemon socket exists at the configured path."""
+        return self.socket_path.exists()
+
+    def ping(self) -> bool:
+        """Check whether a daemon is accepting requests."""
+        try:
+            return bool(self._request({'op': 'ping'}, timeout=2).get('ok', False))
+        except OSError:
+            return False
+
+    def warm_up(self) -> None:
+        """Nothing to do, the daemon warms its model up when it starts."""
+
+    def parse(self, natural_language: str, use_cache: bool = True) -> List[Command]:
+        """Parse natural language into bash commands using the daemon."""
+        return list(self.parse_iter(natural_language, use_cache))
+
+    def parse_iter(self, natural_language: str, use_cache: bool = True) -> Iterator[Command]:
+        """Yield commands as the daemon streams them back."""
+        request = {
+            'op': 'parse',
+            'prompt': natural_language,
+            'use_cache': self.use_cache and use_cache,
+        }
+        self.last_usage = None
+        for response in self._stream(request):
+            if 'command' in response:
+                yield Command(**response['command'])
+            elif response.get('ok'):
+                self.last_usage = response.get('usage')
+            else:
+                raise RuntimeError(response.get('error', 'Daemon request failed'))
+
+    def analyze(self, command: str, description: str = '') -> Command:
+        """Have the daemon analyze a command that was not just generated."""
+        response = self._request({'op': 'analyze', 'command': command, 'description': description})
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error', 'Daemon request failed'))
+        return Command(**response['command'])
+
+    def needs_alternative(self) -> bool:
+        """Alternatives are not offered through the daemon."""
+        return False
+
+    def next_alternative(self, better_only: bool = False) -> Optional[List[Command]]:
+        """Alternatives are not offered through the daemon."""
+        return None
+
+    def shutdown(self) -> bool:
+        """Ask the daemon to stop."""
+        try:
+            return bool(self._request({'op': 'shutdown'}, timeout=2).get('ok', False))
+        except OSError:
+            return False
+
+    def spawn(self, config_path: Optional[Path] = None) -> bool:
+        """Start a detached daemon and wait until it accepts requests."""
+        args = [sys.executable, str(Path(__file__).with_name('main.py')), '--serve']
+        if config_path:
+            args += ['--config', str(config_path)]
+
+        subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+        deadline = time.monotonic() + self.config.get('spawn_timeout', 120)
+        while time.monotonic() < deadline:
+            if self.ping():
+                return True
+            time.sleep(0.2)
+
+        return False
+
+    def _request(self, request: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send one request and return its final response."""
+        response: Dict[str, Any] = {}
+        for response in self._stream(request, timeout):
+            pass
+        return response
+
+    def _stream(
+            self,
+            request: Dict[str, Any],
+            timeout: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Send one request and yield responses until the final one."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout or self.timeout)
+            sock.connect(str(self.socket_path))
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+            with sock.makefile('rb') as reader:
+                while True:
+                    line = reader.readline()
+                    if not line:
+                        raise ConnectionError('Daemon closed the connection')
+
+                    response = json.loads(line)
+                    yield response
+                    if 'ok' in response:
+                        return
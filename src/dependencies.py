@@ -0,0 +1,132 @@
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+from shell_ast import WRAPPERS, parse_shell, writes_files
+
+# Commands that change shell state every later command may rely on
+STATEFUL_COMMANDS = {
+    'cd', 'pushd', 'popd', 'export', 'unset', 'source', '.',
+    'alias', 'set', 'umask', 'ulimit',
+}
+
+# Programs that touch no files: their arguments are durations, text or host
+# names, so only redirections give them paths
+FILELESS_COMMANDS = {
+    'sleep', 'true', 'false', ':', 'echo', 'printf', 'whoami', 'id',
+    'uname', 'uptime', 'free', 'ps', 'pwd', 'seq', 'nproc', 'printenv', 'ping',
+}
+
+# Redirection targets that are not files on disk
+DEVICE_TARGETS = {'/dev/null', '/dev/stdout', '/dev/stderr', '/dev/tty'}
+
+
+@dataclass
+class CommandEffects:
+    """Paths a command touches and whether it may modify them."""
+    paths: Set[str] = field(default_factory=set)
+    writes: bool = True
+    stateful: bool = False
+
+
+def analyze_effects(command: str, cwd: Optional[str] = None) -> CommandEffects:
+    """Estimate which paths a command touches.
+
+    Every program of a pipeline, chain or nested command is judged on its
+    own, and output redirections count as writes to their target.
+    """
+    cwd = cwd or os.getcwd()
+    ast = parse_shell(command)
+    effects = CommandEffects(writes=ast.incomplete)
+    uses_cwd = ast.incomplete
+
+    for invocation in ast.invocations:
+        # sudo, xargs and friends are judged by the program they run
+        if invocation.base in WRAPPERS:
+            continue
+        if invocation.base in STATEFUL_COMMANDS:
+            effects.stateful = True
+        if invocation.base in FILELESS_COMMANDS:
+            continue
+        uses_cwd = True
+        if writes_files(invocation):
+            effects.writes = True
+
+        for arg in invocation.args:
+            if arg.startswith('-'):
+                if '=' not in arg:
+                    continue
+                arg = arg.split('=', 1)[1]
+            if not arg or '://' in arg or arg.startswith(('$(', '`', '<(', '>(')):
+                continue
+            effects.paths.add(_normalize_path(arg, cwd))
+
+    for redirection in ast.redirections:
+        # 2>&1 and <&- duplicate or close descriptors
+        if redirection.op in ('>&', '<&') and \
+                (redirection.target.isdigit() or redirection.target == '-'):
+            continue
+        # Here-documents and here-strings carry text, not a path
+        if redirection.op in ('<<', '<<<') or not redirection.target:
+            continue
+        if redirection.target in DEVICE_TARGETS:
+            continue
+        if redirection.is_output:
+            effects.writes = True
+        effects.paths.add(_normalize_path(redirection.target, cwd))
+
+    # Commands in $(...) and backticks run as part of this one
+    for substitution in ast.substitutions:
+        inner = analyze_effects(substitution, cwd)
+        effects.writes = effects.writes or inner.writes
+        effects.stateful = effects.stateful or inner.stateful
+        effects.paths |= inner.paths
+
+    # Without path arguments most commands act on the working directory
+    if not effects.paths and uses_cwd:
+        effects.paths.add(os.path.normpath(cwd))
+
+    return effects
+
+
+def build_dependency_graph(commands: List[str], cwd: Optional[str] = None) -> List[Set[int]]:
+    """Return, for each command, the indices of earlier commands it must wait for.
+
+    Two commands depend on each other when they touch the same path or one
+    touches a parent directory of the other, unless both only read. State
+    changes such as cd or export order every later command after them.
+    """
+    effects = [analyze_effects(cmd, cwd) for cmd in commands]
+    graph: List[Set[int]] = []
+
+    for i, current in enumerate(effects):
+        deps = set()
+        for j in range(i):
+            earlier = effects[j]
+            if earlier.stateful or current.stateful:
+                deps.add(j)
+            elif (earlier.writes or current.writes) and \
+                    _paths_overlap(earlier.paths, current.paths):
+                deps.add(j)
+        graph.append(deps)
+
+    return graph
+
+
+def _normalize_path(token: str, cwd: str) -> str:
+    """Map a path argument to an absolute path, globs to their directory."""
+    path = os.path.expanduser(token)
+
+    if any(ch in path for ch in '*?['):
+        # A glob may match anything in the directory it starts from
+        path = os.path.dirname(path.split('*')[0].split('?')[0].split('[')[0]) or '.'
+
+    return os.path.normpath(os.path.join(cwd, path))
+
+
+def _paths_overlap(first: Set[str], second: Set[str]) -> bool:
+    for a in first:
+        for b in second:
+            if a == b or b.startswith(a.rstrip('/') + '/') or a.startswith(b.rstrip('/') + '/'):
+                return True
+    return False
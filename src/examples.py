@@ -0,0 +1,153 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from heapq import nlargest
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import yaml
+
+
+@dataclass(frozen=True)
+class Example:
+    """A natural language request and the commands that answer it."""
+    request: str
+    commands: Tuple[str, ...]
+
+
+# Always part of the library, and the examples of the static system prompt
+BUILTIN_EXAMPLES = (
+    Example('find large python files', ('find . -name "*.py" -size +1M',)),
+    Example('create backup and compress it', (
+        'cp -r documents documents_backup',
+        'tar -czf documents_backup.tar.gz documents_backup',
+    )),
+    Example('list files sorted by size', ('ls -lhS',)),
+)
+
+# Words too common in requests to tell examples apart
+STOP_WORDS = {
+    'a', 'an', 'the', 'all', 'in', 'on', 'of', 'to', 'for', 'from', 'with',
+    'my', 'me', 'i', 'it', 'is', 'are', 'this', 'that', 'these', 'please',
+    'show', 'get', 'and', 'or', 'by', 'at', 'into', 'them', 'here',
+}
+
+
+def format_examples(examples: Sequence[Example]) -> str:
+    """Render examples in the prompt's 'User:' / command lines layout."""
+    return '\n\n'.join(
+        f"User: {example.request}\n" + '\n'.join(example.commands)
+        for example in examples
+    )
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words with a light suffix stripping, minus stop words."""
+    terms = []
+    for word in re.findall(r'[a-z0-9]+', text.lower()):
+        if word in STOP_WORDS:
+            continue
+        for suffix in ('ing', 'ed', 'es', 's'):
+            if len(word) > len(suffix) + 2 and word.endswith(suffix):
+                word = word[:-len(suffix)]
+                break
+        terms.append(word)
+    return terms
+
+
+class ExampleLibrary:
+    """Local BM25 index over built-in and user-provided examples.
+
+    Example files are YAML lists or JSON lines of ``{request, commands}``
+    entries. They are read and indexed on the first search, so startup and
+    cached answers do not pay for them.
+    """
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, files: Sequence[str]):
+        self.files = [Path(os.path.expanduser(f)) for f in files]
+        self.examples: List[Example] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def signature(self) -> str:
+        """Cheap identity of the library files, for cache keys."""
+        parts = []
+        for path in self.files:
+            if path.exists():
+                stat = path.stat()
+                parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        return '|'.join(parts)
+
+    def search(self, query: str, k: int) -> List[Example]:
+        """Return the ``k`` examples most relevant to the query, best first."""
+        self._ensure_loaded()
+
+        n_docs = len(self.examples)
+        avg_length = sum(self._lengths) / n_docs
+        scores: Dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, tf in postings:
+                norm = self.K1 * (1 - self.B + self.B * self._lengths[doc] / avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+
+        best = nlargest(k, scores, key=lambda doc: (scores[doc], -doc))
+        # Fill up with built-in examples when few examples matched
+        for doc in range(len(BUILTIN_EXAMPLES)):
+            if len(best) >= k:
+                break
+            if doc not in best:
+                best.append(doc)
+
+        return [self.examples[doc] for doc in best]
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self.examples = list(BUILTIN_EXAMPLES)
+            for path in self.files:
+                if path.exists():
+                    self.examples.extend(_read_examples(path))
+            self._build_index()
+            self._loaded = True
+
+    def _build_index(self) -> None:
+        for doc, example in enumerate(self.examples):
+            # Commands are indexed too, so a query naming a tool finds them
+            terms = tokenize(example.request + ' ' + ' '.join(example.commands))
+            self._lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self._postings.setdefault(term, []).append((doc, tf))
+
+
+def _read_examples(path: Path) -> List[Example]:
+    with open(path, 'r') as f:
+        if path.suffix == '.jsonl':
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or []
+
+    examples = []
+    for entry in entries:
+        commands = entry.get('commands') or entry.get('command')
+        if isinstance(commands, str):
+            commands = [commands]
+        commands = tuple(cmd.strip() for cmd in commands or [] if cmd and cmd.strip())
+        request = str(entry.get('request', '')).strip()
+        if request and commands:
+            examples.append(Example(request, commands))
+    return examples
@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from shell_ast import READ_ONLY_COMMANDS, Invocation, ShellCommand, parse_shell, writes_files
+
+# Programs whose output only depends on the files they read
+# (not stat: it prints access times, which reading files changes)
+LISTING_COMMANDS = {'ls', 'du', 'find', 'tree', 'file', 'realpath', 'readlink'}
+CONTENT_COMMANDS = {
+    'cat', 'head', 'tail', 'wc', 'grep', 'egrep', 'fgrep', 'rg',
+    'sort', 'uniq', 'cut', 'md5sum', 'sha1sum', 'sha256sum', 'cksum',
+}
+CACHEABLE_COMMANDS = (LISTING_COMMANDS | CONTENT_COMMANDS) & READ_ONLY_COMMANDS
+
+# Options that make an allowed program wait for changes or depend on the
+# current time; those that make it write are in shell_ast.WRITE_OPTIONS
+UNSAFE_OPTIONS = {
+    'find': {
+        '-mtime', '-mmin', '-atime', '-amin', '-ctime', '-cmin', '-newer', '-anewer', '-cnewer',
+        '-used',
+    },
+    'tail': {'-f', '-F', '--follow', '--retry'},
+}
+
+# Searches that descend into directories, always or with one of the options
+RECURSIVE_COMMANDS = {'du', 'find', 'tree', 'rg'}
+RECURSIVE_OPTIONS = {
+    'ls': {'R'},
+    'grep': {'r', 'R'},
+    'egrep': {'r', 'R'},
+    'fgrep': {'r', 'R'},
+}
+
+# Programs whose first operand is a pattern rather than a path
+PATTERN_COMMANDS = {'grep', 'egrep', 'fgrep', 'rg'}
+
+# Environment that changes what the allowed programs print
+ENV_KEYS = (
+    'LANG', 'LC_ALL', 'LC_COLLATE', 'LC_CTYPE', 'LC_MESSAGES', 'LC_NUMERIC', 'LC_TIME',
+    'TZ', 'HOME', 'PATH', 'COLUMNS', 'LS_COLORS', 'TIME_STYLE', 'QUOTING_STYLE',
+    'BLOCKSIZE', 'BLOCK_SIZE', 'DU_BLOCK_SIZE', 'LS_BLOCK_SIZE', 'POSIXLY_CORRECT',
+    'GREP_COLORS', 'RIPGREP_CONFIG_PATH',
+)
+
+GLOB_CHARS = set('*?[')
+
+
+def is_read_only(ast: ShellCommand) -> bool:
+    """Whether every program in the command line only reads files.
+
+    Commands with redirections, substitutions, sudo or chaining never are.
+    """
+    if ast.redirections or ast.substitutions or ast.sudo or ast.chained or ast.incomplete:
+        return False
+    if not ast.invocations:
+        return False
+
+    for invocation in ast.invocations:
+        if invocation.base not in CACHEABLE_COMMANDS or writes_files(invocation):
+            return False
+        unsafe = UNSAFE_OPTIONS.get(invocation.base, set())
+        if any(arg.split('=', 1)[0] in unsafe for arg in invocation.args):
+            return False
+        # -newerXY compares against a time, possibly the current one
+        if invocation.base == 'find' and any(arg.startswith('-newer') for arg in invocation.args):
+            return False
+        if invocation.base == 'tail' and any(
+                arg.startswith('-') and not arg.startswith('--') and 'f' in arg.lower()
+                for arg in invocation.args):
+            return False
+    return True
+
+
+@dataclass
+class CachedOutput:
+    """Output of a read-only command and the state of the files it read."""
+    stdout: str
+    stderr: str
+    return_code: int
+    snapshot: Tuple[Any, ...]
+    created_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.stdout) + len(self.stderr)
+
+
+class ExecCache:
+    """In-memory results of read-only commands, valid while the files they read are unchanged.
+
+    Entries are keyed by the command line, the working directory and the
+    environment variables that change what the allowed programs print.
+    Each entry keeps a snapshot of the paths the command reads: the
+    modification time of every directory it lists or walks, and the
+    modification time and size of the files named on the command line or
+    found directly in a listed directory. A hit requires an identical
+    snapshot. Files changed in place deeper inside a walked tree do not
+    change any directory, so ``ttl`` bounds how long such an entry is
+    trusted. Any other command run through the executor clears the cache.
+    Output is kept in memory only, never written to disk.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.max_bytes = config.get('max_bytes', 8 * 1024 * 1024)
+        self.ttl = config.get('ttl', 300)
+        # Paths stat'ed per snapshot at most; larger trees are not cached
+        self.max_paths = config.get('max_paths', 5000)
+        self._entries: 'OrderedDict[tuple, CachedOutput]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def cacheable(self, command: str) -> bool:
+        return is_read_only(parse_shell(command))
+
+    def key(self, command: str, shell: str) -> tuple:
+        cwd = os.getcwd()
+        env = tuple((name, os.environ.get(name)) for name in ENV_KEYS)
+        return command, shell, cwd, env
+
+    def get(self, key: tuple) -> Optional[CachedOutput]:
+        """Return the cached output if nothing it depends on has changed."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if (self.ttl and time.time() - entry.created_at > self.ttl) or \
+                self.snapshot(key[0], key[2]) != entry.snapshot:
+            self._drop(key)
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: CachedOutput) -> None:
+        """Store an entry, evicting the least recently used ones beyond ``max_bytes``."""
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def snapshot(self, command: str, cwd: str) -> Optional[Tuple[Any, ...]]:
+        """State of the paths a command reads, or None if there are too many to track."""
+        state: List[Any] = []
+        for invocation in parse_shell(command).invocations:
+            recursive = _recursive(invocation)
+            for path in self._paths(invocation, cwd):
+                if not self._record(path, recursive, invocation.base in CONTENT_COMMANDS, state):
+                    return None
+        return tuple(state)
+
+    def _paths(self, invocation: Invocation, cwd: str) -> List[str]:
+        """Paths an invocation reads, with globs standing for their directory."""
+        operands = []
+        for arg in invocation.args:
+            if invocation.base == 'find' and arg.startswith(('-', '(', '!')):
+                # The rest is find's expression
+                break
+            if not arg.startswith('-'):
+                operands.append(arg)
+        if invocation.base in PATTERN_COMMANDS and operands and not any(
+                arg in ('-e', '-f') or arg.startswith(('--regexp', '--file'))
+                for arg in invocation.args):
+            operands = operands[1:]
+
+        # A pipeline stage without files reads the stage before it
+        if not operands and invocation.piped:
+            return []
+
+        paths = []
+        for operand in operands or ['.']:
+            path = os.path.join(cwd, os.path.expanduser(operand))
+            if GLOB_CHARS.intersection(operand):
+                # Matches change when the directory's entries do
+                path = os.path.dirname(path) or cwd
+            paths.append(os.path.normpath(path))
+        return paths
+
+    def _record(self, path: str, recursive: bool, content: bool, state: List[Any]) -> bool:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Its creation has to invalidate the entry too
+            state.append((path, None))
+            return True
+
+        state.append((path, stat.st_mtime_ns, stat.st_size))
+        if not os.path.isdir(path):
+            return True
+
+        # Entries of the directory itself, whose size and times may be shown
+        budget = self.max_paths - len(state)
+        for directory, dirs, files in os.walk(path):
+            names = dirs + files if directory == path or content else dirs
+            for name in sorted(names):
+                budget -= 1
+                if budget < 0:
+                    return False
+                try:
+                    entry = os.stat(os.path.join(directory, name), follow_symlinks=False)
+                except OSError:
+                    continue
+                state.append((directory, name, entry.st_mtime_ns, entry.st_size))
+            if not recursive:
+                break
+            dirs.sort()
+        return True
+
+    def _drop(self, key: tuple) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+
+def _recursive(invocation: Invocation) -> bool:
+    """Whether an invocation descends into the directories it is given."""
+    if invocation.base in RECURSIVE_COMMANDS:
+        return True
+    flags = RECURSIVE_OPTIONS.get(invocation.base, set())
+    for arg in invocation.args:
+        if arg.startswith('--'):
+            if arg in ('--recursive', '--dereference-recursive'):
+                return True
+        elif arg.startswith('-') and flags.intersection(arg[1:]):
+            return True
+    return False
@@ -1,11 +1,22 @@
+import os
+import signal
 import subprocess
-from typing import List
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 from rich.console import Console
 from rich.prompt import Confirm
 
 from command_parser import Command
 from security import SecurityValidator
+from dependencies import build_dependency_graph
+from exec_cache import CachedOutput, ExecCache
+from output_capture import OutputCapture, start_pump
+from audit import audit
+from shell_session import ShellSession
+from tracing import tracer
 
 
 @dataclass
@@ -15,6 +26,16 @@ class ExecutionResult:
     stdout: str
     stderr: str
     return_code: int
+    # Output was already shown while the command ran
+    streamed: bool = False
+    # Set when the output outgrew max_output_bytes and was spilled to disk
+    truncated: bool = False
+    stdout_file: Optional[str] = None
+    stderr_file: Optional[str] = None
+    # Generated command this result belongs to, before any sudo prefix
+    command: Optional[str] = None
+    # When the output was recorded, for results served from the output cache
+    cached_at: Optional[float] = None
 
 
 class CommandExecutor:
@@ -24,44 +45,41 @@ class CommandExecutor:
         self.config = config
         self.security = security_validator
         self.console = Console()
+        self.session: Optional[ShellSession] = None
+        if self.config.get('backend', 'spawn') == 'session':
+            self.session = ShellSession(self.config.get('shell', '/bin/bash'))
+        # Output of read-only commands; a shell session's working directory
+        # is its own, so only spawned commands are cached
+        self.output_cache: Optional[ExecCache] = None
+        cache_config = self.config.get('output_cache') or {}
+        if cache_config.get('enabled', False) and not self.session:
+            self.output_cache = ExecCache(cache_config)
+
+    def close(self) -> None:
+        """Release the shell session, if any."""
+        if self.session:
+            self.session.close()
 
     def execute_commands(self, commands: List[Command]) -> List[ExecutionResult]:
         """Execute a list of commands with user approval."""
+        # A shell session carries state between commands, so it runs them in order
+        if self.config.get('parallel', False) and len(commands) > 1 and not self.session:
+            return self._execute_parallel(commands)
+
         results = []
 
         for i, cmd in enumerate(commands, 1):
             self.console.print(f"\n[cyan]Command {i}/{len(commands)}:[/cyan]")
 
-            # Security validation
-            if not self.security.validate(cmd):
-                self.console.print(
-                    f"[red]✗ Command blocked by security policy[/red]")
-                continue
-
-            # Get user confirmation
-            if not self._confirm_execution(cmd):
-                self.console.print("[yellow]⊘ Skipped[/yellow]")
+            command_str = self._approve(cmd)
+            if command_str is None:
                 continue
 
-            # Handle sudo if needed
-            command_str = cmd.command
-            if cmd.requires_sudo and not command_str.startswith('sudo'):
-                if self.config.get('allow_sudo', True):
-                    if Confirm.ask(
-                            "  [yellow]This command requires sudo. Proceed?[/yellow]"):
-                        command_str = f"sudo {command_str}"
-                    else:
-                        self.console.print(
-                            "[yellow]⊘ Skipped (sudo required)[/yellow]")
-                        continue
-                else:
-                    self.console.print(
-                        "[red]✗ Sudo not allowed by configuration[/red]")
-                    continue
-
             # Execute
             result = self._execute_single(command_str)
+            result.command = cmd.command
             results.append(result)
+            self._audit_result(result, command_str)
 
             # Display result
             self._display_result(result)
@@ -73,6 +91,152 @@ class CommandExecutor:
 
         return results
 
+    def _approve(self, cmd: Command) -> Optional[str]:
+        """Validate and confirm a command, returning the string to run or None."""
+        # Security validation
+        reason = self.security.check(cmd)
+        audit.record(
+            'verdict', level='WARNING' if reason else 'INFO',
+            command=cmd.command, allowed=reason is None, reason=reason,
+            risk_level=cmd.risk_level, requires_sudo=cmd.requires_sudo)
+        if reason:
+            self.console.print(
+                f"[red]✗ Command blocked by security policy ({reason})[/red]")
+            return None
+
+        # Get user confirmation
+        confirmed = self._confirm_execution(cmd)
+        audit.record(
+            'confirmation', level='INFO' if confirmed else 'WARNING',
+            command=cmd.command, approved=confirmed,
+            prompted=self.config.get('require_confirmation', True))
+        if not confirmed:
+            self.console.print("[yellow]⊘ Skipped[/yellow]")
+            return None
+
+        # Handle sudo if needed
+        command_str: str = cmd.command
+        if cmd.requires_sudo and not command_str.startswith('sudo'):
+            if self.config.get('allow_sudo', True):
+                approved = Confirm.ask(
+                    "  [yellow]This command requires sudo. Proceed?[/yellow]")
+                audit.record(
+                    'confirmation', level='INFO' if approved else 'WARNING',
+                    command=cmd.command, approved=approved, sudo=True)
+                if approved:
+                    command_str = f"sudo {command_str}"
+                else:
+                    self.console.print(
+                        "[yellow]⊘ Skipped (sudo required)[/yellow]")
+                    return None
+            else:
+                audit.record(
+                    'verdict', level='WARNING', command=cmd.command, allowed=False,
+                    reason='sudo not allowed by configuration')
+                self.console.print(
+                    "[red]✗ Sudo not allowed by configuration[/red]")
+                return None
+
+        return command_str
+
+    def _execute_parallel(self, commands: List[Command]) -> List[ExecutionResult]:
+        """Run independent commands concurrently, reporting in the original order.
+
+        All confirmations are collected up front so that interactive approval
+        does not serialize the work.
+        """
+        approved: Dict[int, str] = {}
+        for i, cmd in enumerate(commands):
+            self.console.print(f"\n[cyan]Command {i + 1}/{len(commands)}:[/cyan] {cmd.command}")
+            command_str = self._approve(cmd)
+            if command_str is not None:
+                approved[i] = command_str
+
+        if not approved:
+            return []
+
+        # Refresh sudo credentials once instead of prompting from every worker
+        if any(command_str.startswith('sudo') for command_str in approved.values()):
+            subprocess.run(['sudo', '-v'])
+
+        graph = build_dependency_graph([cmd.command for cmd in commands])
+        pending = set(approved)
+        finished: Dict[int, ExecutionResult] = {}
+        running: Dict[Future, int] = {}
+        next_to_report = 0
+        stopped = False
+        results: List[ExecutionResult] = []
+
+        with ThreadPoolExecutor(max_workers=self.config.get('max_workers', 4)) as pool:
+            while pending or running:
+                if not stopped:
+                    # Skipped commands never run, so they do not block dependents
+                    for i in sorted(pending):
+                        if all(dep in finished or dep not in approved for dep in graph[i]):
+                            pending.discard(i)
+                            future = pool.submit(self._execute_single, approved[i], False)
+                            running[future] = i
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    finished[i] = future.result()
+                    finished[i].command = commands[i].command
+                    self._audit_result(finished[i], approved[i])
+                    if not finished[i].success and self.config.get('stop_on_error', False):
+                        stopped = True
+
+                # Report results in order as soon as all earlier ones are known
+                while next_to_report < len(commands) and (
+                        next_to_report in finished or next_to_report not in approved):
+                    self._report_parallel(next_to_report, len(commands), finished, results)
+                    next_to_report += 1
+
+        # After a stop, report whatever had already finished
+        for i in range(next_to_report, len(commands)):
+            self._report_parallel(i, len(commands), finished, results)
+
+        if stopped:
+            self.console.print("[red]⊘ Stopping due to error[/red]")
+
+        return results
+
+    def _report_parallel(
+            self,
+            index: int,
+            total: int,
+            finished: Dict[int, ExecutionResult],
+            results: List[ExecutionResult]
+    ) -> None:
+        if index not in finished:
+            return
+        self.console.print(f"\n[cyan]Result {index + 1}/{total}:[/cyan]")
+        results.append(finished[index])
+        self._display_result(finished[index])
+
+    def _audit_result(self, result: ExecutionResult, command_str: str) -> None:
+        """Record how a command ended; output tails only at DEBUG level."""
+        if not audit.enabled:
+            return
+        fields = {
+            'command': result.command,
+            'executed': command_str,
+            'success': result.success,
+            'return_code': result.return_code,
+            'truncated': result.truncated,
+            'stdout_file': result.stdout_file,
+            'stderr_file': result.stderr_file,
+            'cached': result.cached_at is not None,
+        }
+        if audit.is_enabled_for('DEBUG'):
+            fields['stdout_tail'] = result.stdout[-1000:]
+            fields['stderr_tail'] = result.stderr[-1000:]
+        audit.record('result', level='INFO' if result.success else 'WARNING', **fields)
+
+    @tracer.traced('confirm')
     def _confirm_execution(self, cmd: Command) -> bool:
         """Ask user to confirm command execution."""
         if not self.config.get('require_confirmation', True):
@@ -88,8 +252,48 @@ class CommandExecutor:
 
         return Confirm.ask("  Execute this command?", default=True)
 
-    def _execute_single(self, command: str) -> ExecutionResult:
-        """Execute a single command."""
+    @tracer.traced('execute')
+    def _execute_single(self, command: str, live: bool = True) -> ExecutionResult:
+        """Execute a single command, or serve a read-only one from the output cache."""
+        cache = self.output_cache
+        if cache is None:
+            return self._run(command, live)
+
+        if not cache.cacheable(command):
+            result = self._run(command, live)
+            # It may have changed files that cached commands read
+            cache.clear()
+            return result
+
+        key = cache.key(command, self.config.get('shell', '/bin/bash'))
+        entry = cache.get(key)
+        if entry is not None:
+            return ExecutionResult(
+                success=entry.return_code == 0,
+                stdout=entry.stdout,
+                stderr=entry.stderr,
+                return_code=entry.return_code,
+                cached_at=entry.created_at,
+            )
+
+        # Taken first, so changes made while the command runs invalidate it
+        snapshot = cache.snapshot(command, os.getcwd())
+        started = time.time()
+        result = self._run(command, live)
+        if snapshot is not None and result.success and not result.truncated:
+            cache.put(key, CachedOutput(
+                result.stdout, result.stderr, result.return_code, snapshot, started))
+        return result
+
+    def _run(self, command: str, live: bool) -> ExecutionResult:
+        """Run a command in the session shell or a new process."""
+        # sudo needs a terminal to prompt, which the session shell lacks
+        if self.session and not command.startswith('sudo'):
+            return self._execute_in_session(self.session, command, live)
+
+        if self.config.get('stream_output', True):
+            return self._execute_streaming(command, live)
+
         try:
             process = subprocess.run(
                 command,
@@ -122,12 +326,150 @@ class CommandExecutor:
                 return_code=-1
             )
 
+    def _execute_streaming(self, command: str, live: bool) -> ExecutionResult:
+        """Execute a command while reading its output incrementally.
+
+        Output is echoed as it arrives when ``live`` is set. Only a bounded
+        tail is kept in memory, and on timeout the whole process group is
+        killed.
+        """
+        limit = self.config.get('max_output_bytes', 1024 * 1024)
+        stdout = OutputCapture(limit, 'stdout', sys.stdout if live else None)
+        stderr = OutputCapture(limit, 'stderr', sys.stderr if live else None)
+
+        # sudo must stay on the terminal to prompt, everything else gets its
+        # own process group so a timeout can kill all of its children
+        own_group = not command.startswith('sudo')
+
+        try:
+            process = subprocess.Popen(
+                command,
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                executable=self.config.get('shell', '/bin/bash'),
+                start_new_session=own_group,
+            )
+        except Exception as e:
+            return ExecutionResult(
+                success=False,
+                stdout="",
+                stderr=str(e),
+                return_code=-1
+            )
+
+        # Both pipes were requested, so Popen always opens them
+        assert process.stdout is not None and process.stderr is not None
+        readers = [start_pump(stdout, process.stdout), start_pump(stderr, process.stderr)]
+
+        timed_out = False
+        try:
+            return_code = process.wait(timeout=self.config.get('timeout', 300))
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            return_code = self._kill(process, own_group)
+        except KeyboardInterrupt:
+            self._kill(process, own_group)
+            raise
+        finally:
+            for reader in readers:
+                reader.join(timeout=5)
+            for pipe in (process.stdout, process.stderr):
+                if pipe is not None:
+                    pipe.close()
+            stdout.close()
+            stderr.close()
+
+        stderr_text = stderr.text()
+        if timed_out:
+            stderr_text = f"{stderr_text}\nCommand timed out".lstrip('\n')
+            return_code = -1
+
+        return ExecutionResult(
+            success=return_code == 0,
+            stdout=stdout.text(),
+            stderr=stderr_text,
+            return_code=return_code,
+            streamed=live,
+            truncated=stdout.truncated or stderr.truncated,
+            stdout_file=stdout.spill_path,
+            stderr_file=stderr.spill_path,
+        )
+
+    def _execute_in_session(
+            self,
+            session: ShellSession,
+            command: str,
+            live: bool
+    ) -> ExecutionResult:
+        """Execute a command in the persistent shell session."""
+        limit = self.config.get('max_output_bytes', 1024 * 1024)
+        stream_live = live and self.config.get('stream_output', True)
+        stdout = OutputCapture(limit, 'stdout', sys.stdout if stream_live else None)
+        stderr = OutputCapture(limit, 'stderr', sys.stderr if stream_live else None)
+
+        try:
+            return_code = session.run(
+                command, stdout, stderr, timeout=self.config.get('timeout', 300))
+        except Exception as e:
+            session.close()
+            return ExecutionResult(
+                success=False,
+                stdout="",
+                stderr=str(e),
+                return_code=-1
+            )
+        finally:
+            stdout.close()
+            stderr.close()
+
+        stderr_text = stderr.text()
+        if return_code is None:
+            stderr_text = f"{stderr_text}\nCommand timed out (shell session restarted)".lstrip('\n')
+            return_code = -1
+
+        return ExecutionResult(
+            success=return_code == 0,
+            stdout=stdout.text(),
+            stderr=stderr_text,
+            return_code=return_code,
+            streamed=stream_live,
+            truncated=stdout.truncated or stderr.truncated,
+            stdout_file=stdout.spill_path,
+            stderr_file=stderr.spill_path,
+        )
+
+    def _kill(self, process: subprocess.Popen, own_group: bool) -> int:
+        """Terminate the command and, with its own group, everything it spawned."""
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                if own_group:
+                    os.killpg(process.pid, sig)
+                else:
+                    process.send_signal(sig)
+            except ProcessLookupError:
+                break
+            try:
+                return process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                continue
+        return process.wait()
+
     def _display_result(self, result: ExecutionResult) -> None:
         """Display execution result to user."""
+        if result.cached_at is not None:
+            age = time.time() - result.cached_at
+            self.console.print(
+                f"[dim]↺ Cached output from {age:.0f}s ago, the files it read are unchanged[/dim]")
+
         if result.success:
-            if result.stdout:
+            if result.stdout and not result.streamed:
                 self.console.print("\n" + result.stdout)
         else:
             self.console.print(f"[red]✗ Failed (exit code: {result.return_code})[/red]")
-            if result.stderr:
+            if result.stderr and not result.streamed:
                 self.console.print(f"[red]{result.stderr}[/red]")
+
+        for path in (result.stdout_file, result.stderr_file):
+            if path:
+                self.console.print(f"[dim]Full output saved to {path}[/dim]")
@@ -0,0 +1,32 @@
+from typing import Optional
+
+# GBNF rules for one standalone command per line. Chaining operators
+# (';', '&&', '||', '&') cannot be produced outside quotes or escapes,
+# while single pipes and redirections such as '2>&1' remain possible.
+COMMAND_RULES = r'''
+command  ::= head tail*
+head     ::= [^ \t\n#$`;&|'"\\] | escaped | squoted | dquoted
+tail     ::= [^\n;&|'"\\] | pipe | redirect | escaped | squoted | dquoted
+pipe     ::= "|" [^\n;&|]
+redirect ::= ">&" [0-9-] | "&>"
+escaped  ::= "\\" [^\n]
+squoted  ::= "'" [^'\n]* "'"
+dquoted  ::= "\"" ( [^"\\\n] | "\\" [^\n] )* "\""
+'''
+
+
+def command_grammar(max_commands: Optional[int] = None) -> str:
+    """GBNF grammar for up to ``max_commands`` newline separated commands.
+
+    Without a limit any number of commands is allowed. The count is spelled
+    out as nested optionals, which every llama.cpp grammar version accepts.
+    """
+    if max_commands:
+        rest = ''
+        for _ in range(max_commands - 1):
+            rest = f' ("\\n" command{rest})?'
+        root = f'command{rest}'
+    else:
+        root = 'command ("\\n" command)*'
+
+    return f"root     ::= {root}\n{COMMAND_RULES.lstrip()}"
@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from command_parser import Command
+from result_cache import normalize_prompt
+
+# Words that do not change what a prompt asks for
+FILLER_WORDS = {'a', 'an', 'the', 'please'}
+
+# Words left out when comparing what two prompts ask for; verbs, names,
+# paths, numbers, negations and the direction words (from, to, into) stay
+FUNCTION_WORDS = FILLER_WORDS | {
+    'i', 'me', 'my', 'you', 'your', 'it', 'its', 'can', 'could', 'would', 'will',
+    'is', 'are', 'be', 'of', 'in', 'on', 'at', 'for', 'with', 'and',
+    'that', 'this', 'these', 'those', 'which', 'all', 'any', 'every', 'each', 'some', 'just',
+}
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized prompt without filler words."""
+    words = [word for word in normalize_prompt(text).split() if word not in FILLER_WORDS]
+    padded = f"  {' '.join(words)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def content_words(text: str) -> List[str]:
+    """Words of a normalized prompt that carry its meaning, in order."""
+    return [word for word in normalize_prompt(text).split() if word not in FUNCTION_WORDS]
+
+
+@dataclass
+class HistoryMatch:
+    """A past prompt similar to the current one and its accepted commands."""
+    prompt: str
+    commands: List[Command]
+    similarity: float
+    entry_id: int
+
+
+class CommandHistory:
+    """Local store of prompts whose commands the user ran successfully.
+
+    Prompts are indexed by character trigrams in SQLite, so a similar
+    prompt is found without scanning the whole history. Similarity is the
+    Jaccard index of the trigram sets, and the content words must match
+    exactly and in order: "delete" and "list", "compress" and "decompress",
+    /var/log and /var/lib, or 7 and 70 days look alike as trigrams.
+    """
+
+    # Candidates fetched from the trigram index before exact scoring
+    CANDIDATES = 20
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.path = Path(os.path.expanduser(
+            config.get('path', '~/.orcas/history.db')))
+        self.threshold = config.get('threshold', 0.8)
+        self.max_entries = config.get('max_entries', 5000)
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                prompt TEXT NOT NULL UNIQUE,
+                commands TEXT NOT NULL,
+                trigram_count INTEGER NOT NULL,
+                uses INTEGER NOT NULL DEFAULT 1,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+            CREATE TABLE IF NOT EXISTS trigrams (
+                trigram TEXT NOT NULL,
+                entry_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS trigrams_trigram ON trigrams (trigram);
+            CREATE INDEX IF NOT EXISTS trigrams_entry ON trigrams (entry_id);
+        """)
+        self._db.commit()
+
+    def lookup(
+            self,
+            prompt: str,
+            analyze: Callable[[str, str], Command]
+    ) -> Optional[HistoryMatch]:
+        """Return the most similar past prompt above the threshold, if any.
+
+        Only the command text and description are stored, so ``analyze``
+        rebuilds each command's sudo and risk analysis with the current rules.
+        """
+        grams = trigrams(prompt)
+        if not grams:
+            return None
+        words = content_words(prompt)
+        placeholders = ','.join('?' * len(grams))
+
+        with self._lock:
+            rows = self._db.execute(
+                f"""
+                SELECT e.id, e.prompt, e.commands, e.trigram_count, COUNT(*) AS shared
+                FROM trigrams t JOIN entries e ON e.id = t.entry_id
+                WHERE t.trigram IN ({placeholders})
+                GROUP BY e.id
+                ORDER BY shared DESC
+                LIMIT ?
+                """,
+                (*grams, self.CANDIDATES),
+            ).fetchall()
+
+        best: Optional[HistoryMatch] = None
+        for entry_id, past_prompt, commands, count, shared in rows:
+            similarity = shared / (len(grams) + count - shared)
+            if similarity < self.threshold or content_words(past_prompt) != words:
+                continue
+            if best is None or similarity > best.similarity:
+                best = HistoryMatch(
+                    prompt=past_prompt,
+                    commands=[
+                        analyze(cmd['command'], cmd.get('description', ''))
+                        for cmd in json.loads(commands)
+                    ],
+                    similarity=similarity,
+                    entry_id=entry_id,
+                )
+        return best
+
+    def record(self, prompt: str, commands: List[Command]) -> None:
+        """Remember the commands that answered a prompt."""
+        normalized = normalize_prompt(prompt)
+        payload = json.dumps([
+            {'command': cmd.command, 'description': cmd.description}
+            for cmd in commands
+        ])
+        grams = trigrams(prompt)
+        now = time.time()
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM entries WHERE prompt = ?", (normalized,)).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE entries SET commands = ?, uses = uses + 1, last_used = ? WHERE id = ?",
+                    (payload, now, row[0]))
+            else:
+                cursor = self._db.execute(
+                    "INSERT INTO entries (prompt, commands, trigram_count, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    (normalized, payload, len(grams), now))
+                self._db.executemany(
+                    "INSERT INTO trigrams (trigram, entry_id) VALUES (?, ?)",
+                    [(gram, cursor.lastrowid) for gram in grams])
+                self._trim()
+            self._db.commit()
+
+    def forget(self, entry_id: int) -> None:
+        """Drop an entry, e.g. once the security policy rejects it."""
+        with self._lock:
+            self._delete([entry_id])
+            self._db.commit()
+
+    def _trim(self) -> None:
+        """Evict the least recently used entries beyond max_entries."""
+        if not self.max_entries:
+            return
+        rows = self._db.execute(
+            "SELECT id FROM entries ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+            (self.max_entries,)).fetchall()
+        self._delete([row[0] for row in rows])
+
+    def _delete(self, entry_ids: List[int]) -> None:
+        for entry_id in entry_ids:
+            self._db.execute("DELETE FROM trigrams WHERE entry_id = ?", (entry_id,))
+            self._db.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
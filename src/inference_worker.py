@@ -0,0 +1,346 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+from tracing import tracer
+
+# ModelManager methods the worker runs on request
+METHODS = {
+    'load', 'unload', 'warm_prefix', 'count_tokens',
+    'generate', 'generate_stream', 'generate_candidates',
+}
+
+# How often the parent checks for replies, a crashed worker and deadlines
+POLL_INTERVAL = 0.05
+
+
+def create_model_manager(config: Dict[str, Any]) -> Any:
+    """A ModelManager, run in a worker process when ``model.worker`` is enabled."""
+    if (config.get('worker') or {}).get('enabled', True):
+        return InferenceWorker(config)
+
+    from model_manager import ModelManager
+    return ModelManager(config)
+
+
+class InferenceWorker:
+    """Runs a ModelManager in a child process that owns the model.
+
+    It offers the same methods as ModelManager, so the parser cannot tell
+    the two apart. The parent only ever waits on a pipe, so Ctrl-C and
+    closing a stream take effect right away. Either one sets a shared event
+    that the child checks after every sampled token, and the child drops
+    the rest of the generation. Its final reply is collected before the
+    next request. Generations have a deadline (``worker.timeout``) that the
+    child enforces the same way. A child that crashes or ignores its
+    deadline is replaced. The new child maps the weights from the page
+    cache and restores the prefix state from the on-disk prefix cache.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        worker_config = config.get('worker') or {}
+        self.timeout = worker_config.get('timeout', 120)
+        # How long a cancelled or expired generation may take to wind down
+        self.cancel_grace = worker_config.get('cancel_grace', 5)
+        self.last_prompt_tokens = 0
+        self.last_completion_tokens = 0
+        self.last_draft: Optional[Dict[str, int]] = None
+        # Child processes are spawned: forking a process with threads is unsafe
+        self._context = multiprocessing.get_context('spawn')
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        # Pipe end and cancel event, set while a worker runs
+        self._conn: Any = None
+        self._cancel: Any = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # A cancelled request whose final reply has not been read yet
+        self._abandoned: Optional[int] = None
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded and self._process is not None and self._process.is_alive()
+
+    def load(self) -> None:
+        """Start the worker and load the model unless it is already loaded."""
+        if not self.loaded:
+            backend = self.config.get('backend', 'llama')
+            with tracer.span('model load', backend=backend, worker=True):
+                self._call('load')
+            self._loaded = True
+
+    def unload(self) -> None:
+        """Free the model; the worker process keeps running without it."""
+        if self._process is not None and self._process.is_alive():
+            self._call('unload')
+        self._loaded = False
+
+    def close(self) -> None:
+        """Stop the worker process."""
+        with self._lock:
+            self._stop_worker()
+
+    def estimated_size(self) -> int:
+        from model_manager import ModelManager
+        size: int = ModelManager(self.config).estimated_size()
+        return size
+
+    def warm_prefix(self, prefix: str) -> None:
+        self._call('warm_prefix', prefix)
+        self._loaded = True
+
+    def count_tokens(self, text: str) -> int:
+        count: int = self._call('count_tokens', text)
+        self._loaded = True
+        return count
+
+    def generate(self, prompt: str, **kwargs: Any) -> str:
+        with tracer.span('generate', worker=True) as span:
+            text: str = self._call('generate', prompt, timeout=self.timeout, **kwargs)
+            span.set(tokens_in=self.last_prompt_tokens, tokens_out=self.last_completion_tokens)
+        self._loaded = True
+        return text
+
+    def generate_candidates(self, prompt: str, count: int, **kwargs: Any) -> List[str]:
+        with tracer.span('generate', worker=True, candidates=count) as span:
+            texts: List[str] = self._call(
+                'generate_candidates', prompt, count, timeout=self.timeout, **kwargs)
+            span.set(tokens_in=self.last_prompt_tokens, tokens_out=self.last_completion_tokens)
+        self._loaded = True
+        return texts
+
+    def generate_stream(self, prompt: str, **kwargs: Any) -> Generator[str, None, None]:
+        """Yield chunks as the worker decodes them; closing the generator cancels it."""
+        self._loaded = True
+        with tracer.span('generate', worker=True, stream=True) as span, self._lock:
+            replies = self._request('generate_stream', (prompt,), kwargs, self.timeout)
+            try:
+                for kind, payload in replies:
+                    if kind == 'chunk':
+                        yield payload
+            finally:
+                # Cancels the generation if it did not finish
+                replies.close()
+                span.set(tokens_in=self.last_prompt_tokens, tokens_out=self.last_completion_tokens)
+
+    def _call(self, method: str, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Run a method in the worker and return its result."""
+        with self._lock:
+            replies = self._request(method, args, kwargs, timeout)
+            result = None
+            try:
+                for kind, payload in replies:
+                    if kind == 'result':
+                        result = payload
+            finally:
+                replies.close()
+            return result
+
+    def _request(
+            self,
+            method: str,
+            args: Tuple[Any, ...],
+            kwargs: Dict[str, Any],
+            timeout: Optional[float]
+    ) -> Generator[Tuple[str, Any], None, None]:
+        """Send one request, yielding ('chunk', text) replies and finally ('result', value).
+
+        A worker that dies before replying is replaced and the request sent
+        once more; one that dies after streaming output raises. The caller
+        holds the lock.
+        """
+        for attempt in range(2):
+            self._ensure_worker()
+            self._collect_abandoned()
+
+            self._next_id += 1
+            request_id = self._next_id
+            self._cancel.clear()
+            self._conn.send((request_id, method, args, kwargs, timeout))
+
+            # The parent gives up a little after the worker's own deadline
+            deadline = time.monotonic() + timeout + self.cancel_grace if timeout else None
+            streamed = 0
+            finished = False
+            try:
+                while True:
+                    reply = self._receive(deadline)
+                    if reply is None:
+                        break
+                    kind, reply_id, payload, stats = reply
+                    if reply_id != request_id:
+                        continue
+                    if kind == 'chunk':
+                        streamed += 1
+                        yield 'chunk', payload
+                        continue
+
+                    finished = True
+                    self._record(stats)
+                    if kind == 'timeout':
+                        raise RuntimeError(f"Generation timed out after {timeout}s")
+                    if kind == 'error':
+                        raise RuntimeError(payload)
+                    yield 'result', payload
+                    return
+            finally:
+                if not finished and self._process is not None:
+                    # Ctrl-C, a closed stream or a parent deadline: let the
+                    # worker stop and read its final reply with the next request
+                    self._cancel.set()
+                    self._abandoned = request_id
+                    # The worker's counts come with that reply; until then
+                    # report what reached the caller, not the previous request
+                    self.last_prompt_tokens = 0
+                    self.last_completion_tokens = streamed
+                    self.last_draft = None
+
+            exitcode = self._process.exitcode if self._process is not None else None
+            self._stop_worker()
+            if streamed or attempt:
+                raise RuntimeError(f"Inference worker exited unexpectedly (exit code {exitcode})")
+
+    def _receive(self, deadline: Optional[float]) -> Optional[tuple]:
+        """Wait for the next reply; None if the worker died."""
+        while not self._conn.poll(POLL_INTERVAL):
+            if self._process is None or not self._process.is_alive():
+                # Replies sent right before exiting are still readable
+                if self._conn.poll(0):
+                    break
+                return None
+            if deadline is not None and time.monotonic() > deadline:
+                # Stuck in native code past its own deadline
+                self._stop_worker()
+                raise RuntimeError("Generation timed out and the inference worker was restarted")
+        try:
+            reply: tuple = self._conn.recv()
+        except (EOFError, OSError):
+            return None
+        return reply
+
+    def _collect_abandoned(self) -> None:
+        """Read the final reply of a cancelled request, restarting a worker that takes too long."""
+        if self._abandoned is None:
+            return
+
+        deadline = time.monotonic() + self.cancel_grace
+        try:
+            while True:
+                reply = self._receive(deadline)
+                if reply is None or (reply[1] == self._abandoned and reply[0] != 'chunk'):
+                    break
+        except RuntimeError:
+            pass
+        self._abandoned = None
+        self._ensure_worker()
+
+    def _record(self, stats: Optional[Dict[str, Any]]) -> None:
+        if stats:
+            self.last_prompt_tokens = stats['last_prompt_tokens']
+            self.last_completion_tokens = stats['last_completion_tokens']
+            self.last_draft = stats['last_draft']
+
+    def _ensure_worker(self) -> None:
+        """Start a worker unless one is running."""
+        if self._process is not None and self._process.is_alive():
+            return
+
+        self._stop_worker()
+        parent_conn, child_conn = self._context.Pipe()
+        self._cancel = self._context.Event()
+        self._process = self._context.Process(
+            target=_serve, args=(child_conn, self.config, self._cancel),
+            name='orcas-inference', daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._abandoned = None
+
+    def _stop_worker(self) -> None:
+        if self._process is None:
+            return
+
+        if self._process.is_alive():
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+            self._process.join(timeout=1)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+        self._conn.close()
+        self._process = None
+        self._conn = None
+        self._abandoned = None
+        # A new worker starts without the model
+        self._loaded = False
+
+
+def _serve(conn: Any, config: Dict[str, Any], cancel: Any) -> None:
+    """Worker process: run ModelManager requests from the pipe until told to stop."""
+    # Ctrl-C reaches the whole process group; the parent decides what to cancel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ["LLAMA_LOG_LEVEL"] = "error"
+
+    from model_manager import ModelManager
+
+    manager = ModelManager(config)
+    deadline: Optional[float] = None
+
+    def should_stop() -> bool:
+        return cancel.is_set() or (deadline is not None and time.monotonic() > deadline)
+
+    manager.should_stop = should_stop
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+
+        request_id, method, args, kwargs, timeout = request
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            if method not in METHODS:
+                raise ValueError(f"Unknown worker method: {method}")
+            if method == 'generate_stream':
+                stream = manager.generate_stream(*args, **kwargs)
+                try:
+                    for chunk in stream:
+                        conn.send(('chunk', request_id, chunk, None))
+                        if should_stop():
+                            break
+                finally:
+                    stream.close()
+                result = None
+            else:
+                result = getattr(manager, method)(*args, **kwargs)
+
+            kind = 'result'
+            if deadline is not None and time.monotonic() > deadline and not cancel.is_set():
+                kind = 'timeout'
+            reply = (kind, request_id, result, _stats(manager))
+        except Exception as e:
+            reply = ('error', request_id, str(e), _stats(manager))
+
+        try:
+            conn.send(reply)
+        except (EOFError, OSError):
+            break
+
+    manager.unload()
+
+
+def _stats(manager: Any) -> Dict[str, Any]:
+    return {
+        'last_prompt_tokens': manager.last_prompt_tokens,
+        'last_completion_tokens': manager.last_completion_tokens,
+        'last_draft': manager.last_draft,
+    }
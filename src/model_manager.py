@@ -1,28 +1,71 @@
+import hashlib
 import os
+import pickle
+import tempfile
+import time
 from pathlib import Path
-from typing import Optional, Dict, Any
-import sys
+from typing import Optional, Dict, Any, Callable, Generator, List
 
-try:
-    from llama_cpp import Llama
-except ImportError:
-    print("Error: llama-cpp-python is not installed")
-    print("Install it with: pip install llama-cpp-python")
-    sys.exit(1)
+from startup import profile
+from tracing import tracer
+
+# Bytes read from the start of the model file when fingerprinting it
+FINGERPRINT_BYTES = 1024 * 1024
+
+# Temporary files of interrupted snapshot writes are removed after this long
+STALE_TMP_SECONDS = 3600
 
 
 class ModelManager:
-    """Manages local LLM loading and inference."""
+    """Manages local LLM loading and inference.
+
+    The model is loaded on first use, so answers served from the result
+    cache never pay for importing llama.cpp or reading the weights.
+    """
 
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-        self.model: Optional[Llama] = None
-        self._load_model()
+        # llama_cpp.Llama or the stub backend, None until loaded
+        self.model: Any = None
+        self.model_file: Optional[Path] = None
+        self._fingerprint: Optional[str] = None
+        self._prefix_states: Dict[str, Any] = {}
+        self._grammars: Dict[str, Any] = {}
+        # Speculative decoding helper configured under model.draft
+        self.drafter: Optional[Any] = None
+        # Prompt tokens and tokens produced by the most recent generation
+        self.last_prompt_tokens = 0
+        self.last_completion_tokens = 0
+        # Drafted and accepted tokens of the most recent generation
+        self.last_draft: Optional[Dict[str, int]] = None
+        # Checked after every sampled token; returning True ends generation
+        self.should_stop: Optional[Callable[[], bool]] = None
 
-    def _load_model(self) -> None:
-        """Load the LLM model from disk."""
-        # Silence llama.cpp info and debug logs
-        os.environ["LLAMA_LOG_LEVEL"] = "error"
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def load(self) -> None:
+        """Load the model unless it is already loaded."""
+        if self.model is None:
+            self._load_model()
+
+    def unload(self) -> None:
+        """Free the model and its cached prefix states."""
+        if self.model is None:
+            return
+
+        close = getattr(self.model, 'close', None)
+        if close is not None:
+            close()
+        self.model = None
+        self.drafter = None
+        self._prefix_states.clear()
+
+    def find_model_file(self) -> Path:
+        """Return the first GGUF file in the model path matching the model name."""
+        if self.model_file is not None:
+            return self.model_file
 
         model_path = Path(os.path.expanduser(self.config['path']))
         model_name = self.config['name']
@@ -34,37 +77,341 @@ class ModelManager:
                 f"Please download a model first with: orcas --download-model"
             )
 
-        model_file = possible_files[0]
+        self.model_file = possible_files[0]
+        return self.model_file
+
+    def estimated_size(self) -> int:
+        """Approximate resident size of the model in bytes, its GGUF file size."""
+        from backends import needs_model_file
+        if not needs_model_file(self.config):
+            return 0
+        return self.find_model_file().stat().st_size
+
+    def _load_model(self) -> None:
+        """Load the LLM model from disk."""
+        # Silence llama.cpp info and debug logs
+        os.environ["LLAMA_LOG_LEVEL"] = "error"
+
+        from backends import load_backend, needs_model_file
+
+        # The stub backend replays canned responses and needs no weights
+        model_file = self.find_model_file() if needs_model_file(self.config) else None
+
+        with tracer.span('model load', backend=self.config.get('backend', 'llama')):
+            self.model = load_backend(self.config, model_file)
+
+        draft_config = self.config.get('draft') or {}
+        if model_file is not None and draft_config.get('mode', 'none') != 'none':
+            from speculative import create_drafter
+            with profile.phase('init', 'draft model'):
+                self.drafter = create_drafter(self.model, draft_config, model_file.parent)
+            # Drafted tokens are verified by the target, so output is unchanged
+            self.model.draft_model = self.drafter
+
+    def generate(
+            self,
+            prompt: str,
+            max_tokens: int = 256,
+            prefix: Optional[str] = None,
+            grammar: Optional[str] = None
+    ) -> str:
+        """Generate text from the model.
+
+        When ``prefix`` is given and the prompt starts with it, the cached
+        model state for the prefix is restored first so that only the
+        remainder of the prompt has to be evaluated. A GBNF ``grammar``
+        restricts sampling to text the grammar accepts.
+        """
+        self._prepare(prompt, prefix)
+
+        draft_before = self._draft_counts()
+        with tracer.span('generate', tokens_in=self.last_prompt_tokens) as span:
+            response = self.model(prompt, **self._sampling_args(max_tokens, grammar))
+            self.last_completion_tokens = response.get('usage', {}).get('completion_tokens', 0)
+            span.set(tokens_out=self.last_completion_tokens)
+        self._record_draft(draft_before)
+
+        text: str = response['choices'][0]['text']
+        return text.strip()
+
+    def generate_candidates(
+            self,
+            prompt: str,
+            count: int,
+            max_tokens: int = 256,
+            prefix: Optional[str] = None,
+            grammar: Optional[str] = None,
+            temperature: float = 0.7
+    ) -> List[str]:
+        """Sample ``count`` completions of one prompt.
+
+        llama.cpp keeps the longest common prefix of its context, so the
+        prompt is evaluated once and every further sample only decodes its
+        own tokens. Each sample uses its own seed and ``temperature`` so that
+        they differ from each other and from ``generate``.
+        """
+        self._prepare(prompt, prefix)
+
+        args = self._sampling_args(max_tokens, grammar)
+        args['temperature'] = temperature
+        texts = []
+        self.last_completion_tokens = 0
+        draft_before = self._draft_counts()
+        with tracer.span('generate', tokens_in=self.last_prompt_tokens, candidates=count) as span:
+            for seed in range(1, count + 1):
+                response = self.model(prompt, seed=seed, **args)
+                self.last_completion_tokens += response.get('usage', {}).get('completion_tokens', 0)
+                texts.append(response['choices'][0]['text'].strip())
+            span.set(tokens_out=self.last_completion_tokens)
+        self._record_draft(draft_before)
+
+        return texts
+
+    def generate_stream(
+            self,
+            prompt: str,
+            max_tokens: int = 256,
+            prefix: Optional[str] = None,
+            grammar: Optional[str] = None
+    ) -> Generator[str, None, None]:
+        """Generate text from the model, yielding chunks as they are decoded.
+
+        Closing the returned generator stops generation.
+        """
+        self._prepare(prompt, prefix)
+
+        draft_before = self._draft_counts()
+        stream = self.model(prompt, stream=True, **self._sampling_args(max_tokens, grammar))
+        self.last_completion_tokens = 0
+        # Includes the time the caller spends on each chunk, traced separately
+        with tracer.span('generate', tokens_in=self.last_prompt_tokens, stream=True) as span:
+            try:
+                for chunk in stream:
+                    # llama.cpp streams one chunk per sampled token
+                    self.last_completion_tokens += 1
+                    yield chunk['choices'][0]['text']
+            finally:
+                stream.close()
+                span.set(tokens_out=self.last_completion_tokens)
+                self._record_draft(draft_before)
+
+    def _draft_counts(self) -> Optional[tuple]:
+        if self.drafter is None:
+            return None
+        return self.drafter.stats.proposed, self.drafter.stats.accepted
+
+    def _record_draft(self, before: Optional[tuple]) -> None:
+        """Store how many drafted tokens the last generation accepted."""
+        if before is None or self.drafter is None:
+            self.last_draft = None
+            return
+
+        stats = self.drafter.stats
+        # The final proposal is only resolved by the context generation ended with
+        stats.settle([int(t) for t in self.model.input_ids[:self.model.n_tokens]])
+        self.last_draft = {
+            'proposed': stats.proposed - before[0],
+            'accepted': stats.accepted - before[1],
+        }
+
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens the text takes up, without the BOS token."""
+        self.load()
+        return len(self.model.tokenize(text.encode('utf-8'), add_bos=False))
+
+    def _prepare(self, prompt: str, prefix: Optional[str]) -> None:
+        """Load the model if needed and restore the prefix state."""
+        self.load()
+        self.last_prompt_tokens = len(self.model.tokenize(prompt.encode('utf-8')))
+
+        if prefix and prompt.startswith(prefix):
+            with tracer.span('prefix restore'):
+                self.warm_prefix(prefix)
+
+    def _sampling_args(self, max_tokens: int, grammar: Optional[str] = None) -> Dict[str, Any]:
+        args = {
+            'max_tokens': max_tokens,
+            'temperature': 0.2,
+            'top_p': 0.95,
+            'stop': ["\n\n", "User:", "Human:"],
+            'echo': False,
+        }
+        if grammar:
+            args['grammar'] = self._compiled_grammar(grammar)
+        if self.should_stop is not None:
+            should_stop = self.should_stop
+            args['stopping_criteria'] = lambda input_ids, logits: should_stop()
+        return args
+
+    def _compiled_grammar(self, grammar: str) -> Any:
+        """Parse a GBNF grammar once and reuse it for later requests."""
+        compiled = self._grammars.get(grammar)
+        if compiled is None:
+            from llama_cpp import LlamaGrammar
+            compiled = LlamaGrammar.from_string(grammar, verbose=False)
+            self._grammars[grammar] = compiled
+        return compiled
+
+    def warm_prefix(self, prefix: str) -> None:
+        """Load the model and make sure its context starts with the evaluated prefix."""
+        self.load()
+        if not self.config.get('prefix_cache', True):
+            return
+
+        tokens = self.model.tokenize(prefix.encode('utf-8'))
+
+        # Already in the live context, e.g. after a previous request
+        if self._context_starts_with(tokens):
+            return
+
+        key = self._prefix_key(prefix)
+        state = self._prefix_states.get(key)
+        if state is None:
+            state = self._load_prefix_state(key)
+
+        if state is not None:
+            try:
+                self.model.load_state(state)
+                self._prefix_states[key] = state
+                return
+            except Exception:
+                # Incompatible snapshot, evaluate the prefix again
+                self._prefix_states.pop(key, None)
+
+        self.model.reset()
+        self.model.eval(tokens)
+        state = self.model.save_state()
+        self._prefix_states[key] = state
+        self._save_prefix_state(key, state)
+
+    def _context_starts_with(self, tokens: List[int]) -> bool:
+        """Check whether the live context already holds the given tokens."""
+        n_tokens = self.model.n_tokens
+        if n_tokens < len(tokens):
+            return False
+        return list(self.model.input_ids[:len(tokens)]) == list(tokens)
+
+    def _prefix_key(self, prefix: str) -> str:
+        """Key a prefix snapshot by model fingerprint, context size and prompt."""
+        digest = hashlib.sha256()
+        digest.update(self._model_fingerprint().encode('utf-8'))
+        digest.update(str(self.config.get('n_ctx', 2048)).encode('utf-8'))
+        digest.update(prefix.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _model_fingerprint(self) -> str:
+        """Cheap stand-in for a full model hash.
+
+        Hashing a multi-GB GGUF on every start would cost more than the
+        prefix evaluation it saves, so the name, size, mtime and first
+        megabyte of the file are hashed instead.
+        """
+        if self._fingerprint is not None:
+            return self._fingerprint
+
+        model_file = self.model_file
+        if model_file is None:
+            # Stub backend: its responses stand in for the weights
+            stub = repr(sorted((self.config.get('stub') or {}).items()))
+            self._fingerprint = hashlib.sha256(stub.encode('utf-8')).hexdigest()
+            return self._fingerprint
+
+        stat = model_file.stat()
+        digest = hashlib.sha256()
+        digest.update(f"{model_file.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        with open(model_file, 'rb') as f:
+            digest.update(f.read(FINGERPRINT_BYTES))
+        self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def _prefix_cache_dir(self) -> Optional[Path]:
+        if not self.config.get('persist_prefix_cache', True):
+            return None
+        return Path(os.path.expanduser(
+            self.config.get('prefix_cache_dir', '~/.orcas/cache')))
+
+    def _load_prefix_state(self, key: str) -> Optional[Any]:
+        """Load a prefix snapshot written by an earlier process."""
+        cache_dir = self._prefix_cache_dir()
+        if cache_dir is None:
+            return None
+
+        state_file = cache_dir / f"prefix-{key}.state"
+        if not state_file.exists():
+            return None
+
+        try:
+            with open(state_file, 'rb') as f:
+                state = pickle.load(f)
+        except Exception:
+            # Unreadable snapshot, it is written again after the prefix is evaluated
+            self._remove(state_file)
+            return None
+
+        # Recently used snapshots are evicted last
+        try:
+            os.utime(state_file)
+        except OSError:
+            pass
+        return state
+
+    def _save_prefix_state(self, key: str, state: Any) -> None:
+        """Persist a prefix snapshot, replacing the file atomically."""
+        cache_dir = self._prefix_cache_dir()
+        if cache_dir is None:
+            return
+
+        state_file = cache_dir / f"prefix-{key}.state"
+        tmp_path = None
+        try:
+            cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # Written aside and renamed, so a crash never leaves a truncated snapshot
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='prefix-', suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, state_file)
+        except (OSError, pickle.PicklingError):
+            # The in-memory snapshot still works without the disk cache
+            if tmp_path is not None:
+                self._remove(Path(tmp_path))
+            return
+
+        self._evict_prefix_states(cache_dir, state_file)
+
+    def _evict_prefix_states(self, cache_dir: Path, keep: Path) -> None:
+        """Delete the least recently used snapshots beyond ``prefix_cache_max_mb``.
+
+        Snapshots of earlier prompts, examples or models are never looked up
+        again, so without a limit they would pile up.
+        """
+        max_bytes = int(self.config.get('prefix_cache_max_mb', 512) * 1024 * 1024)
+        now = time.time()
+
+        snapshots = []
+        for path in cache_dir.glob('prefix-*'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if path.suffix == '.tmp':
+                # Left behind by a process that died while writing
+                if now - stat.st_mtime > STALE_TMP_SECONDS:
+                    self._remove(path)
+                continue
+            snapshots.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in snapshots)
+        for _, size, path in sorted(snapshots, key=lambda snapshot: snapshot[0]):
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
 
+    @staticmethod
+    def _remove(path: Path) -> None:
         try:
-            # Suppress stderr noise during model load
-            with open(os.devnull, "w") as devnull:
-                old_stderr = sys.stderr
-                sys.stderr = devnull
-                try:
-                    self.model = Llama(
-                        model_path=str(model_file),
-                        n_ctx=self.config.get("n_ctx", 2048),
-                        n_gpu_layers=self.config.get("n_gpu_layers", 0),
-                        verbose=False,
-                    )
-                finally:
-                    sys.stderr = old_stderr
-        except Exception as e:
-            raise RuntimeError(f"Failed to load model: {e}")
-
-    def generate(self, prompt: str, max_tokens: int = 256) -> str:
-        """Generate text from the model."""
-        if not self.model:
-            raise RuntimeError("Model not loaded")
-
-        response = self.model(
-            prompt,
-            max_tokens=max_tokens,
-            temperature=0.2,
-            top_p=0.95,
-            stop=["\n\n", "User:", "Human:"],
-            echo=False,
-        )
-
-        return response['choices'][0]['text'].strip()
\ No newline at end of file
+            path.unlink()
+        except OSError:
+            pass
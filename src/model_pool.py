@@ -0,0 +1,98 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from inference_worker import create_model_manager
+from model_manager import ModelManager
+
+# Words that usually mean a request needs several steps or some reasoning
+ESCALATION_HINTS = {
+    'and', 'then', 'after', 'before', 'each', 'every', 'if', 'unless',
+    'while', 'until', 'except', 'otherwise', 'script', 'loop', 'only',
+}
+
+
+class ModelPool:
+    """Several models kept loaded within a memory budget.
+
+    Models are loaded on demand. When loading one would exceed the budget,
+    the least recently used models are unloaded first. Weights are
+    memory-mapped, so a model evicted earlier reloads from the page cache.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        pool_config = config.get('pool') or {}
+
+        # Smallest first; the main model is always last, it is escalated to
+        self.names: List[str] = [
+            name for name in pool_config.get('models') or [] if name != config['name']
+        ]
+        self.names.append(config['name'])
+
+        self.budget = int(pool_config.get('memory_budget_mb', 0)) * 1024 * 1024
+        # ModelManagers, or InferenceWorkers standing in for them
+        self.managers: Dict[str, ModelManager] = {
+            name: create_model_manager(self._model_config(name)) for name in self.names
+        }
+        # Loaded models and their sizes, least recently used first
+        self._loaded: 'OrderedDict[str, int]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> ModelManager:
+        """Return a loaded model, evicting others if the budget requires it."""
+        with self._lock:
+            manager = self.managers[name]
+            if name in self._loaded and manager.loaded:
+                self._loaded.move_to_end(name)
+                return manager
+
+            size = manager.estimated_size()
+            if self.budget and size > self.budget:
+                raise RuntimeError(
+                    f"Model '{name}' ({size // 2 ** 20} MB) does not fit in the "
+                    f"memory budget of {self.budget // 2 ** 20} MB"
+                )
+
+            while self.budget and self._loaded and sum(self._loaded.values()) + size > self.budget:
+                evicted, _ = self._loaded.popitem(last=False)
+                self.managers[evicted].unload()
+
+            manager.load()
+            self._loaded[name] = size
+            return manager
+
+    def loaded(self) -> List[str]:
+        """Names of the loaded models, least recently used first."""
+        return list(self._loaded)
+
+    def _model_config(self, name: str) -> Dict[str, Any]:
+        config = dict(self.config, name=name)
+        # Only the main model drafts, smaller ones are fast enough already
+        if name != self.config['name']:
+            config['draft'] = {'mode': 'none'}
+        return config
+
+
+class ModelRouter:
+    """Sends simple prompts to the smallest model and escalates on bad output.
+
+    A prompt counts as simple when it is short and has none of the words
+    that usually mean several steps. Simple prompts try every pool model
+    from smallest to largest; the others go straight to the largest one.
+    """
+
+    def __init__(self, pool: ModelPool, config: Dict[str, Any]):
+        self.pool = pool
+        self.max_words = config.get('max_words', 12)
+
+    def route(self, prompt: str) -> List[str]:
+        """Names of the models to try for a prompt, in order."""
+        if self.is_simple(prompt):
+            return list(self.pool.names)
+        return self.pool.names[-1:]
+
+    def is_simple(self, prompt: str) -> bool:
+        words = re.findall(r"[\w'-]+", prompt.lower())
+        return len(words) <= self.max_words and not ESCALATION_HINTS.intersection(words)
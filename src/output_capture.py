@@ -0,0 +1,84 @@
+import codecs
+import os
+import tempfile
+import threading
+from collections import deque
+from typing import IO, BinaryIO, Deque, Optional, TextIO
+
+# Serializes live output from concurrent readers
+_write_lock = threading.Lock()
+
+
+class OutputCapture:
+    """Bounded capture of one output stream.
+
+    Keeps at most ``limit`` bytes in memory. Once a stream grows past the
+    limit, everything is spilled to a temporary file and only a tail of
+    ``limit`` bytes is kept in memory.
+    """
+
+    def __init__(self, limit: int, name: str, live: Optional[TextIO] = None):
+        self.limit = limit
+        self.name = name
+        self.live = live
+        self.total_bytes = 0
+        self.spill_path: Optional[str] = None
+        self._chunks: Deque[bytes] = deque()
+        self._held_bytes = 0
+        self._spill: Optional[BinaryIO] = None
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def feed(self, data: bytes) -> None:
+        """Record a chunk of output and echo it when rendering live."""
+        if self.live is not None:
+            text = self._decoder.decode(data)
+            if text:
+                with _write_lock:
+                    self.live.write(text)
+                    self.live.flush()
+
+        self.total_bytes += len(data)
+
+        if self._spill is None and self.total_bytes > self.limit:
+            fd, self.spill_path = tempfile.mkstemp(prefix=f'orcas-{self.name}-', suffix='.log')
+            self._spill = os.fdopen(fd, 'wb')
+            for chunk in self._chunks:
+                self._spill.write(chunk)
+
+        if self._spill is not None:
+            self._spill.write(data)
+
+        self._chunks.append(data)
+        self._held_bytes += len(data)
+        while self._held_bytes - len(self._chunks[0]) >= self.limit:
+            self._held_bytes -= len(self._chunks.popleft())
+
+    def pump(self, pipe: IO[bytes]) -> None:
+        """Read a pipe until EOF."""
+        fd = pipe.fileno()
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            self.feed(data)
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > self.limit
+
+    def text(self) -> str:
+        """Return the in-memory tail, at most ``limit`` bytes of it."""
+        data = b''.join(self._chunks)[-self.limit:]
+        return data.decode('utf-8', errors='replace')
+
+
+def start_pump(capture: OutputCapture, pipe: IO[bytes]) -> threading.Thread:
+    """Drain a pipe into a capture on a background thread."""
+    thread = threading.Thread(target=capture.pump, args=(pipe,), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,371 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import yaml
+
+# The regex parser moved into the re package in 3.11, and the old name warns
+if sys.version_info >= (3, 11):
+    import re._parser as sre_parse
+else:
+    import sre_parse
+
+# Patterns per combined alternation, bounds the work needed to find which
+# rule of a chunk matched
+CHUNK_SIZE = 100
+
+# Shortest literal worth using to prefilter a pattern
+MIN_ANCHOR = 2
+
+# Bumped whenever the pickled layout changes
+CACHE_VERSION = 2
+
+_GLOBAL_FLAGS = re.compile(r'^\(\?([aiLmsux]+)\)')
+# Backreferences and named groups change meaning inside a combined pattern
+_UNSAFE_TO_COMBINE = re.compile(r'\\[1-9]|\(\?P[<=]')
+
+# Engines built in this process, keyed by policy hash
+_engines: Dict[str, 'PolicyEngine'] = {}
+
+
+@dataclass(frozen=True)
+class PolicyMatch:
+    """The rule that blocked a command."""
+    kind: str
+    rule: str
+
+    def __str__(self) -> str:
+        return f"blocked {self.kind} '{self.rule}'"
+
+
+class AhoCorasick:
+    """Automaton that finds any of many literals in one scan of the text."""
+
+    def __init__(self, literals: Sequence[str]):
+        self.literals = list(literals)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Index of the literal ending at a state, or -1
+        self._output: List[int] = [-1]
+        # Nearest state along the fail chain that ends a literal
+        self._output_link: List[int] = [0]
+
+        for index, literal in enumerate(self.literals):
+            if literal:
+                self._insert(literal, index)
+        self._build_links()
+
+    def search(self, text: str) -> Optional[int]:
+        """Return the index of a literal occurring in the text, or None."""
+        goto = self._goto
+        fail = self._fail
+        state = 0
+
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            if self._output[state] >= 0:
+                return self._output[state]
+            if self._output_link[state]:
+                return self._output[self._output_link[state]]
+
+        return None
+
+    def search_all(self, text: str) -> List[int]:
+        """Return the indices of every literal occurring in the text."""
+        goto = self._goto
+        fail = self._fail
+        state = 0
+        found = []
+
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            hit = state if self._output[state] >= 0 else self._output_link[state]
+            while hit:
+                found.append(self._output[hit])
+                hit = self._output_link[hit]
+
+        return found
+
+    def _insert(self, literal: str, index: int) -> None:
+        state = 0
+        for ch in literal:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(-1)
+                self._output_link.append(0)
+                self._goto[state][ch] = nxt
+            state = nxt
+
+        if self._output[state] < 0:
+            self._output[state] = index
+
+    def _build_links(self) -> None:
+        """Compute fail and output links breadth first."""
+        queue = list(self._goto[0].values())
+        head = 0
+
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+
+                fail_state = self._fail[nxt]
+                if self._output[fail_state] >= 0:
+                    self._output_link[nxt] = fail_state
+                else:
+                    self._output_link[nxt] = self._output_link[fail_state]
+
+
+class PatternSet:
+    """Regex set searched without trying every pattern.
+
+    Most patterns contain a literal that any match must include, such as
+    'dd' in 'dd\\s+if=/dev/'. Those literals go into an Aho-Corasick
+    automaton, so a pattern is only tried when its literal occurs in the
+    text. The remaining patterns are grouped into chunks joined with '|',
+    costing one search per chunk.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        self._compiled = [re.compile(pattern) for pattern in self.patterns]
+        self._chunks: List[Tuple[Any, List[int]]] = []
+
+        anchored: Dict[str, List[int]] = {}
+        combinable = []
+        for index, pattern in enumerate(self.patterns):
+            anchor = required_literal(pattern)
+            if anchor:
+                anchored.setdefault(anchor, []).append(index)
+            elif _UNSAFE_TO_COMBINE.search(pattern):
+                self._chunks.append((self._compiled[index], [index]))
+            else:
+                combinable.append(index)
+
+        self._anchors = AhoCorasick(list(anchored))
+        self._anchored = list(anchored.values())
+
+        for start in range(0, len(combinable), CHUNK_SIZE):
+            members = combinable[start:start + CHUNK_SIZE]
+            self._chunks.append((self._combine(members), members))
+
+    def search(self, text: str) -> Optional[int]:
+        """Return the index of a pattern matching the text, or None."""
+        candidates = sorted({
+            index
+            for anchor in self._anchors.search_all(text)
+            for index in self._anchored[anchor]
+        })
+        for index in candidates:
+            if self._compiled[index].search(text):
+                return index
+
+        for combined, members in self._chunks:
+            if not combined.search(text):
+                continue
+            for index in members:
+                if self._compiled[index].search(text):
+                    return index
+        return None
+
+    def _combine(self, members: List[int]) -> Any:
+        parts = []
+        for index in members:
+            pattern = self.patterns[index]
+            # Leading global flags such as (?i) are only legal at the start
+            flags = _GLOBAL_FLAGS.match(pattern)
+            if flags:
+                pattern = f"(?{flags.group(1)}:{pattern[flags.end():]})"
+            parts.append(f"(?:{pattern})")
+
+        try:
+            return re.compile('|'.join(parts))
+        except re.error:
+            # Fall back to an alternation the interpreter always accepts
+            return _AnyOf([self._compiled[index] for index in members])
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """Return the longest literal every match of the pattern must contain."""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+
+    # Case-insensitive and verbose patterns do not match their literals verbatim
+    if parsed.state.flags & (re.IGNORECASE | re.VERBOSE):
+        return None
+
+    best = ''
+    run: List[str] = []
+    for op, value in parsed.data:
+        if op is sre_parse.LITERAL and isinstance(value, int):
+            run.append(chr(value))
+            continue
+        if len(run) > len(best):
+            best = ''.join(run)
+        run = []
+        # A branch at the top level means no literal is required
+        if op is sre_parse.BRANCH:
+            return None
+
+    if len(run) > len(best):
+        best = ''.join(run)
+
+    return best if len(best) >= MIN_ANCHOR else None
+
+
+class _AnyOf:
+    """Stand-in for a combined pattern that failed to compile."""
+
+    def __init__(self, compiled: List[Any]):
+        self.compiled = compiled
+
+    def search(self, text: str) -> bool:
+        return any(pattern.search(text) for pattern in self.compiled)
+
+
+class PolicyEngine:
+    """Compiled blocklist of literals and regular expressions."""
+
+    def __init__(self, literals: Sequence[str], patterns: Sequence[str]):
+        self.literals = AhoCorasick(literals)
+        self.patterns = PatternSet(patterns)
+
+    def match(self, texts: Iterable[str]) -> Optional[PolicyMatch]:
+        """Return the first rule matching any of the texts."""
+        texts = list(texts)
+
+        for text in texts:
+            index = self.literals.search(text)
+            if index is not None:
+                return PolicyMatch('command', self.literals.literals[index])
+
+        for text in texts:
+            index = self.patterns.search(text)
+            if index is not None:
+                return PolicyMatch('pattern', self.patterns.patterns[index])
+
+        return None
+
+
+def load_policy(config: Dict[str, Any]) -> PolicyEngine:
+    """Build the policy engine for a security config, reusing cached builds."""
+    literals, patterns = collect_rules(config)
+    key = policy_hash(literals, patterns)
+
+    engine = _engines.get(key)
+    if engine is not None:
+        return engine
+
+    cache_file = _cache_file(config, key)
+    engine = _load_cached(cache_file, key, literals, patterns)
+    if engine is None:
+        engine = PolicyEngine(literals, patterns)
+        _save_cached(cache_file, key, engine)
+
+    _engines[key] = engine
+    return engine
+
+
+def collect_rules(config: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """Gather blocked literals and patterns from the config and its policy files."""
+    literals = list(config.get('blocked_commands', []))
+    patterns = list(config.get('blocked_patterns', []))
+
+    for policy_file in config.get('policy_files', []):
+        with open(os.path.expanduser(policy_file), 'r') as f:
+            policy = yaml.safe_load(f) or {}
+        literals.extend(policy.get('blocked_commands', []))
+        patterns.extend(policy.get('blocked_patterns', []))
+
+    # Drop duplicates but keep the first occurrence's order
+    return list(dict.fromkeys(literals)), list(dict.fromkeys(patterns))
+
+
+def policy_hash(literals: Sequence[str], patterns: Sequence[str]) -> str:
+    payload = json.dumps([CACHE_VERSION, list(literals), list(patterns)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _cache_file(config: Dict[str, Any], key: str) -> Optional[Path]:
+    cache_dir = config.get('policy_cache_dir')
+    if not cache_dir:
+        return None
+    return Path(os.path.expanduser(cache_dir)) / f"policy-{key}.pkl"
+
+
+def _load_cached(
+        cache_file: Optional[Path],
+        key: str,
+        literals: Sequence[str],
+        patterns: Sequence[str]
+) -> Optional[PolicyEngine]:
+    """Load a cached engine, unless it was built from rules other than these.
+
+    The engine decides what gets blocked, so a file that is stale, copied
+    from another policy or tampered with is rebuilt rather than trusted.
+    """
+    if cache_file is None or not cache_file.exists():
+        return None
+    try:
+        with open(cache_file, 'rb') as f:
+            payload = pickle.load(f)
+    except Exception:
+        return None
+
+    if not isinstance(payload, dict) or payload.get('version') != CACHE_VERSION:
+        return None
+    engine = payload.get('engine')
+    if payload.get('hash') != key or not isinstance(engine, PolicyEngine):
+        return None
+    rules = (list(literals), list(patterns))
+    if (payload.get('literals'), payload.get('patterns')) != rules:
+        return None
+    if (engine.literals.literals, engine.patterns.patterns) != rules:
+        return None
+    return engine
+
+
+def _save_cached(cache_file: Optional[Path], key: str, engine: PolicyEngine) -> None:
+    if cache_file is None:
+        return
+    payload = {
+        'version': CACHE_VERSION,
+        'hash': key,
+        'literals': list(engine.literals.literals),
+        'patterns': list(engine.patterns.patterns),
+        'engine': engine,
+    }
+    try:
+        cache_file.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_file)
+    except OSError:
+        pass
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Sentence punctuation is folded, symbols like "*.py" or "> 1MB" are kept
+_PUNCTUATION = re.compile(r"""[.,!?;:]+(?=\s|$)|["'`]""")
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold case, whitespace and sentence punctuation out of a prompt."""
+    prompt = _PUNCTUATION.sub(' ', prompt.lower())
+    return _WHITESPACE.sub(' ', prompt).strip()
+
+
+class ResultCache:
+    """Persistent prompt to command strings cache backed by SQLite."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.path = Path(os.path.expanduser(
+            config.get('path', '~/.orcas/cache/results.db')))
+        self.max_entries = config.get('max_entries', 1000)
+        self.ttl = config.get('ttl', 7 * 24 * 3600)
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # The daemon worker thread uses the cache created on the main thread
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                prompt TEXT NOT NULL,
+                commands TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def make_key(prompt: str, model_name: str, template_hash: str) -> str:
+        """Build the cache key for a prompt under a model and prompt template."""
+        raw = '\0'.join((normalize_prompt(prompt), model_name, template_hash))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return cached command strings, or None on a miss."""
+        now = time.time()
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT commands, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self._count('misses')
+                self._db.commit()
+                return None
+
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            self._count('hits')
+            self._db.commit()
+
+        commands: List[str] = json.loads(row[0])
+        return commands
+
+    def put(self, key: str, prompt: str, commands: List[str]) -> None:
+        """Store command strings and evict least recently used entries."""
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (key, prompt, json.dumps(commands), now, now),
+            )
+            self._db.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def delete(self, key: str) -> None:
+        """Drop a single entry."""
+        with self._lock:
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._db.commit()
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+            self._db.execute("DELETE FROM stats")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return entry count and hit/miss counters."""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            counters = dict(self._db.execute("SELECT name, value FROM stats").fetchall())
+
+        return {
+            'entries': entries,
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+        }
+
+    def _count(self, name: str) -> None:
+        self._db.execute(
+            "INSERT INTO stats VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
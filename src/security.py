@@ -1,5 +1,15 @@
-import re
+from typing import Optional
+
 from command_parser import Command
+from policy import load_policy
+from shell_ast import ShellCommand
+from tracing import tracer
+
+# Programs that fetch remote content
+DOWNLOADERS = {'curl', 'wget', 'fetch', 'nc', 'ncat'}
+
+# Interpreters that run whatever is piped into them
+INTERPRETERS = {'sh', 'bash', 'zsh', 'dash', 'ksh', 'python', 'python3', 'perl', 'ruby'}
 
 
 class SecurityValidator:
@@ -7,60 +17,49 @@ class SecurityValidator:
 
     def __init__(self, config: dict):
         self.config = config
-        self.blocked_commands = config.get('blocked_commands', [])
-        self.blocked_patterns = [
-            re.compile(pattern)
-            for pattern in config.get('blocked_patterns', [])
-        ]
+        # Built once per policy and shared by every validator using it
+        self.policy = load_policy(config)
 
     def validate(self, command: Command) -> bool:
         """Validate a command for security."""
+        return self.check(command) is None
 
-        # Check blocked commands
-        if self._is_blocked_command(command.command):
-            return False
+    @tracer.traced('validate')
+    def check(self, command: Command) -> Optional[str]:
+        """Return why a command is rejected, or None if it is allowed."""
+        ast = command.shell()
 
-        # Check blocked patterns
-        if self._matches_blocked_pattern(command.command):
-            return False
+        # Check blocked commands and patterns
+        match = self.policy.match((ast.raw, ast.normalized))
+        if match:
+            return str(match)
 
         # Check for command injection attempts
-        if self._has_injection_attempt(command.command):
-            return False
+        injection = self._has_injection_attempt(ast)
+        if injection:
+            return injection
 
         # Check high-risk commands
         if command.risk_level == 'high':
             if not self.config.get('allow_high_risk', False):
-                return False
+                return 'high risk command'
 
-        return True
+        return None
 
-    def _is_blocked_command(self, command: str) -> bool:
-        """Check if command is in blocked list."""
-        for blocked in self.blocked_commands:
-            if blocked in command:
-                return True
-        return False
+    def _has_injection_attempt(self, ast: ShellCommand) -> Optional[str]:
+        """Detect potential command injection attempts."""
+        if ast.substitutions:
+            return 'command substitution'
 
-    def _matches_blocked_pattern(self, command: str) -> bool:
-        """Check if command matches blocked patterns."""
-        for pattern in self.blocked_patterns:
-            if pattern.search(command):
-                return True
-        return False
+        for redirection in ast.redirections:
+            if redirection.target.startswith(('/dev/tcp/', '/dev/udp/')):
+                return 'network redirection'
 
-    def _has_injection_attempt(self, command: str) -> bool:
-        """Detect potential command injection attempts."""
-        injection_indicators = [
-            r'\$\(.*\)',       # Command substitution
-            r'`.*`',           # Backtick substitution
-            r'>\s*/dev/tcp/',  # Network redirection
-            r'curl.*\|.*sh',   # Piping to shell
-            r'wget.*\|.*sh',   # Piping to shell
-        ]
-
-        for indicator in injection_indicators:
-            if re.search(indicator, command):
-                return True
-
-        return False
\ No newline at end of file
+        downloaded = False
+        for invocation in ast.invocations:
+            if invocation.base in DOWNLOADERS:
+                downloaded = True
+            elif downloaded and invocation.piped and invocation.base in INTERPRETERS:
+                return 'downloaded content piped to a shell'
+
+        return None
@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from command_parser import Command, CommandParser
+    from executor import ExecutionResult
+
+
+@dataclass
+class Turn:
+    """One request of a session, the commands shown for it and how they ended."""
+    request: str
+    commands: List[str]
+    outcomes: List[str]
+    # Counted when the turn is first replayed, the model is loaded by then
+    tokens: Optional[int] = None
+
+    def render(self) -> str:
+        """The turn in the prompt's 'User:' / command lines layout."""
+        lines = [f"User: {self.request}"]
+        for command, outcome in zip(self.commands, self.outcomes):
+            lines.append(command)
+            lines.append(f"# {outcome}")
+        return '\n'.join(lines) + '\n\n'
+
+
+class Conversation:
+    """Earlier turns of an interactive session, replayed before each request.
+
+    Turns are only ever appended, so every prompt starts with the previous
+    one and llama.cpp, which keeps the longest common prefix of its context,
+    evaluates just the new turn and request. When the history outgrows its
+    share of ``n_ctx``, the oldest turns are dropped until it is down to
+    ``keep_ratio`` of the budget, so the one-off re-evaluation this causes
+    happens rarely rather than on every turn.
+    """
+
+    def __init__(self, parser: 'CommandParser', config: Dict[str, Any]):
+        self.parser = parser
+        self.turns: List[Turn] = []
+        # Room left for examples, the request and the generated commands
+        self.reserve_tokens: int = config.get('reserve_tokens', 768)
+        self.keep_ratio = config.get('keep_ratio', 0.5)
+        self.max_output_chars = config.get('max_output_chars', 80)
+        self._prefix_tokens: Optional[int] = None
+
+    def context(self) -> str:
+        """History to insert between the prompt prefix and the next request."""
+        if not self.turns:
+            return ''
+
+        model = self.parser.model
+        counts: List[int] = []
+        for turn in self.turns:
+            if turn.tokens is None:
+                turn.tokens = model.count_tokens(turn.render())
+            counts.append(turn.tokens)
+
+        budget = self.budget()
+        if sum(counts) > budget:
+            # Slide the window: keep the most recent turns that fit
+            kept: List[Turn] = []
+            total = 0
+            for turn, tokens in zip(reversed(self.turns), reversed(counts)):
+                if total + tokens > budget * self.keep_ratio:
+                    break
+                kept.append(turn)
+                total += tokens
+            self.turns = kept[::-1]
+
+        return ''.join(turn.render() for turn in self.turns)
+
+    def budget(self) -> int:
+        """Tokens the history may take up in the context window."""
+        model = self.parser.model
+        if self._prefix_tokens is None:
+            self._prefix_tokens = model.count_tokens(self.parser.prompt_prefix)
+        prefix_tokens: int = self._prefix_tokens
+        n_ctx: int = model.config.get('n_ctx', 2048)
+        return max(0, n_ctx - prefix_tokens - self.reserve_tokens)
+
+    def add(
+            self,
+            request: str,
+            commands: Sequence['Command'],
+            results: Optional[Sequence['ExecutionResult']] = None
+    ) -> None:
+        """Record a request with its commands and, if they ran, their exit status."""
+        by_command = {result.command: result for result in results or []}
+        outcomes = [self._outcome(by_command.get(cmd.command)) for cmd in commands]
+        self.turns.append(Turn(request, [cmd.command for cmd in commands], outcomes))
+
+    def clear(self) -> None:
+        self.turns = []
+
+    def _outcome(self, result: Optional['ExecutionResult']) -> str:
+        if result is None:
+            return 'not run'
+        if result.success:
+            return 'exit 0'
+
+        error = (result.stderr or '').strip().splitlines()
+        summary = f"exit {result.return_code}"
+        if error:
+            summary += f": {error[-1][:self.max_output_chars]}"
+        return summary
@@ -0,0 +1,444 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Longest operators first so that '&&' wins over '&'
+CONTROL_OPERATORS = ('&&', '||', ';;', '|&', ';', '|', '&')
+REDIRECT_OPERATORS = ('&>>', '<<<', '<<', '>>', '>&', '<&', '&>', '<>', '>|', '>', '<')
+
+# Operators that run a second command after the first one; an unquoted
+# newline separates commands like ';'
+CHAINING_OPERATORS = {'&&', '||', ';', ';;', '&', '\n'}
+PIPE_OPERATORS = {'|', '|&'}
+
+# Commands that run the command given in their arguments, with the options
+# that take a separate value
+WRAPPERS = {
+    'sudo': {'-u', '-g', '-C', '-h', '-p', '-r', '-t', '-U', '-D'},
+    'doas': {'-u', '-C'},
+    'env': {'-u', '-C', '-S'},
+    'nice': {'-n'},
+    'ionice': {'-c', '-n', '-p'},
+    'nohup': set(),
+    'time': {'-f', '-o'},
+    'timeout': {'-s', '-k'},
+    'stdbuf': {'-i', '-o', '-e'},
+    'command': set(),
+    'exec': {'-a'},
+    'builtin': set(),
+    'xargs': {'-I', '-L', '-n', '-P', '-s', '-d', '-E', '-a'},
+}
+
+# Interpreters whose -c argument is itself a shell command
+SHELLS = {'sh', 'bash', 'zsh', 'dash', 'ksh', 'fish'}
+
+# Programs that never modify files, unless given one of WRITE_OPTIONS
+READ_ONLY_COMMANDS = {
+    'ls', 'du', 'df', 'find', 'tree', 'file', 'stat', 'realpath', 'readlink',
+    'cat', 'head', 'tail', 'less', 'wc', 'grep', 'egrep', 'fgrep', 'rg',
+    'sort', 'uniq', 'cut', 'diff', 'md5sum', 'sha1sum', 'sha256sum', 'cksum',
+    'ps', 'free', 'uptime', 'whoami', 'which', 'ping', 'echo', 'pwd',
+}
+
+# Options that make a read-only program write files or run other programs
+WRITE_OPTIONS = {
+    'find': {
+        '-delete', '-exec', '-execdir', '-ok', '-okdir',
+        '-fprint', '-fprint0', '-fprintf', '-fls',
+    },
+    'sort': {'-o', '--output'},
+}
+
+
+@dataclass(frozen=True)
+class Redirection:
+    """A redirection such as '2>&1' or '> out.txt'."""
+    op: str
+    target: str
+    fd: Optional[str] = None
+
+    @property
+    def is_output(self) -> bool:
+        return '>' in self.op
+
+
+@dataclass(frozen=True)
+class Invocation:
+    """A program the command line runs, after unwrapping sudo, xargs and friends."""
+    base: str
+    args: Tuple[str, ...]
+    # Reads the output of an earlier pipeline stage
+    piped: bool = False
+
+
+@dataclass(frozen=True)
+class ShellCommand:
+    """Lexed form of a single command line."""
+    raw: str
+    stages: Tuple[Tuple[str, ...], ...]
+    operators: Tuple[str, ...]
+    redirections: Tuple[Redirection, ...]
+    substitutions: Tuple[str, ...]
+    invocations: Tuple[Invocation, ...]
+    sudo: bool
+    # Runs a second command after the first, here or in a nested sh -c / eval
+    chained: bool = False
+    # Unterminated quote or substitution
+    incomplete: bool = False
+
+    @property
+    def base(self) -> str:
+        """Program run by the first stage."""
+        return self.invocations[0].base if self.invocations else ''
+
+    @property
+    def args(self) -> Tuple[str, ...]:
+        return self.invocations[0].args if self.invocations else ()
+
+    @property
+    def words(self) -> Tuple[str, ...]:
+        return tuple(word for stage in self.stages for word in stage)
+
+    @property
+    def normalized(self) -> str:
+        """Words joined by single spaces, with quoting removed."""
+        return ' '.join(self.words)
+
+    def bases(self) -> List[str]:
+        return [invocation.base for invocation in self.invocations]
+
+
+@lru_cache(maxsize=1024)
+def parse_shell(command: str) -> ShellCommand:
+    """Lex a command line in a single pass.
+
+    Results are cached, so the parser and the security checks share one
+    parse per command string.
+    """
+    lexer = _Lexer(command)
+    lexer.run()
+
+    stages: List[List[str]] = [[]]
+    operators: List[str] = []
+    redirections: List[Redirection] = []
+    tokens = lexer.tokens
+
+    i = 0
+    while i < len(tokens):
+        kind, value, fd = tokens[i]
+        if kind == 'op':
+            operators.append(value)
+            stages.append([])
+        elif kind == 'redir':
+            target = ''
+            if i + 1 < len(tokens) and tokens[i + 1][0] == 'word':
+                target = tokens[i + 1][1]
+                i += 1
+            redirections.append(Redirection(value, target, fd))
+        else:
+            stages[-1].append(value)
+        i += 1
+
+    # A trailing ';' or '&' ends the command without chaining another one
+    chained = any(
+        op in CHAINING_OPERATORS and stages[index + 1]
+        for index, op in enumerate(operators)
+    )
+    while len(stages) > 1 and not stages[-1]:
+        stages.pop()
+
+    substitutions = list(lexer.substitutions)
+    invocations: List[Invocation] = []
+    for index, stage in enumerate(stages):
+        piped = index > 0 and operators[index - 1] in PIPE_OPERATORS
+        if _collect_invocations(list(stage), piped, invocations, redirections, substitutions):
+            chained = True
+
+    # Commands in $(...), backticks and <(...) run too; $((...)) is arithmetic
+    for body in lexer.substitutions:
+        if body.startswith('('):
+            continue
+        inner = parse_shell(body)
+        invocations.extend(inner.invocations)
+        redirections.extend(inner.redirections)
+        chained = chained or inner.chained
+
+    # Also behind assignments, a path or another wrapper, e.g. LANG=C /usr/bin/sudo
+    sudo = any(invocation.base in ('sudo', 'doas') for invocation in invocations)
+
+    return ShellCommand(
+        raw=command,
+        stages=tuple(tuple(stage) for stage in stages),
+        operators=tuple(operators),
+        redirections=tuple(redirections),
+        substitutions=tuple(substitutions),
+        invocations=tuple(invocations),
+        sudo=sudo,
+        chained=chained,
+        incomplete=lexer.incomplete,
+    )
+
+
+def _collect_invocations(
+        words: List[str],
+        piped: bool,
+        invocations: List[Invocation],
+        redirections: List[Redirection],
+        substitutions: List[str]
+) -> bool:
+    """Unwrap a simple command into the programs it runs.
+
+    Returns whether a command string nested in it chains several commands.
+    """
+    chained = False
+
+    # Leading variable assignments, e.g. LANG=C sort
+    while words and _is_assignment(words[0]):
+        words.pop(0)
+
+    while words and os.path.basename(words[0]) in WRAPPERS:
+        wrapper = os.path.basename(words.pop(0))
+        value_options = WRAPPERS[wrapper]
+        while words and (
+                words[0].startswith('-') or (wrapper == 'env' and _is_assignment(words[0]))):
+            option = words.pop(0)
+            if option in value_options and words:
+                words.pop(0)
+        if wrapper == 'timeout' and words:
+            words.pop(0)
+        invocations.append(Invocation(wrapper, tuple(words), piped))
+
+    if not words:
+        return chained
+
+    base = os.path.basename(words[0])
+    args = tuple(words[1:])
+    invocations.append(Invocation(base, args, piped))
+
+    # Commands given as a string are run by a shell too
+    nested = None
+    if base in SHELLS and '-c' in args:
+        index = args.index('-c')
+        if index + 1 < len(args):
+            nested = args[index + 1]
+    elif base == 'eval':
+        nested = ' '.join(args)
+
+    if nested:
+        inner = parse_shell(nested)
+        invocations.extend(inner.invocations)
+        redirections.extend(inner.redirections)
+        substitutions.extend(inner.substitutions)
+        chained = chained or inner.chained
+
+    # find -exec runs its own command for every match
+    if base == 'find':
+        for i, arg in enumerate(args):
+            if arg in ('-exec', '-execdir', '-ok', '-okdir') and i + 1 < len(args):
+                end = i + 1
+                while end < len(args) and args[end] not in (';', '+'):
+                    end += 1
+                if _collect_invocations(list(args[i + 1:end]), False, invocations,
+                                        redirections, substitutions):
+                    chained = True
+
+    return chained
+
+
+def writes_files(invocation: Invocation) -> bool:
+    """Whether a program may modify files, judged by its name and options."""
+    if invocation.base not in READ_ONLY_COMMANDS:
+        return True
+
+    options = WRITE_OPTIONS.get(invocation.base, set())
+    if any(arg.split('=', 1)[0] in options for arg in invocation.args):
+        return True
+    # sort -o FILE may also be written as -oFILE or in a flag cluster
+    if invocation.base == 'sort' and any(
+            arg.startswith('-') and not arg.startswith('--') and 'o' in arg
+            for arg in invocation.args):
+        return True
+    # uniq INPUT OUTPUT writes its second operand
+    if invocation.base == 'uniq' and \
+            len([arg for arg in invocation.args if not arg.startswith('-')]) > 1:
+        return True
+    return False
+
+
+def _is_assignment(word: str) -> bool:
+    name, sep, _ = word.partition('=')
+    return bool(sep) and name.replace('_', 'a').isalnum() and not name[0].isdigit()
+
+
+class _Lexer:
+    """Single pass tokenizer for POSIX shell; newlines separate commands."""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.tokens: List[Tuple[str, str, Optional[str]]] = []
+        self.substitutions: List[str] = []
+        self.incomplete = False
+        self._word: List[str] = []
+        self._in_word = False
+        self._quoted = False
+
+    def run(self) -> None:
+        text = self.command
+        n = len(text)
+        i = 0
+
+        while i < n:
+            c = text[i]
+            nxt = text[i + 1] if i + 1 < n else ''
+
+            if c == '\\':
+                # A backslash before a newline continues the line
+                if nxt and nxt != '\n':
+                    self._add(nxt)
+                    self._quoted = True
+                i += 2
+            elif c == "'":
+                end = text.find("'", i + 1)
+                if end < 0:
+                    self.incomplete = True
+                    end = n
+                self._add(text[i + 1:end])
+                self._quoted = True
+                i = end + 1
+            elif c == '"':
+                i = self._double_quoted(i + 1)
+            elif c == '$' and nxt == '(':
+                i = self._substitution(i, i + 2)
+            elif c == '$' and nxt == '{':
+                end = text.find('}', i)
+                end = n - 1 if end < 0 else end
+                self._add(text[i:end + 1])
+                i = end + 1
+            elif c == '`':
+                i = self._backticks(i)
+            elif c in '<>' and nxt == '(':
+                # Process substitution
+                i = self._substitution(i, i + 2)
+            elif c == '\n':
+                self._flush()
+                self.tokens.append(('op', '\n', None))
+                i += 1
+            elif c.isspace():
+                self._flush()
+                i += 1
+            elif c == '#' and not self._in_word:
+                # Comments end at the end of the line
+                end = text.find('\n', i)
+                i = n if end < 0 else end
+            else:
+                redirect = self._match(i, REDIRECT_OPERATORS)
+                operator = None if redirect else self._match(i, CONTROL_OPERATORS)
+                if redirect:
+                    fd = None
+                    word = ''.join(self._word)
+                    if self._in_word and word.isdigit() and not self._quoted:
+                        fd = word
+                        self._reset_word()
+                    else:
+                        self._flush()
+                    self.tokens.append(('redir', redirect, fd))
+                    i += len(redirect)
+                elif operator:
+                    self._flush()
+                    self.tokens.append(('op', operator, None))
+                    i += len(operator)
+                else:
+                    self._add(c)
+                    i += 1
+
+        self._flush()
+
+    def _double_quoted(self, i: int) -> int:
+        text = self.command
+        n = len(text)
+        self._in_word = True
+        self._quoted = True
+
+        while i < n:
+            c = text[i]
+            if c == '"':
+                return i + 1
+            if c == '\\' and i + 1 < n:
+                self._add(text[i + 1])
+                i += 2
+            elif c == '$' and i + 1 < n and text[i + 1] == '(':
+                i = self._substitution(i, i + 2)
+            elif c == '`':
+                i = self._backticks(i)
+            else:
+                self._add(c)
+                i += 1
+
+        self.incomplete = True
+        return n
+
+    def _substitution(self, start: int, body_start: int) -> int:
+        """Record $(...), $((...)), <(...) or >(...) and return the index after it."""
+        text = self.command
+        depth = 1
+        i = body_start
+        quote = None
+
+        while i < len(text) and depth:
+            c = text[i]
+            if quote:
+                if c == quote:
+                    quote = None
+                elif c == '\\' and quote == '"':
+                    i += 1
+            elif c in '\'"':
+                quote = c
+            elif c == '\\':
+                i += 1
+            elif c == '(':
+                depth += 1
+            elif c == ')':
+                depth -= 1
+            i += 1
+
+        if depth:
+            self.incomplete = True
+            self.substitutions.append(text[body_start:])
+        else:
+            self.substitutions.append(text[body_start:i - 1])
+
+        self._add(text[start:i])
+        return i
+
+    def _backticks(self, start: int) -> int:
+        text = self.command
+        i = start + 1
+        while i < len(text) and text[i] != '`':
+            i += 2 if text[i] == '\\' else 1
+
+        if i >= len(text):
+            self.incomplete = True
+        self.substitutions.append(text[start + 1:i])
+        self._add(text[start:i + 1])
+        return i + 1
+
+    def _match(self, i: int, candidates: Tuple[str, ...]) -> Optional[str]:
+        for candidate in candidates:
+            if self.command.startswith(candidate, i):
+                return candidate
+        return None
+
+    def _add(self, text: str) -> None:
+        self._word.append(text)
+        self._in_word = True
+
+    def _flush(self) -> None:
+        if self._in_word:
+            self.tokens.append(('word', ''.join(self._word), None))
+        self._reset_word()
+
+    def _reset_word(self) -> None:
+        self._word = []
+        self._in_word = False
+        self._quoted = False
@@ -0,0 +1,162 @@
+import os
+import selectors
+import signal
+import subprocess
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from output_capture import OutputCapture
+
+
+class ShellSession:
+    """One long-lived shell that runs commands sent over a pipe.
+
+    Shell state such as the working directory or exported variables carries
+    over between commands, and shell startup is paid once per session. Each
+    command is followed by a per-command sentinel that carries its exit code.
+    """
+
+    def __init__(self, shell: str = '/bin/bash'):
+        self.shell = shell
+        # subprocess.Popen of the shell, None until the first run
+        self.process: Any = None
+
+    def run(
+            self,
+            command: str,
+            stdout: OutputCapture,
+            stderr: OutputCapture,
+            timeout: Optional[float] = None
+    ) -> Optional[int]:
+        """Run a command and return its exit code, or None on timeout.
+
+        A timed out command kills the session, which is restarted on the
+        next run. If the shell itself dies, its exit status is returned.
+        """
+        if self.process is None or self.process.poll() is not None:
+            self._start()
+
+        marker = f"\x1eORCAS_{uuid.uuid4().hex}_".encode()
+        # The group runs in the current shell, so cd and export persist;
+        # stdin is detached so commands cannot read the command pipe
+        script = (
+            f"{{ {command}\n}} </dev/null\n"
+            f"printf '{marker.decode()}%d\\n' \"$?\"\n"
+            f"printf '{marker.decode()}\\n' >&2\n"
+        )
+
+        try:
+            self.process.stdin.write(script.encode())
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            self.close()
+            return self.run(command, stdout, stderr, timeout)
+
+        return self._read_until_marker(marker, stdout, stderr, timeout)
+
+    def close(self) -> None:
+        """Stop the shell and everything it started."""
+        if self.process is None:
+            return
+
+        if self.process.poll() is None:
+            for sig in (signal.SIGTERM, signal.SIGKILL):
+                try:
+                    os.killpg(self.process.pid, sig)
+                except ProcessLookupError:
+                    break
+                try:
+                    self.process.wait(timeout=2)
+                    break
+                except subprocess.TimeoutExpired:
+                    continue
+
+        for pipe in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        self.process = None
+
+    def _start(self) -> None:
+        """Start a fresh shell without rc files."""
+        args = [self.shell]
+        if Path(self.shell).name == 'bash':
+            args += ['--noprofile', '--norc']
+
+        self.process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+
+    def _read_until_marker(
+            self,
+            marker: bytes,
+            stdout: OutputCapture,
+            stderr: OutputCapture,
+            timeout: Optional[float]
+    ) -> Optional[int]:
+        """Forward output to the captures until both streams reach the marker."""
+        deadline = time.monotonic() + timeout if timeout else None
+        captures: Dict[Any, OutputCapture] = {
+            self.process.stdout: stdout,
+            self.process.stderr: stderr,
+        }
+        pending: Dict[Any, bytes] = {pipe: b'' for pipe in captures}
+        open_pipes: List[Any] = list(captures)
+        exit_code: Optional[int] = None
+
+        selector = selectors.DefaultSelector()
+        for pipe in open_pipes:
+            selector.register(pipe, selectors.EVENT_READ)
+
+        try:
+            while open_pipes:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.close()
+                    return None
+
+                for key, _ in selector.select(timeout=remaining):
+                    pipe = key.fileobj
+                    data = os.read(key.fd, 65536)
+
+                    if not data:
+                        # The shell exited, e.g. the command ran `exit`
+                        captures[pipe].feed(pending[pipe].split(marker, 1)[0])
+                        selector.unregister(pipe)
+                        open_pipes.remove(pipe)
+                        continue
+
+                    buffer = pending[pipe] + data
+                    if marker in buffer:
+                        before, after = buffer.split(marker, 1)
+                        captures[pipe].feed(before)
+                        # The exit code after the marker may arrive in a later read
+                        if b'\n' not in after:
+                            pending[pipe] = marker + after
+                            continue
+                        if pipe is self.process.stdout:
+                            exit_code = int(after.split(b'\n', 1)[0])
+                        selector.unregister(pipe)
+                        open_pipes.remove(pipe)
+                        continue
+
+                    # Hold back what could be the start of a split marker
+                    keep = len(marker) - 1
+                    captures[pipe].feed(buffer[:-keep])
+                    pending[pipe] = buffer[-keep:]
+        finally:
+            selector.close()
+
+        if exit_code is None:
+            return_code: int = self.process.wait()
+            self.close()
+            return return_code
+
+        return exit_code
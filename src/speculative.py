@@ -0,0 +1,164 @@
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Text tokenized by both models to check that their vocabularies agree
+VOCAB_PROBE = "find . -name '*.py' -size +1M | xargs wc -l > /tmp/counts.txt 2>&1"
+
+
+class DraftStats:
+    """Counts of drafted tokens and how many the target model accepted.
+
+    llama.cpp does not report acceptance directly, so each proposal is
+    compared with the context of the next draft request: the target has
+    accepted exactly the leading drafted tokens that show up there.
+    """
+
+    def __init__(self) -> None:
+        self.proposed = 0
+        self.accepted = 0
+        self._context: List[int] = []
+        self._proposal: List[int] = []
+
+    def propose(self, context: List[int], proposal: List[int]) -> None:
+        self.settle(context)
+        self._context = context
+        self._proposal = proposal
+        self.proposed += len(proposal)
+
+    def settle(self, context: List[int]) -> None:
+        """Count the accepted part of the pending proposal against a newer context."""
+        if not self._proposal:
+            return
+
+        start = len(self._context)
+        if context[:start] == self._context:
+            continuation = context[start:start + len(self._proposal)]
+            for drafted, kept in zip(self._proposal, continuation):
+                if drafted != kept:
+                    break
+                self.accepted += 1
+        self._proposal = []
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.proposed if self.proposed else 0.0
+
+
+class CountingDrafter:
+    """Wraps a llama.cpp draft model and records its acceptance."""
+
+    def __init__(self, drafter: Any, mode: str):
+        self.drafter = drafter
+        self.mode = mode
+        self.stats = DraftStats()
+
+    def __call__(self, input_ids: Any, **kwargs: Any) -> Any:
+        proposal = self.drafter(input_ids, **kwargs)
+        self.stats.propose([int(t) for t in input_ids], [int(t) for t in proposal])
+        return proposal
+
+
+class SmallModelDrafter:
+    """Drafts tokens greedily with a smaller model sharing the target's vocabulary."""
+
+    def __init__(self, model: Any, num_pred_tokens: int = 8):
+        self.model = model
+        self.num_pred_tokens = num_pred_tokens
+
+    def __call__(self, input_ids: Any, **kwargs: Any) -> Any:
+        import numpy as np
+
+        tokens = [int(t) for t in input_ids]
+
+        # Reuse the draft context shared with the previous request
+        common = 0
+        cached = self.model.input_ids[:self.model.n_tokens]
+        for old, new in zip(cached, tokens):
+            if old != new:
+                break
+            common += 1
+        if common == len(tokens):
+            # The last token has to be evaluated again to get fresh logits
+            common -= 1
+        self.model.n_tokens = common
+        self.model.eval(tokens[common:])
+
+        draft: List[int] = []
+        eos = self.model.token_eos()
+        for _ in range(self.num_pred_tokens):
+            token = int(np.argmax(self.model.scores[self.model.n_tokens - 1]))
+            if token == eos:
+                break
+            draft.append(token)
+            self.model.eval([token])
+
+        return np.array(draft, dtype=np.intc)
+
+
+def create_drafter(
+        target: Any,
+        config: Dict[str, Any],
+        model_path: Path
+) -> Optional[CountingDrafter]:
+    """Build the drafter configured under ``model.draft``, or None when disabled.
+
+    A draft model whose vocabulary differs from the target's would propose
+    meaningless tokens, so prompt lookup is used instead in that case.
+    """
+    mode = config.get('mode', 'none')
+    if mode in (None, 'none', False):
+        return None
+
+    if mode == 'model':
+        draft_model = _load_draft_model(config, model_path, target.n_ctx())
+        if _same_vocabulary(target, draft_model):
+            drafter = SmallModelDrafter(draft_model, config.get('num_pred_tokens', 8))
+            return CountingDrafter(drafter, 'model')
+
+        print(
+            f"Warning: draft model '{config.get('name')}' does not share the target "
+            "model's vocabulary, using prompt lookup instead",
+            file=sys.stderr,
+        )
+        mode = 'prompt_lookup'
+
+    if mode != 'prompt_lookup':
+        raise ValueError(f"Unknown draft mode: {mode}")
+
+    from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+    drafter = LlamaPromptLookupDecoding(
+        max_ngram_size=config.get('max_ngram_size', 2),
+        num_pred_tokens=config.get('num_pred_tokens', 8),
+    )
+    return CountingDrafter(drafter, 'prompt_lookup')
+
+
+def _load_draft_model(config: Dict[str, Any], model_path: Path, n_ctx: int) -> Any:
+    from llama_cpp import Llama
+
+    name = config.get('name', 'tinyllama')
+    draft_path = Path(os.path.expanduser(config.get('path', str(model_path))))
+    possible_files = list(draft_path.glob(f"*{name}*.gguf"))
+    if not possible_files:
+        raise FileNotFoundError(
+            f"No draft model found matching '{name}' in {draft_path}\n"
+            "Download one with: orcas --download-model"
+        )
+
+    return Llama(
+        model_path=str(possible_files[0]),
+        n_ctx=n_ctx,
+        n_gpu_layers=config.get('n_gpu_layers', 0),
+        verbose=False,
+    )
+
+
+def _same_vocabulary(target: Any, draft: Any) -> bool:
+    if target.n_vocab() != draft.n_vocab():
+        return False
+    if target.token_eos() != draft.token_eos() or target.token_bos() != draft.token_bos():
+        return False
+    probe = VOCAB_PROBE.encode('utf-8')
+    return bool(target.tokenize(probe, add_bos=False) == draft.tokenize(probe, add_bos=False))
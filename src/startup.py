@@ -0,0 +1,36 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+
+class StartupProfile:
+    """Wall-clock time spent importing modules and initializing components.
+
+    Heavy modules are imported where they are first needed, so each phase
+    records the time of its own imports plus anything they pull in that was
+    not loaded yet.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.records: List[Tuple[str, str, float]] = []
+
+    @contextmanager
+    def phase(self, kind: str, name: str) -> Iterator[None]:
+        """Time a block, recording it under ``kind`` ('import' or 'init')."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append((kind, name, (time.perf_counter() - start) * 1000))
+
+    def mark(self, kind: str, name: str) -> None:
+        """Record the time since the profile was created, e.g. for the CLI module."""
+        self.records.append((kind, name, (time.perf_counter() - self.started) * 1000))
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+# Created as early as possible, when the CLI module is first imported
+profile = StartupProfile()
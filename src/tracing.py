@@ -0,0 +1,154 @@
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, cast
+
+# A function wrapped by Tracer.traced keeps its signature
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+class Span:
+    """One timed stage of a request, with optional arguments such as token counts."""
+
+    __slots__ = ('tracer', 'name', 'args', 'start', 'duration', 'thread')
+
+    def __init__(self, tracer: 'Tracer', name: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0.0
+        self.duration = 0.0
+        self.thread = 0
+
+    def set(self, **args: Any) -> None:
+        """Attach arguments known only once the stage has run."""
+        self.args.update(args)
+
+    def __enter__(self) -> 'Span':
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.duration = time.perf_counter() - self.start
+        tokens_out = self.args.get('tokens_out')
+        if tokens_out and self.duration > 0:
+            self.args['tokens_per_sec'] = round(tokens_out / self.duration, 1)
+        # list.append is atomic, so worker threads need no lock
+        self.tracer.spans.append(self)
+
+
+class _NullSpan:
+    """Stands in for every span while tracing is off."""
+
+    __slots__ = ()
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Records where a request spends its time, from model load to execution.
+
+    Disabled by default: ``span`` then returns a shared no-op object, so
+    the instrumentation can stay in place at the cost of one attribute check.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.spans = []
+
+    def span(self, name: str, **args: Any) -> Any:
+        """Time a block as stage ``name``; use as a context manager."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, args)
+
+    def traced(self, name: str) -> Callable[[F], F]:
+        """Decorator timing every call of a function as stage ``name``."""
+        def decorator(func: F) -> F:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with Span(self, name, {}):
+                    return func(*args, **kwargs)
+            return cast(F, wrapper)
+        return decorator
+
+    def breakdown(self) -> List[Tuple[str, int, float]]:
+        """Calls and total milliseconds per stage, in order of first appearance."""
+        stages: Dict[str, List[float]] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            stage = stages.setdefault(span.name, [0, 0.0])
+            stage[0] += 1
+            stage[1] += span.duration * 1000
+        return [(name, int(calls), ms) for name, (calls, ms) in stages.items()]
+
+    def tokens(self) -> Optional[Dict[str, float]]:
+        """Tokens in and out over all generations, and the generation rate."""
+        generations = [s for s in self.spans if 'tokens_out' in s.args]
+        if not generations:
+            return None
+        tokens_out = sum(s.args['tokens_out'] for s in generations)
+        seconds = sum(s.duration for s in generations)
+        return {
+            'tokens_in': sum(s.args.get('tokens_in', 0) for s in generations),
+            'tokens_out': tokens_out,
+            'tokens_per_sec': tokens_out / seconds if seconds else 0.0,
+        }
+
+    def write(self, path: str) -> None:
+        """Write the spans as JSON lines (``.jsonl``) or as a Chrome trace.
+
+        Chrome traces open in chrome://tracing or https://ui.perfetto.dev.
+        """
+        import json
+
+        spans = sorted(self.spans, key=lambda s: s.start)
+        with open(os.path.expanduser(path), 'w') as f:
+            if path.endswith('.jsonl'):
+                for span in spans:
+                    record = {
+                        'name': span.name,
+                        'start_ms': round((span.start - self.origin) * 1000, 3),
+                        'duration_ms': round(span.duration * 1000, 3),
+                        'thread': span.thread,
+                    }
+                    record.update(span.args)
+                    f.write(json.dumps(record) + '\n')
+                return
+
+            events = [
+                {
+                    'name': span.name,
+                    'ph': 'X',
+                    'ts': round((span.start - self.origin) * 1e6, 1),
+                    'dur': round(span.duration * 1e6, 1),
+                    'pid': os.getpid(),
+                    'tid': span.thread,
+                    'args': span.args,
+                }
+                for span in spans
+            ]
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+# Shared by every module, enabled by --profile or profiling.enabled
+tracer = Tracer()
@@ -0,0 +1,66 @@
+import gzip
+import json
+import stat
+
+from audit import AuditLog, RotatingWriter
+
+
+def mode(path):
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def test_entries_are_written_as_private_json_lines(tmp_path):
+    path = tmp_path / 'logs' / 'orcas.log'
+    log = AuditLog()
+    log.configure({'enabled': True, 'file': str(path), 'level': 'INFO'})
+
+    log.begin_request('list files')
+    log.record('verdict', command='ls', allowed=True)
+    log.record('debug detail', level='DEBUG')
+    log.close()
+
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [entry['event'] for entry in entries] == ['prompt', 'verdict']
+    assert entries[0]['request'] == entries[1]['request'] is not None
+    assert entries[1]['command'] == 'ls'
+    assert mode(path) == 0o600
+    assert mode(path.parent) == 0o700
+
+
+def test_files_rotate_by_size_and_keep_backup_count(tmp_path):
+    path = tmp_path / 'orcas.log'
+    writer = RotatingWriter(path, max_bytes=10, backup_count=2, compress=False)
+
+    for line in ('first line', 'second line', 'third line'):
+        writer.write([line])
+    writer.close()
+
+    assert not path.exists()
+    assert (tmp_path / 'orcas.log.1').read_text() == 'third line\n'
+    assert (tmp_path / 'orcas.log.2').read_text() == 'second line\n'
+    assert not (tmp_path / 'orcas.log.3').exists()
+
+
+def test_compressed_backups_stay_private(tmp_path):
+    path = tmp_path / 'orcas.log'
+    writer = RotatingWriter(path, max_bytes=10, backup_count=3, compress=True)
+
+    writer.write(['first line'])
+    writer.write(['second line'])
+    writer.close()
+
+    backups = [tmp_path / 'orcas.log.1.gz', tmp_path / 'orcas.log.2.gz']
+    assert [gzip.decompress(b.read_bytes()) for b in backups] == [b'second line\n', b'first line\n']
+    assert [mode(backup) for backup in backups] == [0o600, 0o600]
+    assert not (tmp_path / 'orcas.log.1').exists()
+
+
+def test_dropped_entries_are_reported(tmp_path):
+    path = tmp_path / 'orcas.log'
+    log = AuditLog()
+    log.configure({'enabled': True, 'file': str(path)})
+    log.dropped = 3
+    log.close()
+
+    [entry] = [json.loads(line) for line in path.read_text().splitlines()]
+    assert (entry['event'], entry['count']) == ('dropped', 3)
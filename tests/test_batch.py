@@ -0,0 +1,42 @@
+import io
+import json
+
+from batch import run_batch
+from command_parser import CommandParser
+from config import DEFAULT_CONFIG
+from model_manager import ModelManager
+from security import SecurityValidator
+
+
+def test_one_json_record_per_prompt(tmp_path):
+    model = ModelManager({'backend': 'stub', 'name': 'stub', 'stub': {
+        'responses': {'show disk usage': 'df -h', 'wipe the disk': 'rm -rf /', 'nothing': ''},
+    }})
+    validator = SecurityValidator(dict(DEFAULT_CONFIG['security'], policy_cache_dir=str(tmp_path)))
+    source = io.StringIO('show disk usage\n\n# a comment\nwipe the disk\nnothing\n')
+    output = io.StringIO()
+
+    summary = run_batch(source, output, CommandParser(model), validator)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r['prompt'] for r in records] == ['show disk usage', 'wipe the disk', 'nothing']
+
+    disk, wipe, nothing = records
+    assert disk['commands'] == [{
+        'command': 'df -h', 'risk_level': 'low', 'requires_sudo': False,
+        'allowed': True, 'reason': None,
+    }]
+    assert disk['allowed'] and disk['error'] is None
+    assert set(disk['timings']) == {'parse_ms', 'validate_ms', 'total_ms'}
+    assert disk['tokens']['generated'] > 0
+
+    assert wipe['commands'][0]['risk_level'] == 'high'
+    assert not wipe['allowed'] and wipe['commands'][0]['reason']
+
+    assert nothing['commands'] == []
+    assert nothing['error'] == 'Could not generate valid commands'
+
+    assert summary['prompts'] == 3
+    assert summary['blocked'] == 1
+    assert summary['errors'] == 1
+    assert summary['tokens_generated'] == sum(r['tokens']['generated'] for r in records)
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+from cli import run_request
+from command_parser import CommandParser
+from history import HistoryMatch
+from model_manager import ModelManager
+from result_cache import ResultCache
+
+
+class FakeHistory:
+    def __init__(self, commands=None):
+        self.commands = commands
+        self.lookups = []
+        self.recorded = []
+
+    def lookup(self, prompt, analyze):
+        self.lookups.append(prompt)
+        if self.commands is None:
+            return None
+        return HistoryMatch(prompt, [analyze(cmd, '') for cmd in self.commands], 0.9, 1)
+
+    def record(self, prompt, commands):
+        self.recorded.append(prompt)
+
+
+class FakeExecutor:
+    security = SimpleNamespace(validate=lambda cmd: True)
+
+    def execute_commands(self, commands):
+        return [SimpleNamespace(success=True) for _ in commands]
+
+
+class FakeSession:
+    def __init__(self, parser, turns):
+        self.parser = parser
+        self.turns = turns
+
+    def context(self):
+        return ''.join(f"User: {turn}\n" for turn in self.turns)
+
+    def add(self, prompt, commands, results=None):
+        self.turns.append(prompt)
+
+
+def make_parser(cache=None):
+    return CommandParser(ModelManager({'backend': 'stub', 'name': 'stub'}), cache=cache)
+
+
+def test_standalone_prompt_uses_history():
+    history = FakeHistory()
+
+    parser = make_parser()
+
+    run_request('list files', parser, FakeExecutor(), False, history, None,
+                FakeSession(parser, []))
+
+    assert history.lookups == ['list files']
+    assert history.recorded == ['list files']
+
+
+def test_follow_up_prompt_skips_history():
+    history = FakeHistory()
+
+    parser = make_parser()
+
+    run_request('now sort them', parser, FakeExecutor(), False, history, None,
+                FakeSession(parser, ['list files']))
+
+    assert history.lookups == []
+    assert history.recorded == []
+
+
+def test_declined_history_offer_asks_the_model(tmp_path, monkeypatch):
+    parser = make_parser(ResultCache({'path': str(tmp_path / 'results.db')}))
+    parser.cache.put(parser._cache_key('list files'), 'list files', ['ls'])
+    asked = []
+
+    def ask(prompt, default):
+        asked.append(default)
+        return False
+
+    monkeypatch.setattr('rich.prompt.Confirm.ask', ask)
+    run_request('list files', parser, FakeExecutor(), False, FakeHistory(['ls']), None)
+
+    # Reusing history is opt-in, and the cached answer is not served instead
+    assert asked == [False]
+    assert parser.last_usage is not None
@@ -0,0 +1,94 @@
+from command_parser import Candidate, CommandParser
+from config import DEFAULT_CONFIG
+from model_manager import ModelManager
+from security import SecurityValidator
+
+FIVE_COMMANDS = 'ls\npwd\ndf -h\nfree -m\nuptime'
+
+
+def make_parser(responses, **kwargs):
+    model = ModelManager({'backend': 'stub', 'name': 'stub', 'stub': {'responses': responses}})
+    return CommandParser(model, **kwargs)
+
+
+def test_commands_are_yielded_while_the_answer_is_generated():
+    parser = make_parser({'check the system': FIVE_COMMANDS})
+    full = parser.model.count_tokens(FIVE_COMMANDS)
+
+    stream = parser.parse_iter('check the system')
+    first = next(stream)
+
+    assert first.command == 'ls'
+    assert parser.model.last_completion_tokens < full
+    assert [cmd.command for cmd in stream] == ['pwd', 'df -h', 'free -m', 'uptime']
+    assert parser.model.last_completion_tokens == full
+
+
+def test_generation_stops_at_max_commands():
+    parser = make_parser({'check the system': FIVE_COMMANDS}, max_commands=2)
+    full = parser.model.count_tokens(FIVE_COMMANDS)
+
+    commands = list(parser.parse_iter('check the system'))
+
+    assert [cmd.command for cmd in commands] == ['ls', 'pwd']
+    # Generation ended with the second line instead of running to the end
+    assert parser.model.last_completion_tokens < full
+    assert parser.last_usage['generated'] == parser.model.last_completion_tokens
+
+
+def test_closing_the_stream_stops_generation():
+    parser = make_parser({'check the system': FIVE_COMMANDS})
+    full = parser.model.count_tokens(FIVE_COMMANDS)
+
+    stream = parser.parse_iter('check the system')
+    next(stream)
+    stream.close()
+
+    assert parser.model.last_completion_tokens < full
+    assert parser.last_usage is not None
+
+
+def make_candidate(commands, extracted=1.0, allowed=True):
+    parser = make_parser({})
+    parsed = [parser.analyze(command) for command in commands]
+    return Candidate('\n'.join(commands), commands, parsed, extracted, allowed)
+
+
+def test_candidates_rank_usable_clean_and_low_risk_answers_first():
+    ranked = sorted([
+        make_candidate(['rm -rf /'], allowed=False),
+        make_candidate(['rm -rf build']),
+        make_candidate(['make clean'], extracted=0.5),
+        make_candidate([], extracted=0.0),
+        make_candidate(['make clean']),
+    ], key=Candidate.rank, reverse=True)
+
+    assert [(c.commands, c.extracted) for c in ranked] == [
+        (['make clean'], 1.0), (['rm -rf build'], 1.0), (['make clean'], 0.5),
+        (['rm -rf /'], 1.0), ([], 0.0),
+    ]
+    assert [c.complete for c in ranked] == [True, True, False, False, False]
+
+
+def test_blocked_answers_are_replaced_by_the_best_alternative(tmp_path):
+    security = dict(DEFAULT_CONFIG['security'], policy_cache_dir=str(tmp_path))
+    # The first answer is greedy, the alternatives use seeds 1 and 2
+    parser = make_parser({'clean up': ['rm -rf /', 'rm -rf build', 'make clean']},
+                         validator=SecurityValidator(security))
+
+    commands = parser.parse('clean up')
+
+    assert [cmd.command for cmd in commands] == ['make clean']
+    assert parser.last_usage['candidates'] == 3
+    assert not parser.needs_alternative()
+    assert parser.next_alternative(better_only=True) is None
+    assert [cmd.command for cmd in parser.next_alternative()] == ['rm -rf build']
+    assert parser.next_alternative() is None
+
+
+def test_complete_answers_sample_no_alternatives():
+    parser = make_parser({'list files': ['ls', 'ls -la']})
+
+    assert [cmd.command for cmd in parser.parse('list files')] == ['ls']
+    assert not parser.needs_alternative()
+    assert 'candidates' not in parser.last_usage
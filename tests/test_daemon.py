@@ -0,0 +1,69 @@
+import stat
+import threading
+import time
+
+import pytest
+
+from command_parser import CommandParser
+from daemon import DaemonClient, InferenceDaemon
+from model_manager import ModelManager
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    config = {'socket': str(tmp_path / 'orcasd.sock'), 'idle_timeout': 0}
+    model = ModelManager({'backend': 'stub', 'name': 'stub', 'stub': {
+        'responses': {'check the system': 'df -h\nsudo apt update'},
+    }})
+    server = InferenceDaemon(config, CommandParser(model))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    client = DaemonClient(config)
+    for _ in range(100):
+        if client.ping():
+            break
+        time.sleep(0.05)
+    yield server, client
+
+    client.shutdown()
+    thread.join(5)
+
+
+def test_parse_round_trip(daemon):
+    server, client = daemon
+
+    commands = client.parse('check the system')
+
+    assert [cmd.command for cmd in commands] == ['df -h', 'sudo apt update']
+    assert [cmd.requires_sudo for cmd in commands] == [False, True]
+    assert commands[1].shell().base == 'sudo'
+    assert client.last_usage['generated'] > 0
+    assert stat.S_IMODE(server.socket_path.stat().st_mode) == 0o600
+
+
+def test_analyze_round_trip(daemon):
+    _, client = daemon
+
+    cmd = client.analyze('rm -rf build', 'Clean up')
+
+    assert (cmd.command, cmd.description, cmd.risk_level) == ('rm -rf build', 'Clean up', 'high')
+
+
+def test_unknown_operations_are_errors(daemon):
+    _, client = daemon
+
+    assert client._request({'op': 'reload'}) == {'ok': False, 'error': 'Unknown operation: reload'}
+
+
+def test_shutdown_removes_the_socket(daemon):
+    server, client = daemon
+
+    assert client.shutdown()
+    for _ in range(100):
+        if not server.socket_path.exists():
+            break
+        time.sleep(0.05)
+
+    assert not client.available()
+    assert not client.ping()
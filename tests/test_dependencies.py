@@ -0,0 +1,48 @@
+from dependencies import analyze_effects, build_dependency_graph
+
+
+def test_every_pipeline_stage_is_judged():
+    assert analyze_effects('ls | wc -l', '/w').writes is False
+    assert analyze_effects('ls|rm -rf x', '/w').writes is True
+    assert analyze_effects('cat x|sort -o y', '/w').writes is True
+
+
+def test_output_redirection_writes_its_target():
+    effects = analyze_effects('ls>out', '/w')
+    assert effects.writes is True
+    assert effects.paths == {'/w/out'}
+
+
+def test_descriptor_duplication_and_null_device_do_not_write():
+    assert analyze_effects('ls 2>&1', '/w').writes is False
+    assert analyze_effects('du -sh . 2>/dev/null', '/w').writes is False
+
+
+def test_input_redirection_reads_its_target():
+    effects = analyze_effects('wc -l <in.txt', '/w')
+    assert effects.writes is False
+    assert '/w/in.txt' in effects.paths
+
+
+def test_wrapped_and_substituted_commands_are_analyzed():
+    assert analyze_effects('sudo rm f', '/w').paths == {'/w/f'}
+    assert analyze_effects('find . | xargs rm', '/w').writes is True
+    assert analyze_effects('echo $(touch y)', '/w').writes is True
+
+
+def test_redirected_reader_waits_for_the_writer():
+    graph = build_dependency_graph(['ls > listing.txt', 'cat listing.txt', 'ls /tmp'], '/w')
+    assert graph == [set(), {0}, set()]
+
+
+def test_commands_without_files_depend_on_nothing():
+    assert analyze_effects('sleep 1', '/w').paths == set()
+    assert build_dependency_graph(['sleep 1', 'false', 'echo hi > out', 'make'], '/w') == [
+        set(), set(), set(), {2},
+    ]
+
+
+def test_unknown_commands_without_paths_still_write_the_working_directory():
+    effects = analyze_effects('make', '/w')
+    assert effects.writes is True
+    assert effects.paths == {'/w'}
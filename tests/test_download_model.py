@@ -0,0 +1,103 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import download_model
+from download_model import DownloadError, download_file
+
+CONTENT = bytes(range(256)) * 64
+CHUNK = 1024
+
+
+class SigningServer(ThreadingHTTPServer):
+    """Redirects /model to a URL signed anew on every request, like a CDN."""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.signature = 0
+        self.ranges = []
+        # Ranges starting at or after this offset fail
+        self.fail_from = None
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: SigningServer
+
+    def do_GET(self):
+        if self.path == '/model':
+            self.server.signature += 1
+            self.send_response(302)
+            self.send_header('Location', f'/blob?sig={self.server.signature}')
+            self.send_header('X-Linked-Etag', hashlib.sha256(CONTENT).hexdigest())
+            self.end_headers()
+            return
+
+        # Only the latest signature is valid
+        if self.path != f'/blob?sig={self.server.signature}':
+            self.send_error(403)
+            return
+
+        start, end = map(int, self.headers['Range'].split('=', 1)[1].split('-'))
+        if self.server.fail_from is not None and start >= self.server.fail_from:
+            self.send_error(500)
+            return
+        self.server.ranges.append(start)
+        body = CONTENT[start:end + 1]
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{end}/{len(CONTENT)}')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = SigningServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_resume_survives_a_new_redirect_target(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_model, 'RETRIES', 1)
+    url = f'http://127.0.0.1:{server.server_address[1]}/model'
+    destination = tmp_path / 'model.gguf'
+
+    server.fail_from = 8 * CHUNK
+    with pytest.raises(DownloadError):
+        download_file(url, destination, connections=1, chunk_size=CHUNK)
+    assert (tmp_path / 'model.gguf.part').exists()
+
+    server.fail_from = None
+    server.ranges.clear()
+    digest = download_file(url, destination, connections=1, chunk_size=CHUNK)
+
+    assert digest == hashlib.sha256(CONTENT).hexdigest()
+    assert destination.read_bytes() == CONTENT
+    # The probe and the chunks that were missing, nothing already on disk
+    assert server.ranges == [0] + list(range(8 * CHUNK, len(CONTENT), CHUNK))
+
+
+def test_changed_file_starts_over(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_model, 'RETRIES', 1)
+    url = f'http://127.0.0.1:{server.server_address[1]}/model'
+    destination = tmp_path / 'model.gguf'
+
+    server.fail_from = 8 * CHUNK
+    with pytest.raises(DownloadError):
+        download_file(url, destination, connections=1, chunk_size=CHUNK)
+
+    server.fail_from = None
+    server.ranges.clear()
+    # A different expected checksum means a different file
+    with pytest.raises(DownloadError, match='SHA-256 mismatch'):
+        download_file(url, destination, expected_sha256='0' * 64, connections=1, chunk_size=CHUNK)
+
+    assert server.ranges == [0] + list(range(0, len(CONTENT), CHUNK))
@@ -0,0 +1,57 @@
+import json
+
+from examples import BUILTIN_EXAMPLES, Example, ExampleLibrary, format_examples, tokenize
+
+
+def write_jsonl(path, entries):
+    path.write_text(''.join(json.dumps(entry) + '\n' for entry in entries))
+    return str(path)
+
+
+def test_tokenize_drops_stop_words_and_suffixes():
+    assert tokenize('Show me all the running processes') == ['runn', 'process']
+    assert tokenize('list the logs by size') == ['list', 'log', 'size']
+
+
+def test_search_ranks_matching_examples_first(tmp_path):
+    library = ExampleLibrary([write_jsonl(tmp_path / 'examples.jsonl', [
+        {'request': 'show running processes', 'commands': 'ps aux'},
+        {'request': 'kill the processes on port 8080', 'commands': ['fuser -k 8080/tcp']},
+        {'request': 'check disk space', 'commands': ['df -h']},
+        {'request': 'missing commands'},
+    ])])
+
+    best = library.search('which processes are running', 2)
+
+    assert best[0] == Example('show running processes', ('ps aux',))
+    assert best[1].request == 'kill the processes on port 8080'
+    # Entries without commands are skipped
+    assert len(library.examples) == len(BUILTIN_EXAMPLES) + 3
+
+
+def test_commands_are_searchable(tmp_path):
+    library = ExampleLibrary([write_jsonl(tmp_path / 'examples.jsonl', [
+        {'request': 'how full is the disk', 'commands': ['df -h']},
+    ])])
+
+    assert library.search('df', 1) == [Example('how full is the disk', ('df -h',))]
+
+
+def test_few_matches_are_filled_with_builtin_examples(tmp_path):
+    library = ExampleLibrary([str(tmp_path / 'missing.yaml')])
+
+    assert library.search('quantum entanglement', 2) == list(BUILTIN_EXAMPLES[:2])
+
+
+def test_yaml_files_are_read(tmp_path):
+    path = tmp_path / 'examples.yaml'
+    path.write_text('- request: restart nginx\n  commands:\n    - sudo systemctl restart nginx\n')
+    library = ExampleLibrary([str(path)])
+
+    assert library.search('restart nginx', 1)[0].commands == ('sudo systemctl restart nginx',)
+
+
+def test_format_examples_uses_the_prompt_layout():
+    examples = [Example('list files', ('ls',)), Example('backup', ('cp a b', 'gzip b'))]
+
+    assert format_examples(examples) == 'User: list files\nls\n\nUser: backup\ncp a b\ngzip b'
@@ -0,0 +1,16 @@
+import pytest
+
+from exec_cache import is_read_only
+from shell_ast import parse_shell
+
+
+@pytest.mark.parametrize('command', ['ls -la', 'grep -rn foo src', 'cat a | sort | uniq -c'])
+def test_reading_commands_are_cacheable(command):
+    assert is_read_only(parse_shell(command))
+
+
+@pytest.mark.parametrize('command', [
+    'ls > out', 'sort -o out in', 'uniq in out', 'find . -delete', 'tail -f log', 'ps aux',
+])
+def test_writing_or_changing_commands_are_not_cacheable(command):
+    assert not is_read_only(parse_shell(command))
@@ -0,0 +1,42 @@
+import time
+
+from command_parser import CommandParser
+from config import DEFAULT_CONFIG
+from executor import CommandExecutor
+from model_manager import ModelManager
+from security import SecurityValidator
+
+
+def make_executor(**config):
+    config = dict(DEFAULT_CONFIG['execution'], require_confirmation=False, **config)
+    return CommandExecutor(config, SecurityValidator(DEFAULT_CONFIG['security']))
+
+
+def analyze(*commands):
+    parser = CommandParser(ModelManager({'backend': 'stub', 'name': 'stub'}))
+    return [parser.analyze(command) for command in commands]
+
+
+def test_independent_commands_run_concurrently():
+    executor = make_executor(parallel=True, stream_output=False)
+
+    started = time.monotonic()
+    results = executor.execute_commands(analyze('sleep 1', 'sleep 1', 'false'))
+    elapsed = time.monotonic() - started
+
+    assert [result.success for result in results] == [True, True, False]
+    assert elapsed < 1.8
+
+
+def test_parallel_results_keep_the_original_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    executor = make_executor(parallel=True, stream_output=False)
+    commands = ['sleep 0.3; echo first > out.txt', 'echo second', 'cat out.txt']
+
+    results = executor.execute_commands(analyze(*commands))
+
+    # The slow first command is still reported first, and the reader of
+    # out.txt waited for its writer
+    assert [result.command for result in results] == commands
+    assert results[1].stdout == 'second\n'
+    assert results[2].stdout == 'first\n'
@@ -0,0 +1,41 @@
+import re
+
+import pytest
+
+from grammar import command_grammar
+
+
+def rules(grammar):
+    pairs = (line.split(' ::= ', 1) for line in grammar.splitlines() if ' ::= ' in line)
+    return {name.strip(): body.strip() for name, body in pairs}
+
+
+def references(body):
+    # Rule names outside of quoted literals and character classes
+    body = re.sub(r'"(\\.|[^"\\])*"|\[(\\.|[^\]\\])*\]', '', body)
+    return set(re.findall(r'[a-z]+', body))
+
+
+@pytest.mark.parametrize('max_commands, root', [
+    (None, 'command ("\\n" command)*'),
+    (1, 'command'),
+    (3, 'command ("\\n" command ("\\n" command)?)?'),
+])
+def test_root_limits_the_number_of_commands(max_commands, root):
+    assert rules(command_grammar(max_commands))['root'] == root
+
+
+def test_every_referenced_rule_is_defined():
+    grammar = rules(command_grammar(4))
+
+    for name, body in grammar.items():
+        assert references(body) <= set(grammar), name
+
+
+def test_chaining_operators_are_excluded_outside_quotes():
+    grammar = rules(command_grammar())
+
+    for name in ('head', 'tail'):
+        classes = re.findall(r'\[\^([^\]]*)\]', grammar[name])
+        assert all(';' in cls and '&' in cls and '\\n' in cls for cls in classes), name
+    assert '[^\\n;&|]' in grammar['pipe']
@@ -0,0 +1,74 @@
+import json
+import sqlite3
+
+import pytest
+
+from command_parser import CommandParser
+from history import CommandHistory
+from model_manager import ModelManager
+
+
+def make_parser():
+    return CommandParser(ModelManager({'backend': 'stub', 'name': 'stub'}))
+
+
+def test_recalled_commands_are_analyzed_again(tmp_path):
+    history = CommandHistory({'path': str(tmp_path / 'history.db')})
+    parser = make_parser()
+    history.record('remove the build directory', [parser.analyze('rm -rf build', 'Clean up')])
+
+    # Entries written by older versions also stored their analysis
+    db = sqlite3.connect(str(tmp_path / 'history.db'))
+    db.execute("UPDATE entries SET commands = ?", (json.dumps([{
+        'command': 'rm -rf build', 'description': 'Clean up',
+        'requires_sudo': False, 'risk_level': 'low',
+    }]),))
+    db.commit()
+
+    match = history.lookup('remove the build directory', parser.analyze)
+
+    assert match is not None
+    [cmd] = match.commands
+    assert cmd.description == 'Clean up'
+    assert cmd.risk_level == 'high'
+    assert cmd.shell().base == 'rm'
+
+
+def test_only_text_and_description_are_stored(tmp_path):
+    history = CommandHistory({'path': str(tmp_path / 'history.db')})
+    history.record('show disk usage', [make_parser().analyze('sudo du -sh /var')])
+
+    db = sqlite3.connect(str(tmp_path / 'history.db'))
+    [(payload,)] = db.execute("SELECT commands FROM entries").fetchall()
+
+    assert json.loads(payload) == [
+        {'command': 'sudo du -sh /var', 'description': 'Execute: sudo du -sh /var'},
+    ]
+
+
+@pytest.mark.parametrize('recorded,prompt', [
+    ('list all python files larger than 1MB in this directory sorted by modification time',
+     'delete all python files larger than 1MB in this directory sorted by modification time'),
+    ('compress all the log files in the logs directory',
+     'decompress all the log files in the logs directory'),
+    ('show disk usage of /var/log', 'show disk usage of /var/lib'),
+    ('find files older than 7 days', 'find files older than 70 days'),
+    ('copy /srv/a to /srv/b', 'copy /srv/b to /srv/a'),
+])
+def test_prompts_asking_for_something_else_do_not_match(tmp_path, recorded, prompt):
+    history = CommandHistory({'path': str(tmp_path / 'history.db')})
+    parser = make_parser()
+    history.record(recorded, [parser.analyze('true')])
+
+    assert history.lookup(prompt, parser.analyze) is None
+
+
+def test_prompts_differing_in_filler_words_match(tmp_path):
+    history = CommandHistory({'path': str(tmp_path / 'history.db')})
+    parser = make_parser()
+    history.record('show the greeting message', [parser.analyze('echo hi')])
+
+    match = history.lookup('Show greeting message, please!', parser.analyze)
+
+    assert match is not None
+    assert [cmd.command for cmd in match.commands] == ['echo hi']
@@ -0,0 +1,33 @@
+import pytest
+
+from inference_worker import InferenceWorker
+
+
+@pytest.fixture
+def worker():
+    worker = InferenceWorker({
+        'name': 'stub',
+        'backend': 'stub',
+        'persist_prefix_cache': False,
+        'stub': {'responses': {'slow': ' '.join(['word'] * 200)}, 'ms_per_token': 10},
+        'worker': {'enabled': True, 'timeout': 10, 'cancel_grace': 2},
+    })
+    yield worker
+    worker.close()
+
+
+def test_closed_stream_does_not_report_the_previous_counts(worker):
+    worker.generate('User: list files\n')
+    assert worker.last_prompt_tokens > 0
+
+    stream = worker.generate_stream('User: slow\n')
+    chunks = [next(stream) for _ in range(3)]
+    stream.close()
+
+    assert len(chunks) == 3
+    assert worker.last_prompt_tokens == 0
+    assert worker.last_completion_tokens == 3
+
+    # The abandoned reply is read before the next request
+    assert worker.generate('User: list files\n') == 'ls -lhS'
+    assert worker.last_prompt_tokens > 0
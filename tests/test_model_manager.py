@@ -0,0 +1,52 @@
+import os
+import time
+
+from model_manager import ModelManager, STALE_TMP_SECONDS
+
+
+def make_manager(tmp_path, max_mb):
+    return ModelManager({
+        'backend': 'stub',
+        'prefix_cache_dir': str(tmp_path),
+        'prefix_cache_max_mb': max_mb,
+    })
+
+
+def test_prefix_states_beyond_the_limit_are_evicted_oldest_first(tmp_path):
+    manager = make_manager(tmp_path, 0.35)
+    state = b'x' * 100 * 1024
+
+    for key in ('a', 'b', 'c'):
+        manager._save_prefix_state(key, state)
+        old = time.time() - 100 + ord(key)
+        os.utime(tmp_path / f"prefix-{key}.state", (old, old))
+    # Loading marks a snapshot as recently used
+    assert manager._load_prefix_state('a') == state
+
+    manager._save_prefix_state('d', state)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        'prefix-a.state', 'prefix-c.state', 'prefix-d.state']
+
+
+def test_stale_temporary_files_are_removed(tmp_path):
+    manager = make_manager(tmp_path, 512)
+    stale = tmp_path / 'prefix-crashed.tmp'
+    stale.write_bytes(b'partial')
+    old = time.time() - STALE_TMP_SECONDS - 1
+    os.utime(stale, (old, old))
+    fresh = tmp_path / 'prefix-writing.tmp'
+    fresh.write_bytes(b'partial')
+
+    manager._save_prefix_state('a', b'state')
+
+    assert not stale.exists()
+    assert fresh.exists()
+
+
+def test_corrupt_prefix_state_is_deleted(tmp_path):
+    manager = make_manager(tmp_path, 512)
+    (tmp_path / 'prefix-a.state').write_bytes(b'not a pickle')
+
+    assert manager._load_prefix_state('a') is None
+    assert not (tmp_path / 'prefix-a.state').exists()
@@ -0,0 +1,56 @@
+import pytest
+
+from model_pool import ModelPool, ModelRouter
+
+MB = 1024 * 1024
+
+
+def make_pool(budget_mb=0, sizes=None):
+    pool = ModelPool({
+        'backend': 'stub', 'name': 'large', 'worker': {'enabled': False},
+        'pool': {'models': ['tiny', 'small', 'large'], 'memory_budget_mb': budget_mb},
+    })
+    for name, size in (sizes or {}).items():
+        pool.managers[name].estimated_size = lambda size=size: size * MB
+    return pool
+
+
+def test_main_model_is_last_and_only_it_drafts():
+    pool = make_pool()
+
+    assert pool.names == ['tiny', 'small', 'large']
+    assert pool.managers['tiny'].config['draft'] == {'mode': 'none'}
+    assert 'draft' not in pool.managers['large'].config
+
+
+def test_least_recently_used_models_are_unloaded():
+    pool = make_pool(budget_mb=10, sizes={'tiny': 3, 'small': 4, 'large': 6})
+
+    pool.get('tiny')
+    pool.get('small')
+    pool.get('tiny')
+    pool.get('large')
+
+    assert pool.loaded() == ['tiny', 'large']
+    assert not pool.managers['small'].loaded
+    assert pool.managers['tiny'].loaded and pool.managers['large'].loaded
+
+
+def test_models_larger_than_the_budget_are_refused():
+    pool = make_pool(budget_mb=5, sizes={'large': 6})
+
+    with pytest.raises(RuntimeError, match='does not fit'):
+        pool.get('large')
+
+
+@pytest.mark.parametrize('prompt, simple', [
+    ('list files sorted by size', True),
+    ('find log files and delete them', False),
+    ('restart nginx if it is down', False),
+    (' '.join(['word'] * 13), False),
+])
+def test_router_escalates_complex_prompts(prompt, simple):
+    router = ModelRouter(make_pool(), {})
+
+    assert router.is_simple(prompt) == simple
+    assert router.route(prompt) == (['tiny', 'small', 'large'] if simple else ['large'])
@@ -0,0 +1,46 @@
+import pickle
+
+import policy
+from policy import PolicyEngine, load_policy, policy_hash
+
+
+def make_config(tmp_path, literals):
+    return {'blocked_commands': literals, 'policy_cache_dir': str(tmp_path)}
+
+
+def test_cached_engine_is_reused(tmp_path, monkeypatch):
+    monkeypatch.setattr(policy, '_engines', {})
+    load_policy(make_config(tmp_path, ['rm -rf /']))
+    monkeypatch.setattr(policy, '_engines', {})
+
+    engine = load_policy(make_config(tmp_path, ['rm -rf /']))
+
+    assert engine.match(['sudo rm -rf /']).rule == 'rm -rf /'
+    assert len(list(tmp_path.glob('policy-*.pkl'))) == 1
+
+
+def test_engine_built_from_other_rules_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setattr(policy, '_engines', {})
+    key = policy_hash(['rm -rf /'], [])
+    cache_file = tmp_path / f"policy-{key}.pkl"
+    # A file under the right name holding an engine that blocks nothing
+    with open(cache_file, 'wb') as f:
+        pickle.dump({
+            'version': policy.CACHE_VERSION, 'hash': key,
+            'literals': ['rm -rf /'], 'patterns': [], 'engine': PolicyEngine([], []),
+        }, f)
+
+    engine = load_policy(make_config(tmp_path, ['rm -rf /']))
+
+    assert engine.match(['rm -rf /']) is not None
+
+
+def test_bare_pickled_engine_is_not_trusted(tmp_path, monkeypatch):
+    monkeypatch.setattr(policy, '_engines', {})
+    key = policy_hash(['rm -rf /'], [])
+    with open(tmp_path / f"policy-{key}.pkl", 'wb') as f:
+        pickle.dump(PolicyEngine([], []), f)
+
+    engine = load_policy(make_config(tmp_path, ['rm -rf /']))
+
+    assert engine.match(['rm -rf /']) is not None
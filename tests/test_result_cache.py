@@ -0,0 +1,80 @@
+import itertools
+
+import result_cache
+from command_parser import CommandParser
+from config import DEFAULT_CONFIG
+from model_manager import ModelManager
+from result_cache import ResultCache
+from security import SecurityValidator
+
+
+def make_cache(tmp_path, **config):
+    return ResultCache(dict(config, path=str(tmp_path / 'results.db')))
+
+
+def test_keys_ignore_case_whitespace_and_sentence_punctuation():
+    key = ResultCache.make_key('list files', 'model', 'template')
+
+    assert ResultCache.make_key('  List   FILES! ', 'model', 'template') == key
+    assert ResultCache.make_key('list "files".', 'model', 'template') == key
+    assert ResultCache.make_key('list *.py files', 'model', 'template') != key
+    assert ResultCache.make_key('list files', 'other model', 'template') != key
+    assert ResultCache.make_key('list files', 'model', 'other template') != key
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(result_cache.time, 'time', lambda: next(clock))
+    cache = make_cache(tmp_path, max_entries=2)
+
+    cache.put('a', 'a', ['ls'])
+    cache.put('b', 'b', ['pwd'])
+    assert cache.get('a') == ['ls']
+    cache.put('c', 'c', ['df -h'])
+
+    assert cache.get('b') is None
+    assert cache.get('a') == ['ls']
+    assert cache.get('c') == ['df -h']
+    assert cache.stats() == {'entries': 2, 'hits': 3, 'misses': 1}
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'time', lambda: now[0])
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put('a', 'a', ['ls'])
+
+    now[0] += 61
+
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_hits_are_validated_against_the_current_policy(tmp_path):
+    security = dict(DEFAULT_CONFIG['security'], policy_cache_dir=str(tmp_path))
+    parser = CommandParser(
+        ModelManager({'backend': 'stub', 'name': 'stub', 'stub': {'default': 'ls -lhS'}}),
+        cache=make_cache(tmp_path),
+        validator=SecurityValidator(security),
+    )
+    key = parser._cache_key('clean up')
+    # Stored before rm -rf / was blocked
+    parser.cache.put(key, 'clean up', ['rm -rf /'])
+
+    commands = parser.parse('clean up')
+
+    assert [cmd.command for cmd in commands] == ['ls -lhS']
+    assert parser.last_usage is not None
+    assert parser.cache.get(key) == ['ls -lhS']
+
+
+def test_hits_are_analyzed_again(tmp_path):
+    parser = CommandParser(ModelManager({'backend': 'stub', 'name': 'stub'}),
+                           cache=make_cache(tmp_path))
+    parser.cache.put(parser._cache_key('update packages'), 'update packages', ['apt update'])
+
+    [cmd] = parser.parse('Update packages.')
+
+    assert parser.last_usage is None
+    assert cmd.command == 'apt update'
+    assert cmd.requires_sudo
@@ -0,0 +1,166 @@
+import re
+
+import pytest
+
+from command_parser import CommandParser
+from model_manager import ModelManager
+from shell_ast import parse_shell
+
+RISK_RANKS = {'low': 0, 'medium': 1, 'high': 2}
+
+
+def make_parser():
+    return CommandParser(ModelManager({'backend': 'stub', 'name': 'stub'}))
+
+
+# The regex checks the shell AST replaced, kept to compare against
+def baseline_risk(command):
+    for pattern in (r'\brm\b.*-[rf]', r'\bdd\b', r'\bmkfs\b', r'\bformat\b', r'>\s*/dev/'):
+        if re.search(pattern, command):
+            return 'high'
+    for pattern in (r'\brm\b', r'\bmv\b.*/', r'\bchmod\b', r'\bchown\b'):
+        if re.search(pattern, command):
+            return 'medium'
+    return 'low'
+
+
+def baseline_no_chaining(command):
+    return not any(re.search(pattern, command) for pattern in (r'&&', r'\|\|', r';\s*\w'))
+
+
+# command, risk, passes the chaining check
+CASES = [
+    # Quoting
+    ('ls -la', 'low', True),
+    ("grep -rn 'TODO' src", 'low', True),
+    ('ls\\\n -la', 'low', True),
+    ('echo "unterminated', 'low', False),
+    # Control operators and newlines
+    ('ls && rm -rf /', 'high', False),
+    ('ls || rm x', 'medium', False),
+    ('ls; rm -rf build', 'high', False),
+    ('ls | grep x', 'low', True),
+    ('ls\nrm -rf ~/projects', 'high', False),
+    ('ls\n', 'low', True),
+    ('ls &', 'low', True),
+    ('sleep 1 & rm -rf x', 'high', False),
+    ('sh -c "ls; rm -rf x"', 'high', False),
+    # Substitutions
+    ('echo $(rm -rf /)', 'high', True),
+    ('echo `rm -rf /`', 'high', True),
+    ('echo "$(rm file)"', 'medium', True),
+    ('echo $(ls; pwd)', 'low', False),
+    # Redirections
+    ('ls > /dev/sda', 'high', True),
+    ('ls 2>&1', 'low', True),
+    ('cat < in > out', 'low', True),
+    ('echo $(ls > /dev/sda)', 'high', True),
+    # Wrapped and path-qualified programs
+    ('VAR=x sudo rm -rf /', 'high', True),
+    ('/usr/bin/sudo dd if=/dev/zero of=x', 'high', True),
+    ('find . -name "*.tmp" -exec rm -f {} +', 'high', True),
+    ('rm file', 'medium', True),
+    ('mv a /tmp/b', 'medium', True),
+    ('chmod 644 f', 'medium', True),
+    ('mkfs.ext4 /dev/sdb1', 'high', True),
+]
+
+# Where the regexes matched text inside quotes or a harmless device
+BASELINE_FALSE_POSITIVES = [
+    ('echo "a && b"', 'low', True),
+    ("grep 'x;y' f", 'low', True),
+    ('echo "rm -rf /"', 'low', True),
+    ('ls > /dev/null', 'low', True),
+]
+
+
+@pytest.mark.parametrize('command,risk,allowed', CASES + BASELINE_FALSE_POSITIVES)
+def test_risk_and_chaining(command, risk, allowed):
+    parser = make_parser()
+
+    assert parser._assess_risk(parse_shell(command)) == risk
+    assert parser._validate_no_chaining(command) is allowed
+
+
+@pytest.mark.parametrize('command,risk,allowed', CASES)
+def test_never_laxer_than_the_regex_checks(command, risk, allowed):
+    assert RISK_RANKS[risk] >= RISK_RANKS[baseline_risk(command)]
+    assert allowed <= baseline_no_chaining(command)
+
+
+@pytest.mark.parametrize('command,risk,allowed', BASELINE_FALSE_POSITIVES)
+def test_quoted_text_is_not_mistaken_for_commands(command, risk, allowed):
+    assert (baseline_risk(command), baseline_no_chaining(command)) != (risk, allowed)
+
+
+def test_newline_separates_commands():
+    ast = parse_shell('ls\nrm -rf ~/projects')
+
+    assert ast.chained
+    assert ast.bases() == ['ls', 'rm']
+    assert ast.stages == (('ls',), ('rm', '-rf', '~/projects'))
+
+
+def test_quoted_newline_and_line_continuation_stay_in_one_command():
+    assert parse_shell('echo "a\nb"').stages == (('echo', 'a\nb'),)
+    assert parse_shell('ls \\\n-la').stages == (('ls', '-la'),)
+
+
+def test_comment_ends_at_the_newline():
+    assert parse_shell('ls # list\nrm x').bases() == ['ls', 'rm']
+
+
+def test_quoting_is_removed_from_words():
+    ast = parse_shell('grep "a b" \'c d\' e\\ f')
+
+    assert ast.args == ('a b', 'c d', 'e f')
+    assert ast.normalized == 'grep a b c d e f'
+    assert not ast.incomplete
+
+
+@pytest.mark.parametrize('operator', ['&&', '||', ';', '|'])
+def test_control_operators_split_stages(operator):
+    ast = parse_shell(f'ls {operator} wc -l')
+
+    assert ast.operators == (operator,)
+    assert ast.bases() == ['ls', 'wc']
+    assert ast.chained is (operator != '|')
+    assert ast.invocations[1].piped is (operator == '|')
+
+
+def test_substitutions_are_recorded_and_analyzed():
+    ast = parse_shell('echo $(whoami) `date`')
+
+    assert ast.substitutions == ('whoami', 'date')
+    assert ast.bases() == ['echo', 'whoami', 'date']
+
+
+def test_redirections():
+    ast = parse_shell('sort < in 2> err >> out 2>&1')
+
+    assert [(r.op, r.target, r.fd) for r in ast.redirections] == [
+        ('<', 'in', None), ('>', 'err', '2'), ('>>', 'out', None), ('>&', '1', '2'),
+    ]
+    assert ast.args == ()
+
+
+@pytest.mark.parametrize('command', [
+    'sudo apt update', 'VAR=x sudo ls', '/usr/bin/sudo ls', 'env LANG=C sudo ls', 'doas ls',
+])
+def test_sudo_is_found_behind_assignments_paths_and_wrappers(command):
+    ast = parse_shell(command)
+
+    assert ast.sudo
+    assert make_parser()._check_sudo_needed(ast)
+
+
+def test_sudo_as_an_argument_is_not_sudo():
+    assert not parse_shell('echo sudo').sudo
+
+
+def test_multi_line_command_in_xml_output_is_rejected():
+    parser = make_parser()
+    response = '<command>ls\nrm -rf ~/projects</command><command>pwd</command>'
+
+    assert parser._extract_commands(response) == ['pwd']
+    assert list(parser._extract_stream([response[:20], response[20:]])) == ['pwd']
@@ -0,0 +1,50 @@
+import os
+import time
+from types import SimpleNamespace
+
+import shell_session
+from output_capture import OutputCapture
+from shell_session import ShellSession
+
+
+def run(session, command, timeout=10):
+    stdout = OutputCapture(1024, 'stdout')
+    stderr = OutputCapture(1024, 'stderr')
+    code = session.run(command, stdout, stderr, timeout=timeout)
+    return code, stdout.text(), stderr.text()
+
+
+def test_state_carries_over_and_exit_codes_are_reported(tmp_path):
+    session = ShellSession()
+    try:
+        assert run(session, f'cd {tmp_path}') == (0, '', '')
+        assert run(session, 'pwd; echo oops >&2; sh -c "exit 3"') == (3, f'{tmp_path}\n', 'oops\n')
+        assert run(session, 'false')[0] == 1
+    finally:
+        session.close()
+
+
+def test_exit_code_split_from_the_marker(monkeypatch):
+    session = ShellSession()
+    try:
+        run(session, 'true')
+        # One byte per read, so some read ends right after the marker
+        monkeypatch.setattr(shell_session, 'os', SimpleNamespace(
+            read=lambda fd, size: os.read(fd, 1), killpg=os.killpg))
+
+        assert run(session, 'echo hi; sh -c "exit 7"') == (7, 'hi\n', '')
+    finally:
+        session.close()
+
+
+def test_timeout_kills_the_session_and_the_next_run_restarts_it():
+    session = ShellSession()
+    try:
+        started = time.monotonic()
+        assert run(session, 'export KEPT=1; sleep 5', timeout=0.3)[0] is None
+        assert time.monotonic() - started < 3
+        assert session.process is None
+
+        assert run(session, 'echo "${KEPT:-fresh}"') == (0, 'fresh\n', '')
+    finally:
+        session.close()